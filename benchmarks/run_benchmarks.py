@@ -0,0 +1,145 @@
+"""
+Benchmark the main workflows against synthetic folders served by the in-process fake backend.
+
+Each workflow runs against folders of 10, 100 and 1,000 spreadsheets. For every run the requests per quota kind,
+bytes sent and received, peak Python memory and wall time are recorded and compared with the budgets in
+budgets.json, where each metric may use at most `fixed + per_spreadsheet * spreadsheets`. The script exits with
+status 1 if any budget is exceeded.
+
+Usage:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 10 100 --workflows load_sheets_metadata --latency 0.01
+    python -m benchmarks.run_benchmarks --output results.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+import anndata
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
+from hca_metadata_manager.utils import list_google_sheets, load_sheets_metadata
+from hca_metadata_manager.workflow import (
+    apply_dropdowns, generate_empty_metadata_entry_sheets, update_existing_sheets, upload_metadata_to_drive
+)
+from benchmarks.workloads import populate_contributor_folder, schema_dfs, study_obs
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'budgets.json')
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def _generate_empty(backend, session, size, max_workers):
+    metadata_dfs = schema_dfs()
+    metadata_dfs.update(schema_dfs('Tier 2 '))
+    # Every dataset gets a tier 1 and a tier 2 spreadsheet
+    for dataset in range(math.ceil(size / 2)):
+        generate_empty_metadata_entry_sheets(metadata_dfs, session.gc, None, 'target', f'Dataset{dataset}', session=session)
+
+def _upload_metadata(backend, session, size, max_workers):
+    adata = anndata.AnnData(obs=study_obs(math.ceil(size / 2)))
+    upload_metadata_to_drive(adata, None, session.gc, None, 'target', session=session,
+                             metadata_dfs={f'{name} metadata': df for name, df in
+                                           (('donor', schema_dfs()['Tier 1 Donor Metadata']),
+                                            ('sample', schema_dfs()['Tier 1 Sample Metadata']))})
+
+def _apply_dropdowns(backend, session, size, max_workers):
+    metadata_dfs = schema_dfs()
+    for spreadsheet_id in populate_contributor_folder(backend, size):
+        apply_dropdowns(spreadsheet_id, None, session.gc, metadata_dfs=metadata_dfs, session=session)
+
+def _update_existing(backend, session, size, max_workers):
+    populate_contributor_folder(backend, size, stale=True)
+    update_existing_sheets('folder', None, session.gc, schema_dfs(), session=session, max_workers=max_workers)
+
+def _load_metadata(backend, session, size, max_workers):
+    populate_contributor_folder(backend, size)
+    sheets = list_google_sheets(None, 'folder', session=session)
+    load_sheets_metadata(None, sheets, session=session, max_workers=max_workers)
+
+WORKFLOWS = {
+    'generate_empty_metadata_entry_sheets': _generate_empty,
+    'upload_metadata_to_drive': _upload_metadata,
+    'apply_dropdowns': _apply_dropdowns,
+    'update_existing_sheets': _update_existing,
+    'load_sheets_metadata': _load_metadata,
+}
+
+
+def run_workflow(name, size, latency=0.0, max_workers=1):
+    """
+    Run one workflow against a fresh fake backend and return its measurements.
+
+    Returns:
+        dict: 'workflow', 'spreadsheets', request counts per kind, 'bytes_sent', 'bytes_received',
+        'peak_memory_kb' and 'wall_seconds'.
+    """
+    backend = FakeGoogleBackend(latency=latency)
+    backend.add_folder('target', 'root')
+    # The backend measures API usage, so the session's scheduler adds no quota waits of its own
+    session = backend.session()
+    # Build the discovery clients up front; parsing the discovery documents is a one-off cost per run
+    session.sheets, session.drive
+    setup_requests = len(backend.requests)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull  # the workflows print progress for every spreadsheet
+        try:
+            WORKFLOWS[name](backend, session, size, max_workers)
+        finally:
+            sys.stdout = stdout
+    wall_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(backend.requests) > setup_requests, f'{name} made no API requests'
+    result = {'workflow': name, 'spreadsheets': size}
+    result.update(backend.counts())
+    result.update(peak_memory_kb=round(peak / 1024), wall_seconds=round(wall_seconds, 3))
+    return result
+
+
+def check_budget(result, budgets):
+    """Return the budget violations of a result. Budgets scale with the folder size so they hold for every size."""
+    violations = []
+    for metric, budget in budgets.get(result['workflow'], {}).items():
+        limit = budget['fixed'] + budget['per_spreadsheet'] * result['spreadsheets']
+        if result[metric] > limit:
+            violations.append(f"{result['workflow']} ({result['spreadsheets']} spreadsheets): "
+                              f"{metric} {result[metric]} exceeds budget {limit:g}")
+    return violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Spreadsheets per synthetic folder.')
+    parser.add_argument('--workflows', nargs='+', choices=sorted(WORKFLOWS), default=list(WORKFLOWS))
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated seconds per API request.')
+    parser.add_argument('--max-workers', type=int, default=1, help='Workers for the workflows that support them.')
+    parser.add_argument('--budgets', default=BUDGETS_PATH, help='Budgets JSON file.')
+    parser.add_argument('--output', help='Write the measurements to this JSON file.')
+    args = parser.parse_args(argv)
+
+    with open(args.budgets) as f:
+        budgets = json.load(f)
+    results, violations = [], []
+    for name in args.workflows:
+        for size in args.sizes:
+            result = run_workflow(name, size, latency=args.latency, max_workers=args.max_workers)
+            results.append(result)
+            violations.extend(check_budget(result, budgets))
+            print(f"{name:<38} {size:>5} sheets  read {result['read']:>6}  write {result['write']:>6}  "
+                  f"drive {result['drive']:>5}  sent {result['bytes_sent'] / 1e6:8.2f} MB  "
+                  f"received {result['bytes_received'] / 1e6:8.2f} MB  peak {result['peak_memory_kb'] / 1024:7.1f} MB  "
+                  f"{result['wall_seconds']:8.2f} s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    for violation in violations:
+        print(f"BUDGET EXCEEDED: {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Synthetic folders and schemas for the workflow benchmarks."""
+import pandas as pd
+
+DESCRIPTION_ROWS = [['description'], ['examples'], ['required'], ['tier']]
+DONOR_COLUMNS = ['donor_id', 'sex', 'organism', 'age_range', 'manner_of_death']
+SAMPLE_COLUMNS = ['sample_id', 'donor_id', 'tissue_type', 'sample_source', 'suspension_type']
+
+
+def schema_dfs(prefix='Tier 1 '):
+    """Schema dataframes with one header row followed by allowed dropdown values."""
+    donor = pd.DataFrame({
+        'donor_id': ['donor_id', None, None],
+        'sex': ['sex', 'female', 'male'],
+        'organism': ['organism', 'human', 'mouse'],
+        'age_range': ['age_range', None, None],
+        'manner_of_death': ['manner_of_death', 'unknown', 'not_applicable'],
+    })
+    sample = pd.DataFrame({
+        'sample_id': ['sample_id', None, None],
+        'donor_id': ['donor_id', None, None],
+        'tissue_type': ['tissue_type', 'tissue', 'organoid'],
+        'sample_source': ['sample_source', 'surgical_donor', 'organ_donor'],
+        'suspension_type': ['suspension_type', 'cell', 'nucleus'],
+    })
+    return {f'{prefix}Donor Metadata': donor, f'{prefix}Sample Metadata': sample}
+
+
+def populate_contributor_folder(backend, num_spreadsheets, folder_id='folder', rows_per_tab=20, stale=False):
+    """
+    Add filled-in contributor spreadsheets to a fake backend folder.
+
+    With stale=True every donor tab misses its last schema column, so update_existing_sheets has work to do.
+    """
+    spreadsheet_ids = []
+    for i in range(num_spreadsheets):
+        donor_columns = DONOR_COLUMNS[:-1] if stale else DONOR_COLUMNS
+        donor_rows = [[f'D{i}_{row}', 'female', 'human', '30-39', 'unknown'][:len(donor_columns)]
+                      for row in range(rows_per_tab)]
+        sample_rows = [[f'S{i}_{row}', f'D{i}_{row}', 'tissue', 'organ_donor', 'cell'] for row in range(rows_per_tab)]
+        spreadsheet_id = f'contributor{i}'
+        backend.add_spreadsheet(spreadsheet_id, f'Study{i} tier 1 metadata', {
+            'Tier 1 Donor Metadata': [donor_columns] + DESCRIPTION_ROWS + donor_rows,
+            'Tier 1 Sample Metadata': [SAMPLE_COLUMNS] + DESCRIPTION_ROWS + sample_rows,
+        }, folder_id=folder_id)
+        spreadsheet_ids.append(spreadsheet_id)
+    return spreadsheet_ids
+
+
+def study_obs(num_studies, cells_per_study=50):
+    """An obs table with study/dataset_id columns and donor/sample columns for upload_metadata_to_drive."""
+    records = []
+    for study in range(num_studies):
+        for cell in range(cells_per_study):
+            records.append({
+                'study': f'Study{study}', 'dataset_id': f'Dataset{study}',
+                'donor_id': f'D{study}_{cell % 5}', 'donor_sex': 'female',
+                'sample_id': f'S{study}_{cell % 10}', 'sample_tissue_type': 'tissue',
+                'dataset_reference_genome': 'GRCh38', 'celltype_annotation': f'type{cell % 7}',
+            })
+    obs = pd.DataFrame.from_records(records)
+    obs.index = [f'cell{i}' for i in range(len(obs))]
+    return obs
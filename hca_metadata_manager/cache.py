@@ -0,0 +1,135 @@
+import os
+import json
+import threading
+import pandas as pd
+
+
+class SheetCache:
+    """
+    On-disk cache of harvested metadata tabs, keyed by spreadsheet ID and Drive modifiedTime/version.
+
+    Each spreadsheet tab is stored as one Parquet file next to a manifest.json recording the Drive revision
+    it was harvested at. A spreadsheet whose modifiedTime and version still match the listing from
+    list_google_sheets is served from disk instead of being downloaded again. Parquet support requires
+    pyarrow (`pip install pyarrow`).
+
+    Args:
+        cache_dir (str): Directory holding the manifest and the Parquet files. Created if missing.
+
+    Example:
+        >>> cache = SheetCache('metadata_cache')
+        >>> googlesheets = list_google_sheets(credentials, folder_id)
+        >>> metadata = load_sheets_metadata(credentials, googlesheets, cache=cache)
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifest = self._read_manifest()
+
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, self.MANIFEST)
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path()):
+            return {}
+        with open(self._manifest_path()) as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        # Write to a temporary file first so an interrupted run never leaves a truncated manifest
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    @staticmethod
+    def _revision(sheet_info):
+        return {'modifiedTime': sheet_info.get('modifiedTime'), 'version': sheet_info.get('version')}
+
+    def spreadsheet_ids(self):
+        """Return the IDs of all cached spreadsheets."""
+        with self._lock:
+            return list(self._manifest)
+
+    def entries(self, folder_id=None):
+        """
+        Return the cached spreadsheet info, optionally only for spreadsheets whose parents include folder_id.
+
+        Returns:
+            list: Dictionaries with 'id', 'name' and 'parents', sorted by name and ID.
+        """
+        with self._lock:
+            entries = [{'id': spreadsheet_id, 'name': entry.get('name'), 'parents': entry.get('parents')}
+                       for spreadsheet_id, entry in self._manifest.items()]
+        if folder_id is not None:
+            entries = [entry for entry in entries if folder_id in (entry['parents'] or [])]
+        return sorted(entries, key=lambda entry: (entry['name'] or '', entry['id']))
+
+    def is_fresh(self, sheet_info):
+        """Return True if the spreadsheet is cached at the revision reported by Drive."""
+        revision = self._revision(sheet_info)
+        if revision['modifiedTime'] is None:
+            return False
+        with self._lock:
+            entry = self._manifest.get(sheet_info['id'])
+        return entry is not None and entry['revision'] == revision
+
+    def load(self, spreadsheet_id):
+        """
+        Read the cached tabs of a spreadsheet.
+
+        Returns:
+            list: (metadata_type, DataFrame) tuples in tab order.
+        """
+        with self._lock:
+            entry = self._manifest[spreadsheet_id]
+        tables = []
+        for tab in entry['tabs']:
+            df = pd.read_parquet(os.path.join(self.cache_dir, tab['file']))
+            df.columns = tab['columns']
+            tables.append((tab['metadata_type'], df))
+        return tables
+
+    def store(self, sheet_info, tables):
+        """
+        Cache the tabs of a spreadsheet at the revision listed in sheet_info, replacing any older copy.
+
+        Args:
+            sheet_info (dict): Spreadsheet info from list_google_sheets, with 'id', 'modifiedTime' and 'version'.
+            tables (list): (metadata_type, DataFrame) tuples as returned by fetch_metadata_tables.
+        """
+        spreadsheet_id = sheet_info['id']
+        tabs = []
+        for position, (metadata_type, df) in enumerate(tables):
+            file_name = f'{spreadsheet_id}_{position}.parquet'
+            # Sheet headers may be blank or repeated, which Parquet does not allow, so store them in the manifest
+            stored = df.copy()
+            stored.columns = [f'column_{i}' for i in range(stored.shape[1])]
+            stored.to_parquet(os.path.join(self.cache_dir, file_name), index=False)
+            tabs.append({'metadata_type': metadata_type, 'file': file_name, 'columns': list(df.columns)})
+        with self._lock:
+            old_entry = self._manifest.get(spreadsheet_id)
+            self._manifest[spreadsheet_id] = {'name': sheet_info.get('name'), 'parents': sheet_info.get('parents'),
+                                              'revision': self._revision(sheet_info), 'tabs': tabs}
+            self._write_manifest()
+        self._remove_stale_files(old_entry, tabs)
+
+    def remove(self, spreadsheet_id):
+        """Drop a spreadsheet from the cache, e.g. after it was deleted from Drive."""
+        with self._lock:
+            old_entry = self._manifest.pop(spreadsheet_id, None)
+            self._write_manifest()
+        self._remove_stale_files(old_entry, [])
+
+    def _remove_stale_files(self, old_entry, tabs):
+        if old_entry is None:
+            return
+        current_files = {tab['file'] for tab in tabs}
+        for tab in old_entry['tabs']:
+            path = os.path.join(self.cache_dir, tab['file'])
+            if tab['file'] not in current_files and os.path.exists(path):
+                os.remove(path)
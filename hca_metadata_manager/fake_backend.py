@@ -0,0 +1,523 @@
+import copy
+import json
+import re
+import threading
+import time
+import itertools
+from collections import deque
+from urllib.parse import urlencode, urlparse, parse_qs, unquote
+import httplib2
+import requests
+
+SPREADSHEET_MIME_TYPE = 'application/vnd.google-apps.spreadsheet'
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# Scheduler quotas high enough that the scheduler never waits, leaving the backend's own quotas as the only limit
+UNLIMITED_QUOTAS = {kind: {'per_project': 1e9, 'per_user': 1e9} for kind in ('read', 'write', 'drive')}
+
+_SHEETS_ROUTE = re.compile(r'^/v4/spreadsheets(?:/(?P<id>[^/:]+))?(?P<action>:batchUpdate|/values:batchGet|/values:batchUpdate|/values/(?P<range>.+?)(?P<clear>:clear)?)?$')
+_DRIVE_FILE_ROUTE = re.compile(r'^/drive/v3/files(?:/(?P<id>[^/]+)(?P<copy>/copy)?)?$')
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+def _parse_cell(cell):
+    match = re.match(r'^([A-Za-z]*)(\d*)$', cell)
+    letters, digits = match.groups()
+    return (int(digits) - 1 if digits else None, _column_index(letters) if letters else None)
+
+def _cell_value(cell):
+    """Return the entered value of a CellData dictionary, as stored by values.update."""
+    return next(iter(cell.get('userEnteredValue', {}).values()), '')
+
+
+def parse_a1_range(a1_range):
+    """
+    Split an A1 range into its sheet title and 0-based bounds (start_row, start_col, end_row, end_col).
+
+    End bounds are exclusive and None when the range is open-ended, e.g. 'Sheet1'!1:2 or 'Sheet1'.
+    """
+    title, _, cells = a1_range.rpartition('!') if '!' in a1_range else (a1_range, '', '')
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    if not cells:
+        return title, (0, 0, None, None)
+    start, _, end = cells.partition(':')
+    start_row, start_col = _parse_cell(start)
+    end_row, end_col = _parse_cell(end) if end else (start_row, start_col)
+    return title, (start_row or 0, start_col or 0,
+                   end_row + 1 if end_row is not None else None, end_col + 1 if end_col is not None else None)
+
+
+class FakeGoogleBackend:
+    """
+    An in-process stand-in for the subset of the Sheets v4 and Drive v3 REST APIs used by this package.
+
+    It serves spreadsheets create/get/batchUpdate, values get/batchGet/update/batchUpdate/clear, Drive files
+    create/list/get/update and the Drive changes feed, keeping spreadsheets in memory. Both clients plug into it:
+    googleapiclient through `http()` (an httplib2-compatible transport) and gspread through `gspread_client()`,
+    so a SheetsSession from `session()` runs the real code paths without network access. Every request is
+    counted, optionally delayed by `latency` seconds, and answered with a 429 when it exceeds the per-minute
+    `quotas` or when a failure was injected with `inject_rate_limits`.
+
+    Args:
+        latency (float): Seconds each request takes.
+        quotas (dict, optional): Per-kind requests per minute, e.g. {'read': 60, 'write': 60, 'drive': 12000}.
+            Unlimited if omitted.
+        clock (callable): Time source for the quota windows.
+
+    Example:
+        >>> backend = FakeGoogleBackend(latency=0.05, quotas={'read': 60, 'write': 60})
+        >>> backend.add_spreadsheet('sheet0', 'Study0 metadata', {'Donor Metadata': [['donor_id'], ['D1']]})
+        >>> session = backend.session()
+        >>> metadata = load_sheets_metadata(session.credentials, list_google_sheets(None, 'folder', session=session), session=session)
+        >>> backend.counts()
+    """
+
+    def __init__(self, latency=0.0, quotas=None, clock=time.monotonic):
+        self.latency = latency
+        self.quotas = quotas or {}
+        self._clock = clock
+        self.spreadsheets = {}
+        self.folders = {}
+        self.changes = []
+        self.failing = set()
+        self.requests = []
+        self.batch_updates = []
+        self.rate_limited = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.files_page_size = 1000
+        self._injected = 0
+        self._windows = {}
+        self._ids = itertools.count()
+        self._lock = threading.RLock()
+
+    # Content management
+
+    def add_folder(self, folder_id, parent_id):
+        self.folders[folder_id] = parent_id
+
+    def add_spreadsheet(self, spreadsheet_id, title, tabs, folder_id='folder'):
+        """Register a spreadsheet whose tabs are {tab title: rows of cell values} inside a folder."""
+        with self._lock:
+            self.spreadsheets[spreadsheet_id] = {
+                'title': title, 'tabs': dict(tabs), 'sheet_ids': {tab: index for index, tab in enumerate(tabs)},
+                'grid': {}, 'validations': {}, 'parents': [folder_id], 'version': 1, 'trashed': False,
+            }
+            self._record_change(spreadsheet_id)
+
+    def edit_spreadsheet(self, spreadsheet_id, tabs):
+        with self._lock:
+            spreadsheet = self.spreadsheets[spreadsheet_id]
+            spreadsheet['tabs'] = dict(tabs)
+            spreadsheet['sheet_ids'] = {tab: index for index, tab in enumerate(tabs)}
+            self._touch(spreadsheet_id)
+
+    def trash_spreadsheet(self, spreadsheet_id):
+        with self._lock:
+            self.spreadsheets[spreadsheet_id]['trashed'] = True
+            self._touch(spreadsheet_id)
+
+    def inject_rate_limits(self, count):
+        """Answer the next count requests with a 429 RESOURCE_EXHAUSTED error."""
+        with self._lock:
+            self._injected += count
+
+    def _record_change(self, spreadsheet_id):
+        self.changes.append(spreadsheet_id)
+
+    def _touch(self, spreadsheet_id):
+        self.spreadsheets[spreadsheet_id]['version'] += 1
+        self._record_change(spreadsheet_id)
+
+    def _new_id(self):
+        return f'fake{next(self._ids)}'
+
+    # Client adapters
+
+    def http(self):
+        """Return an httplib2-compatible transport for googleapiclient, e.g. as a SheetsSession http_factory."""
+        return _FakeHttp(self)
+
+    def requests_session(self):
+        """Return a requests.Session-compatible object routing gspread calls to the backend."""
+        return _FakeRequestsSession(self)
+
+    def gspread_client(self):
+        """Return a gspread client whose requests are served by the backend."""
+        import gspread
+        return gspread.Client(None, session=self.requests_session())
+
+    def session(self, scheduler=None):
+        """
+        Return a SheetsSession whose Sheets, Drive and gspread clients all use the backend.
+
+        Unless a scheduler is given, the session gets its own RequestScheduler with UNLIMITED_QUOTAS, so calls are
+        neither delayed nor counted against the shared default scheduler.
+        """
+        from .session import SheetsSession
+        from .scheduler import RequestScheduler
+        if scheduler is None:
+            scheduler = RequestScheduler(quotas=UNLIMITED_QUOTAS)
+        return SheetsSession(None, gc=self.gspread_client(), http_factory=self.http, scheduler=scheduler)
+
+    # Statistics
+
+    def counts(self):
+        """
+        Return the number of requests served per kind ('read', 'write', 'drive'), the 429s returned, and the
+        bytes the clients sent (URIs and bodies) and received (response bodies).
+        """
+        counts = {'read': 0, 'write': 0, 'drive': 0}
+        for method, path in self.requests:
+            counts[self._kind(method, path)] += 1
+        counts.update(rate_limited=self.rate_limited, bytes_sent=self.bytes_sent, bytes_received=self.bytes_received)
+        return counts
+
+    @staticmethod
+    def _kind(method, path):
+        if path.startswith('/drive/'):
+            return 'drive'
+        return 'read' if method == 'GET' else 'write'
+
+    # Request handling
+
+    def encode(self, payload):
+        """Serialize a response payload, counting the bytes sent back to the client."""
+        content = json.dumps(payload).encode('utf-8')
+        with self._lock:
+            self.bytes_received += len(content)
+        return content
+
+    def handle(self, method, uri, body=None):
+        """Serve one REST call and return (status, JSON payload)."""
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urlparse(uri)
+        path = unquote(parsed.path)
+        query = parse_qs(parsed.query)
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        payload = json.loads(body) if body else {}
+        method = method.upper()
+        with self._lock:
+            self.requests.append((method, parsed.path))
+            self.bytes_sent += len(uri) + len(body or '')
+            error = self._rate_limit(self._kind(method, path))
+            if error is not None:
+                return error
+            try:
+                if path.startswith('/drive/'):
+                    return self._handle_drive(method, path, query, payload)
+                return self._handle_sheets(method, path, query, payload)
+            except KeyError:
+                return self._error(404, 'Requested entity was not found.', 'NOT_FOUND')
+
+    @staticmethod
+    def _error(code, message, status):
+        return code, {'error': {'code': code, 'message': message, 'status': status}}
+
+    def _rate_limit(self, kind):
+        if self._injected:
+            self._injected -= 1
+            self.rate_limited += 1
+            return self._error(429, f"Quota exceeded for quota metric '{kind}' (injected)", 'RESOURCE_EXHAUSTED')
+        limit = self.quotas.get(kind)
+        if limit is None:
+            return None
+        now = self._clock()
+        window = self._windows.setdefault(kind, deque())
+        while window and now - window[0] >= 60:
+            window.popleft()
+        if len(window) >= limit:
+            self.rate_limited += 1
+            return self._error(429, f"Quota exceeded for quota metric '{kind}' requests per minute", 'RESOURCE_EXHAUSTED')
+        window.append(now)
+        return None
+
+    def _spreadsheet(self, spreadsheet_id):
+        if spreadsheet_id in self.failing or self.spreadsheets[spreadsheet_id]['trashed']:
+            raise KeyError(spreadsheet_id)
+        return self.spreadsheets[spreadsheet_id]
+
+    def _handle_sheets(self, method, path, query, payload):
+        match = _SHEETS_ROUTE.match(path)
+        if match is None:
+            raise KeyError(path)
+        if match.group('id') is None:
+            if method == 'POST':
+                return 200, self._create_spreadsheet(payload)
+            raise KeyError(path)
+        spreadsheet_id = match.group('id')
+        spreadsheet = self._spreadsheet(spreadsheet_id)
+        action = match.group('action')
+        if action is None and method == 'GET':
+            return 200, self._get_spreadsheet(spreadsheet_id, query)
+        if action == ':batchUpdate' and method == 'POST':
+            self.batch_updates.append((spreadsheet_id, payload['requests']))
+            replies = [self._apply(spreadsheet, request) for request in payload['requests']]
+            self._touch(spreadsheet_id)
+            return 200, {'spreadsheetId': spreadsheet_id, 'replies': replies}
+        if action == '/values:batchGet':
+            return 200, {'spreadsheetId': spreadsheet_id, 'valueRanges': [
+                {'range': a1_range, 'values': self._values(spreadsheet, a1_range)} for a1_range in query.get('ranges', [])]}
+        if action == '/values:batchUpdate':
+            responses = [self._write_values(spreadsheet, data['range'], data.get('values', [])) for data in payload['data']]
+            self._touch(spreadsheet_id)
+            return 200, {'spreadsheetId': spreadsheet_id, 'totalUpdatedCells': sum(r['updatedCells'] for r in responses),
+                         'responses': responses}
+        a1_range = match.group('range')
+        if match.group('clear'):
+            title, _ = parse_a1_range(a1_range)
+            spreadsheet['tabs'][title] = []
+            self._touch(spreadsheet_id)
+            return 200, {'spreadsheetId': spreadsheet_id, 'clearedRange': a1_range}
+        if method == 'GET':
+            return 200, {'range': a1_range, 'majorDimension': 'ROWS', 'values': self._values(spreadsheet, a1_range)}
+        if method == 'PUT':
+            response = self._write_values(spreadsheet, a1_range, payload.get('values', []))
+            self._touch(spreadsheet_id)
+            return 200, dict(response, spreadsheetId=spreadsheet_id)
+        raise KeyError(path)
+
+    def _create_spreadsheet(self, payload):
+        spreadsheet_id = self._new_id()
+        sheets = payload.get('sheets') or [{'properties': {'title': 'Sheet1'}}]
+        self.add_spreadsheet(spreadsheet_id, payload.get('properties', {}).get('title', 'Untitled spreadsheet'), {},
+                             folder_id='root')
+        spreadsheet = self.spreadsheets[spreadsheet_id]
+        for sheet in sheets:
+            self._add_sheet(spreadsheet, sheet['properties'])
+            title = sheet['properties']['title']
+            for data in sheet.get('data', []):
+                values = [[_cell_value(cell) for cell in row.get('values', [])] for row in data.get('rowData', [])]
+                self._write_rows(spreadsheet, title, data.get('startRow', 0), data.get('startColumn', 0), values)
+        return self._get_spreadsheet(spreadsheet_id, {})
+
+    def _sheet_properties(self, spreadsheet, title, index):
+        rows = spreadsheet['tabs'][title]
+        row_count, column_count = spreadsheet['grid'].get(title, (1000, 26))
+        return {'sheetId': spreadsheet['sheet_ids'][title], 'title': title, 'index': index, 'sheetType': 'GRID',
+                'gridProperties': {'rowCount': max(len(rows), row_count),
+                                   'columnCount': max([len(row) for row in rows] + [column_count])}}
+
+    def _get_spreadsheet(self, spreadsheet_id, query):
+        spreadsheet = self.spreadsheets[spreadsheet_id]
+        grid_ranges = {}
+        for a1_range in query.get('ranges', []):
+            title, bounds = parse_a1_range(a1_range)
+            grid_ranges[title] = bounds
+        sheets = []
+        for index, title in enumerate(spreadsheet['tabs']):
+            if grid_ranges and title not in grid_ranges:
+                continue
+            sheet = {'properties': self._sheet_properties(spreadsheet, title, index)}
+            if query.get('includeGridData') == ['true']:
+                sheet['data'] = [self._grid_data(spreadsheet, title, grid_ranges.get(title, (0, 0, None, None)))]
+            sheets.append(sheet)
+        return {'spreadsheetId': spreadsheet_id, 'properties': {'title': spreadsheet['title']}, 'sheets': sheets,
+                'spreadsheetUrl': f'https://docs.google.com/spreadsheets/d/{spreadsheet_id}'}
+
+    def _grid_data(self, spreadsheet, title, bounds):
+        start_row, _, end_row, _ = bounds
+        validations = spreadsheet['validations'].get(title, {})
+        row_data = []
+        for row_index, row in enumerate(spreadsheet['tabs'][title][start_row:end_row], start=start_row):
+            cells = [{'formattedValue': value} if value != '' else {} for value in row]
+            if row_index > 0:
+                for col, values in validations.items():
+                    cells.extend({} for _ in range(col + 1 - len(cells)))
+                    cells[col]['dataValidation'] = {'condition': {
+                        'type': 'ONE_OF_LIST', 'values': [{'userEnteredValue': value} for value in values]}}
+            row_data.append({'values': cells})
+        return {'startRow': start_row, 'rowData': row_data}
+
+    def _values(self, spreadsheet, a1_range):
+        title, (start_row, start_col, end_row, end_col) = parse_a1_range(a1_range)
+        rows = [row[start_col:end_col] for row in spreadsheet['tabs'][title][start_row:end_row]]
+        rows = [row[:max([i + 1 for i, value in enumerate(row) if value != ''] + [0])] for row in rows]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _write_values(self, spreadsheet, a1_range, values):
+        title, (start_row, start_col, _, _) = parse_a1_range(a1_range)
+        self._write_rows(spreadsheet, title, start_row, start_col, values)
+        return {'updatedRange': a1_range, 'updatedRows': len(values),
+                'updatedCells': sum(len(row) for row in values)}
+
+    @staticmethod
+    def _write_rows(spreadsheet, title, start_row, start_col, values):
+        rows = spreadsheet['tabs'][title]
+        for offset, new_row in enumerate(values):
+            while len(rows) <= start_row + offset:
+                rows.append([])
+            row = rows[start_row + offset]
+            row.extend([''] * (start_col + len(new_row) - len(row)))
+            row[start_col:start_col + len(new_row)] = ['' if value is None else str(value) for value in new_row]
+
+    def _title(self, spreadsheet, sheet_id):
+        return next(title for title, other_id in spreadsheet['sheet_ids'].items() if other_id == sheet_id)
+
+    def _add_sheet(self, spreadsheet, properties):
+        title = properties['title']
+        sheet_id = properties.get('sheetId', max(list(spreadsheet['sheet_ids'].values()) + [-1]) + 1)
+        spreadsheet['tabs'][title] = []
+        spreadsheet['sheet_ids'][title] = sheet_id
+        grid = properties.get('gridProperties', {})
+        spreadsheet['grid'][title] = (int(grid.get('rowCount', 1000)), int(grid.get('columnCount', 26)))
+        return self._sheet_properties(spreadsheet, title, list(spreadsheet['tabs']).index(title))
+
+    def _apply(self, spreadsheet, request):
+        """Apply one batchUpdate request to the stored cells. Pure formatting requests are accepted and ignored."""
+        kind, body = next(iter(request.items()))
+        if kind == 'addSheet':
+            return {'addSheet': {'properties': self._add_sheet(spreadsheet, body['properties'])}}
+        if kind == 'deleteSheet':
+            title = self._title(spreadsheet, body['sheetId'])
+            for key in ('tabs', 'sheet_ids', 'grid', 'validations'):
+                spreadsheet[key].pop(title, None)
+        elif kind == 'updateSheetProperties':
+            title = self._title(spreadsheet, body['properties']['sheetId'])
+            grid = body['properties'].get('gridProperties', {})
+            row_count, column_count = spreadsheet['grid'].get(title, (1000, 26))
+            spreadsheet['grid'][title] = (grid.get('rowCount', row_count), grid.get('columnCount', column_count))
+        elif kind == 'insertDimension' and body['range']['dimension'] == 'COLUMNS':
+            title, index = self._title(spreadsheet, body['range']['sheetId']), body['range']['startIndex']
+            width = body['range']['endIndex'] - index
+            for row in spreadsheet['tabs'][title]:
+                if len(row) >= index:
+                    row[index:index] = [''] * width
+            validations = spreadsheet['validations'].get(title, {})
+            spreadsheet['validations'][title] = {col + width * (col >= index): values for col, values in validations.items()}
+        elif kind == 'insertDimension':
+            title, index = self._title(spreadsheet, body['range']['sheetId']), body['range']['startIndex']
+            rows = spreadsheet['tabs'][title]
+            rows[index:index] = [[] for _ in range(body['range']['endIndex'] - index)] if len(rows) >= index else []
+        elif kind == 'updateCells' and 'range' in body:
+            # Only clearing a whole tab, e.g. {'range': {'sheetId': 0}, 'fields': 'userEnteredValue'}, is supported
+            spreadsheet['tabs'][self._title(spreadsheet, body['range']['sheetId'])] = []
+        elif kind == 'updateCells':
+            start = body['start']
+            values = [[_cell_value(cell) for cell in row.get('values', [])] for row in body['rows']]
+            self._write_rows(spreadsheet, self._title(spreadsheet, start['sheetId']), start.get('rowIndex', 0),
+                             start.get('columnIndex', 0), values)
+        elif kind == 'setDataValidation':
+            title = self._title(spreadsheet, body['range']['sheetId'])
+            values = [value['userEnteredValue'] for value in body['rule']['condition']['values']]
+            spreadsheet['validations'].setdefault(title, {})[body['range']['startColumnIndex']] = values
+        return {}
+
+    def _drive_file(self, file_id):
+        if file_id in self.folders:
+            return {'id': file_id, 'name': file_id, 'mimeType': FOLDER_MIME_TYPE, 'parents': [self.folders[file_id]],
+                    'trashed': False}
+        spreadsheet = self.spreadsheets[file_id]
+        return {'id': file_id, 'name': spreadsheet['title'], 'mimeType': SPREADSHEET_MIME_TYPE,
+                'parents': list(spreadsheet['parents']), 'trashed': spreadsheet['trashed'],
+                'modifiedTime': f"2024-01-01T00:{spreadsheet['version'] // 60:02d}:{spreadsheet['version'] % 60:02d}.000Z",
+                'version': str(spreadsheet['version'])}
+
+    def _handle_drive(self, method, path, query, payload):
+        if path == '/drive/v3/changes/startPageToken':
+            return 200, {'startPageToken': str(len(self.changes))}
+        if path == '/drive/v3/changes':
+            # Two changes per page to exercise pagination
+            start = int(query['pageToken'][0])
+            end = min(start + 2, len(self.changes))
+            changes = [{'fileId': file_id, 'removed': False, 'file': self._drive_file(file_id)}
+                       for file_id in self.changes[start:end]]
+            if end < len(self.changes):
+                return 200, {'nextPageToken': str(end), 'changes': changes}
+            return 200, {'newStartPageToken': str(end), 'changes': changes}
+        match = _DRIVE_FILE_ROUTE.match(path)
+        if match is None:
+            raise KeyError(path)
+        file_id = match.group('id')
+        if file_id is None and method == 'GET':
+            folder_id = re.match(r"'([^']+)' in parents", query['q'][0]).group(1)
+            files = [self._drive_file(spreadsheet_id) for spreadsheet_id, spreadsheet in self.spreadsheets.items()
+                     if folder_id in spreadsheet['parents'] and not spreadsheet['trashed']]
+            files += [self._drive_file(child_id) for child_id, parent_id in self.folders.items() if parent_id == folder_id]
+            start = int(query.get('pageToken', ['0'])[0])
+            end = start + min(int(query.get('pageSize', ['100'])[0]), self.files_page_size)
+            if end < len(files):
+                return 200, {'nextPageToken': str(end), 'files': files[start:end]}
+            return 200, {'files': files[start:end]}
+        if file_id is None and method == 'POST':
+            spreadsheet_id = self._new_id()
+            self.add_spreadsheet(spreadsheet_id, payload['name'], {'Sheet1': []}, folder_id=(payload.get('parents') or ['root'])[0])
+            return 200, self._drive_file(spreadsheet_id)
+        if match.group('copy'):
+            copy_id = self._new_id()
+            with self._lock:
+                duplicate = copy.deepcopy(self.spreadsheets[file_id])
+                duplicate.update(title=payload.get('name', f"Copy of {duplicate['title']}"),
+                                 parents=list(payload.get('parents') or ['root']), version=1, trashed=False)
+                self.spreadsheets[copy_id] = duplicate
+                self._record_change(copy_id)
+            return 200, self._drive_file(copy_id)
+        if method == 'GET':
+            return 200, self._drive_file(file_id)
+        if method == 'PATCH':
+            spreadsheet = self.spreadsheets[file_id]
+            removed = query.get('removeParents', [''])[0].split(',')
+            spreadsheet['parents'] = [parent for parent in spreadsheet['parents'] if parent not in removed]
+            spreadsheet['parents'] += [parent for parent in query.get('addParents', [''])[0].split(',') if parent]
+            if 'name' in payload:
+                spreadsheet['title'] = payload['name']
+            self._touch(file_id)
+            return 200, self._drive_file(file_id)
+        raise KeyError(path)
+
+
+class _FakeHttp:
+    """httplib2.Http stand-in used by googleapiclient."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        status, payload = self.backend.handle(method, uri, body)
+        response = httplib2.Response({'status': status, 'content-type': 'application/json'})
+        return response, self.backend.encode(payload)
+
+
+class _FakeRequestsSession:
+    """requests.Session stand-in used by gspread."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.headers = {}
+
+    def request(self, method, url, params=None, data=None, files=None, headers=None, **kwargs):
+        if params:
+            url = url + ('&' if '?' in url else '?') + urlencode(params, doseq=True)
+        # gspread passes JSON bodies as the `json` keyword, which would shadow the json module here
+        body = json.dumps(kwargs['json']) if kwargs.get('json') is not None else data
+        status, payload = self.backend.handle(method, url, body)
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response.headers['Content-Type'] = 'application/json'
+        response._content = self.backend.encode(payload)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
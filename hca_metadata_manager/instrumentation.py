@@ -0,0 +1,241 @@
+import bisect
+import json
+import re
+import threading
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+_local = threading.local()
+_SPREADSHEET_ID = re.compile(r'/(?:spreadsheets|files)/([A-Za-z0-9_-]+)')
+
+
+@contextmanager
+def phase(name):
+    """
+    Attribute the API calls made by the current thread inside the block to a workflow phase.
+
+    Example:
+        >>> with phase('upload'):
+        ...     upload_to_sheet(df, gc, spreadsheet_id, 'donor metadata')
+    """
+    previous = getattr(_local, 'phase', None)
+    _local.phase = name
+    try:
+        yield
+    finally:
+        _local.phase = previous
+
+def current_phase():
+    """Return the phase set by the innermost phase() block of the current thread, or None."""
+    return getattr(_local, 'phase', None)
+
+def in_current_phase(func):
+    """Wrap func so it runs in the caller's phase, e.g. before handing it to a thread pool."""
+    name = current_phase()
+
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+def describe_request(request):
+    """Return (call type, spreadsheet or file ID, payload bytes) of a googleapiclient request."""
+    match = _SPREADSHEET_ID.search(getattr(request, 'uri', '') or '')
+    body = getattr(request, 'body', None) or ''
+    return getattr(request, 'methodId', type(request).__name__), match.group(1) if match else None, len(body)
+
+def describe_call(func, args, kwargs):
+    """Return (call type, spreadsheet ID, approximate payload bytes) of a gspread method call."""
+    owner = getattr(func, '__self__', None)
+    spreadsheet = getattr(owner, 'spreadsheet', owner)  # worksheets point to their spreadsheet
+    spreadsheet_id = getattr(spreadsheet, 'id', None)
+    name = getattr(func, '__qualname__', repr(func))
+    if name.endswith('open_by_key') and args:
+        spreadsheet_id = args[0]
+    payload = json.dumps([args, kwargs], default=str) if args or kwargs else ''
+    return f'gspread.{name}', spreadsheet_id if isinstance(spreadsheet_id, str) else None, len(payload)
+
+
+class HistogramSink:
+    """
+    Aggregates call records in memory: counts, latency histograms, payload bytes, retries and throttling
+    delay per phase and call type.
+
+    Example:
+        >>> histogram = HistogramSink()
+        >>> session.scheduler.add_sink(histogram)
+        >>> load_sheets_metadata(credentials, googlesheets, session=session)
+        >>> histogram.report()
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        key = (record['phase'] or 'other', record['kind'], record['call'])
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'count': 0, 'errors': 0, 'latency': 0.0, 'bytes': 0, 'retries': 0,
+                                             'throttle': 0.0, 'throttled': 0, 'buckets': [0] * len(self.buckets)}
+            series['count'] += 1
+            series['errors'] += not record['ok']
+            series['throttled'] += record['throttle_seconds'] > 0
+            series['latency'] += record['latency']
+            series['bytes'] += record['payload_bytes']
+            series['retries'] += record['retries']
+            series['throttle'] += record['throttle_seconds']
+            series['buckets'][bisect.bisect_left(self.buckets, record['latency'])] += 1
+
+    def quantile(self, q, phase=None):
+        """Estimate a latency quantile in seconds from the histogram buckets, optionally for one phase."""
+        counts = [0] * len(self.buckets)
+        with self._lock:
+            for (series_phase, _, _), series in self.series.items():
+                if phase is None or series_phase == phase:
+                    counts = [a + b for a, b in zip(counts, series['buckets'])]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return self.buckets[-1]
+
+    def summary(self):
+        """
+        Return the totals per phase, in the order the phases were first seen.
+
+        Returns:
+            dict: Phase names mapped to {'calls', 'errors', 'seconds', 'bytes', 'retries', 'throttle_seconds', 'p50', 'p95'}.
+        """
+        phases = {}
+        with self._lock:
+            items = list(self.series.items())
+        for (phase_name, _, _), series in items:
+            totals = phases.setdefault(phase_name, {'calls': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0,
+                                                    'retries': 0, 'throttle_seconds': 0.0})
+            totals['calls'] += series['count']
+            totals['errors'] += series['errors']
+            totals['seconds'] += series['latency']
+            totals['bytes'] += series['bytes']
+            totals['retries'] += series['retries']
+            totals['throttle_seconds'] += series['throttle']
+        for phase_name, totals in phases.items():
+            totals['p50'] = self.quantile(0.5, phase_name)
+            totals['p95'] = self.quantile(0.95, phase_name)
+        return phases
+
+    def kinds(self):
+        """
+        Return the totals per quota kind ('read', 'write', 'drive'), in the order the kinds were first seen.
+
+        Returns:
+            dict: Kinds mapped to {'calls', 'throttled', 'throttle_seconds', 'retries'}, where throttled counts the
+            calls that waited for the scheduler.
+        """
+        kinds = {}
+        with self._lock:
+            items = list(self.series.items())
+        for (_, kind, _), series in items:
+            totals = kinds.setdefault(kind, {'calls': 0, 'throttled': 0, 'throttle_seconds': 0.0, 'retries': 0})
+            totals['calls'] += series['count']
+            totals['throttled'] += series['throttled']
+            totals['throttle_seconds'] += series['throttle']
+            totals['retries'] += series['retries']
+        return kinds
+
+    def report_kinds(self):
+        """Print the requests per quota kind, how many of them were throttled and for how long."""
+        kinds = self.kinds()
+        for kind, totals in kinds.items():
+            print(f"{kind}: {totals['calls']} requests, throttled {totals['throttled']} times, "
+                  f"waited {totals['throttle_seconds']:.1f}s")
+        retries = sum(totals['retries'] for totals in kinds.values())
+        if retries:
+            print(f"{retries} requests retried after quota errors")
+
+    def report(self):
+        """Print the per-phase summary."""
+        for phase_name, totals in self.summary().items():
+            print(f"{phase_name}: {totals['calls']} calls in {totals['seconds']:.1f}s "
+                  f"(p50 <= {totals['p50']:g}s, p95 <= {totals['p95']:g}s), {totals['bytes'] / 1024:.0f} KiB sent, "
+                  f"{totals['retries']} retries, throttled {totals['throttle_seconds']:.1f}s"
+                  + (f", {totals['errors']} errors" if totals['errors'] else ""))
+
+
+class JsonLinesSink:
+    """
+    Appends every call record as one JSON object per line to a file.
+
+    Args:
+        path (str): File to append to.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+
+class PrometheusSink(HistogramSink):
+    """
+    Aggregates call records like HistogramSink and writes them in the Prometheus text exposition format,
+    e.g. for the node_exporter textfile collector. The file is rewritten by flush().
+
+    Args:
+        path (str): File to write.
+        buckets (tuple): Upper bounds in seconds of the latency histogram buckets.
+    """
+
+    def __init__(self, path, buckets=LATENCY_BUCKETS):
+        super().__init__(buckets)
+        self.path = path
+
+    @staticmethod
+    def _labels(phase_name, kind, call, **extra):
+        labels = dict(phase=phase_name, kind=kind, call=call, **extra)
+        return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        with self._lock:
+            items = sorted(self.series.items())
+        lines = [
+            '# HELP hca_api_request_duration_seconds Latency of Google API calls.',
+            '# TYPE hca_api_request_duration_seconds histogram',
+        ]
+        for (phase_name, kind, call), series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f"hca_api_request_duration_seconds_bucket{self._labels(phase_name, kind, call, le=le)} {cumulative}")
+            lines.append(f"hca_api_request_duration_seconds_sum{self._labels(phase_name, kind, call)} {series['latency']:.6f}")
+            lines.append(f"hca_api_request_duration_seconds_count{self._labels(phase_name, kind, call)} {series['count']}")
+        counters = [
+            ('hca_api_errors_total', 'Google API calls that raised an error.', 'errors'),
+            ('hca_api_payload_bytes_total', 'Request payload bytes sent to Google APIs.', 'bytes'),
+            ('hca_api_retries_total', 'Google API calls retried after a quota error.', 'retries'),
+            ('hca_api_throttle_seconds_total', 'Seconds spent waiting for the request scheduler.', 'throttle'),
+        ]
+        for name, help_text, field in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f"{name}{self._labels(*key)} {series[field]:g}" for key, series in items]
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """Write the current metrics to the file."""
+        with open(self.path, 'w') as f:
+            f.write(self.render())
@@ -0,0 +1,128 @@
+import json
+from .scheduler import API_QUOTAS, TokenBucket
+from .utils import MAX_BATCH_UPDATE_BYTES, chunk_batch_requests
+
+
+class _SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RequestPlan:
+    """
+    Records the API requests a workflow would send instead of sending them.
+
+    Pass a plan as `plan=` to format_all_sheets, apply_dropdowns, batch_update_in_chunks, update_existing_sheets
+    or generate_empty_metadata_entry_sheets to run them in dry-run mode: writes are recorded with their exact
+    JSON bodies, grouped by spreadsheet, and nothing is modified. Reads needed to plan updates of existing
+    spreadsheets are still made; generating new spreadsheets is planned fully offline. The plan then estimates
+    the request counts per quota bucket and the wall-clock time the run would take under the quotas.
+
+    Args:
+        quotas (dict, optional): Per-kind {'per_project': n, 'per_user': n} quotas. Defaults to API_QUOTAS.
+        max_bytes (int): Payload limit used to split batchUpdate calls and flag oversized requests.
+
+    Example:
+        >>> plan = RequestPlan()
+        >>> update_existing_sheets(folder_id, credentials, gc, metadata_dfs, plan=plan)
+        >>> plan.report()
+        >>> plan.to_json('rollout_plan.json')
+    """
+
+    def __init__(self, quotas=None, max_bytes=MAX_BATCH_UPDATE_BYTES):
+        self.quotas = quotas or API_QUOTAS
+        self.max_bytes = max_bytes
+        self.calls = []
+
+    def record(self, spreadsheet_id, method, kind='write', body=None):
+        """Record one API call of the given quota kind ('read', 'write' or 'drive') against a spreadsheet."""
+        self.calls.append({'spreadsheet_id': spreadsheet_id, 'method': method, 'kind': kind, 'body': body})
+
+    def record_reads(self, spreadsheet_id, count, method='spreadsheets.get'):
+        """Record read calls whose bodies are not part of the plan."""
+        for _ in range(count):
+            self.record(spreadsheet_id, method, kind='read')
+
+    def batch_update(self, spreadsheet_id, requests):
+        """
+        Record batchUpdate requests split into calls exactly as batch_update_in_chunks would send them.
+
+        Returns:
+            list: The request chunks, one per batchUpdate call.
+        """
+        chunks = chunk_batch_requests(requests, max_bytes=self.max_bytes)
+        for chunk in chunks:
+            self.record(spreadsheet_id, 'spreadsheets.batchUpdate', body={'requests': chunk})
+        return chunks
+
+    def requests_by_spreadsheet(self):
+        """Return the recorded calls grouped by spreadsheet ID, in recording order."""
+        grouped = {}
+        for call in self.calls:
+            grouped.setdefault(call['spreadsheet_id'], []).append(
+                {key: call[key] for key in ('method', 'kind', 'body') if call[key] is not None})
+        return grouped
+
+    def counts(self):
+        """Return the number of recorded calls per quota kind."""
+        counts = {kind: 0 for kind in self.quotas}
+        for call in self.calls:
+            counts[call['kind']] = counts.get(call['kind'], 0) + 1
+        return counts
+
+    def oversized(self):
+        """Return (spreadsheet_id, bytes) for every recorded body larger than the payload limit."""
+        sizes = [(call['spreadsheet_id'], len(json.dumps(call['body']))) for call in self.calls if call['body'] is not None]
+        return [(spreadsheet_id, size) for spreadsheet_id, size in sizes if size > self.max_bytes]
+
+    def estimate_seconds(self, latency=0.5):
+        """
+        Estimate how long the recorded calls take when sent one after another through the request scheduler.
+
+        The calls are replayed in order against the scheduler's token buckets on a simulated clock.
+
+        Args:
+            latency (float): Assumed round-trip time of a single call in seconds.
+
+        Returns:
+            float: Estimated wall-clock time in seconds.
+        """
+        clock = _SimulatedClock()
+        buckets = {kind: TokenBucket(kind, min(quota['per_project'], quota['per_user']), clock=clock, sleep=clock.sleep)
+                   for kind, quota in self.quotas.items()}
+        for call in self.calls:
+            buckets[call['kind']].acquire()
+            clock.now += latency
+        return clock.now
+
+    def to_dict(self, latency=0.5):
+        """Return the plan as a JSON-serializable dictionary."""
+        return {
+            'spreadsheets': self.requests_by_spreadsheet(),
+            'counts': self.counts(),
+            'estimated_seconds': round(self.estimate_seconds(latency), 1),
+            'oversized': self.oversized(),
+        }
+
+    def to_json(self, path=None, latency=0.5):
+        """Return the plan as JSON, also writing it to path if given."""
+        text = json.dumps(self.to_dict(latency), indent=1)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def report(self, latency=0.5):
+        """Print the request counts, the estimated duration and any oversized batches."""
+        counts = self.counts()
+        print(f"Plan: {len(self.requests_by_spreadsheet())} spreadsheets, "
+              + ", ".join(f"{count} {kind}" for kind, count in counts.items()) + " requests")
+        print(f"Estimated time under current quotas: {self.estimate_seconds(latency) / 60:.1f} min")
+        for spreadsheet_id, size in self.oversized():
+            print(f"Oversized request body for {spreadsheet_id}: {size} bytes (limit {self.max_bytes})")
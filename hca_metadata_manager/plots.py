@@ -3,33 +3,38 @@ import seaborn as sns
 import re
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
-def check_completeness(df, ignore_values=None):
+# Cell values counted as missing by default; None also covers NaN
+DEFAULT_IGNORE_VALUES = ['', ' ', 'not applicable', 'NA', 'n/a', None]
+
+def completeness_mask(df, ignore_values=None):
     """
-    Calculate the percentage of non-missing values for each column in a DataFrame,
-    ignoring specified 'empty' values. 
-    
+    Return a boolean DataFrame that is True where a cell holds a real value.
+
+    The mask is built with one vectorized isin over the whole frame instead of a Python call per cell.
+
     Parameters:
         df (pd.DataFrame): The dataframe to analyze.
-        ignore_values (list, optional): A list of values to ignore as 'empty' in the completeness calculation.
-        
+        ignore_values (list, optional): Values counted as 'empty'. A None entry also counts NaN as empty.
+
     Returns:
-        pd.Series: A series with the percentage of real completeness for each column.
+        pd.DataFrame: Boolean frame with the shape of df.
     """
     if ignore_values is None:
-        ignore_values = ['', ' ', 'not applicable', 'NA', 'n/a', None]  # Default ignore values; can be customized
+        ignore_values = DEFAULT_IGNORE_VALUES
+    placeholders = [value for value in ignore_values if not pd.isna(value)]
+    mask = ~df.isin(placeholders)
+    if len(placeholders) < len(ignore_values):
+        mask &= df.notna()
+    return mask
 
-    # Apply a mask where data is not in ignore_values
-    mask = df.map(lambda x: x not in ignore_values)
-    
-    # Calculate the percentage of 'real' non-missing values
-    real_completeness = mask.mean() * 100
-
-    # for consistent plotting based on HCA guidelines
-    real_completeness = pd.DataFrame(real_completeness)
-    real_completeness.columns = ['Percentage']
-    real_completeness = real_completeness.iloc[1:,:]
-    real_completeness['Required'] = real_completeness.index.map(meta_col_dict)
+def _completeness_frame(percentage, meta_col_dict):
+    """Label a Series of completeness percentages with the requirement level of each field."""
+    real_completeness = pd.DataFrame({'Percentage': percentage})
+    fields = real_completeness.index.get_level_values(-1)
+    real_completeness['Required'] = pd.Series(fields, index=real_completeness.index).map(meta_col_dict)
     real_completeness = real_completeness.fillna('not defined')
     real_completeness['Required'] = real_completeness['Required'].astype('category')
     if len(real_completeness['Required'].unique())==2:
@@ -41,9 +46,27 @@ def check_completeness(df, ignore_values=None):
             real_completeness['Required'] = real_completeness['Required'].cat.reorder_categories(['not defined', 'MUST', 'GUTSPECIFIC'])
     elif len(real_completeness['Required'].unique())==4:
         real_completeness['Required'] = real_completeness['Required'].cat.reorder_categories(['not defined', 'MUST', 'RECOMMENDED', 'GUTSPECIFIC'])
-
     return real_completeness
 
+def check_completeness(df, ignore_values=None, meta_col_dict=None):
+    """
+    Calculate the percentage of non-missing values for each column in a DataFrame,
+    ignoring specified 'empty' values. 
+    
+    Parameters:
+        df (pd.DataFrame): The dataframe to analyze.
+        ignore_values (list, optional): A list of values to ignore as 'empty' in the completeness calculation.
+        meta_col_dict (dict, optional): Field names mapped to their requirement level ('MUST', 'RECOMMENDED' or
+            'GUTSPECIFIC'). Fields that are not listed are 'not defined'.
+        
+    Returns:
+        pd.DataFrame: The 'Percentage' of real completeness and the 'Required' level of each column except the first.
+    """
+    # Calculate the percentage of 'real' non-missing values
+    real_completeness = completeness_mask(df, ignore_values).mean() * 100
+    # for consistent plotting based on HCA guidelines
+    return _completeness_frame(real_completeness.iloc[1:], meta_col_dict or {})
+
 def check_consistency(df, field_name, allowed_values):
     """Check for values that are not in the allowed set, indicating inconsistency."""
     if field_name in df.columns:
@@ -69,6 +92,205 @@ def visualize_completeness(real_completeness_report, title):
     plt.ylabel('Fields')
     plt.show()
 
+def match_pattern(series, regex):
+    """
+    Return whether each value of a series, as a string, matches a compiled regex from its start (re.match).
+
+    The regex runs once per distinct value instead of once per row; metadata columns hold few distinct values.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Missing values have code -1, which picks the trailing 'nan', as in series.astype(str)
+        codes, uniques = series.cat.codes.to_numpy(), list(series.cat.categories.astype(str)) + ['nan']
+    else:
+        codes, uniques = pd.factorize(series.astype(str))
+    matches = np.fromiter((regex.match(value) is not None for value in uniques), dtype=bool, count=len(uniques))
+    return pd.Series(matches[codes], index=series.index, name=series.name)
+
+
+def is_permitted(series, permitted):
+    """
+    Return whether each value of a series is one of the permitted values, like series.isin(permitted).
+
+    Categorical columns (see schema.coerce_metadata_table) are checked once per category and the result looked up
+    by category code, which is about ten times faster than isin on an object column.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        permitted = list(permitted)
+        missing_permitted = any(pd.isna(value) for value in permitted)
+        permitted_categories = np.append(series.cat.categories.isin(permitted), missing_permitted)
+        return pd.Series(permitted_categories[series.cat.codes.to_numpy()], index=series.index, name=series.name)
+    return series.isin(permitted)
+
+
+def _to_arrow_strings(series):
+    """
+    Convert a column to an Arrow string array whose values, with nulls read as 'None', equal series.astype(str).
+
+    Columns of strings and None are converted without a Python str() call per value; anything else goes
+    through astype(str).
+    """
+    import pyarrow as pa
+    if series.dtype == object:
+        try:
+            return pa.array(series.to_numpy(), type=pa.string(), from_pandas=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass  # mixed types, e.g. NaN or numbers next to strings
+    return pa.array(series.astype(str).to_numpy(), type=pa.string())
+
+def _share_as_arrow(columns):
+    """
+    Write columns as Arrow strings in an IPC stream into a new shared memory block.
+
+    Pyarrow is imported here so the rest of the module works without it (`pip install pyarrow`).
+
+    Returns:
+        multiprocessing.shared_memory.SharedMemory: The block; the caller must close and unlink it.
+    """
+    import pyarrow as pa
+    table = pa.table({str(position): _to_arrow_strings(values) for position, values in enumerate(columns)})
+    mock = pa.MockOutputStream()
+    with pa.ipc.new_stream(mock, table.schema) as writer:
+        writer.write_table(table)
+    block = shared_memory.SharedMemory(create=True, size=max(1, mock.size()))
+    buffer = pa.py_buffer(block.buf)
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(buffer), table.schema) as writer:
+        writer.write_table(table)
+    del buffer  # the block cannot be closed while Arrow holds a view of it
+    return block
+
+def _match_shared_chunk(block_name, position, start, stop, pattern):
+    """Match rows start:stop of a shared Arrow column against a pattern. Runs in a worker process."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        # Arrow reads the stream in place, so only the slice this worker touches is paged in
+        table = pa.ipc.open_stream(pa.py_buffer(block.buf)).read_all()
+        chunk = table.column(str(position)).slice(start, stop - start)
+        encoded = pc.dictionary_encode(chunk, null_encoding='encode').combine_chunks()
+        regex = re.compile(pattern)
+        uniques = ['None' if value is None else value for value in encoded.dictionary.to_pylist()]
+        matches = np.fromiter((regex.match(value) is not None for value in uniques), dtype=bool, count=len(uniques))
+        result = matches[encoded.indices.to_numpy(zero_copy_only=False)]
+        del table, chunk, encoded
+    finally:
+        block.close()
+    return result
+
+def check_patterns_parallel(df, patterns, max_workers=None, chunk_rows=250000):
+    """
+    Match columns against regex patterns across a process pool, sharded by column and row chunk.
+
+    The columns are shared with the workers as Arrow string arrays in one shared memory block, so no
+    DataFrame is pickled; each worker only receives a column position and row range and returns
+    a boolean array. Requires pyarrow.
+
+    Parameters:
+        df (pd.DataFrame): The dataframe to validate.
+        patterns (dict): Column names mapped to regex patterns, matched from the start of the value.
+        max_workers (int, optional): Worker processes. Defaults to the number of CPUs.
+        chunk_rows (int): Rows per task.
+
+    Returns:
+        pd.DataFrame: Boolean validity matrix with one column per pattern column present in df.
+    """
+    columns = [column for column in df.columns if column in patterns]
+    if not columns or df.empty:
+        return pd.DataFrame({column: pd.Series(dtype=bool) for column in columns}, index=df.index)
+    block = _share_as_arrow([df[column] for column in columns])
+    try:
+        tasks = [(position, start, min(start + chunk_rows, len(df)))
+                 for position in range(len(columns)) for start in range(0, len(df), chunk_rows)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_match_shared_chunk, block.name, position, start, stop, patterns[columns[position]])
+                       for position, start, stop in tasks]
+            validity = [np.empty(len(df), dtype=bool) for _ in columns]
+            for (position, start, stop), future in zip(tasks, futures):
+                validity[position][start:stop] = future.result()
+    finally:
+        block.close()
+        block.unlink()
+    return pd.DataFrame(dict(zip(columns, validity)), index=df.index)
+
+
+class MetadataValidator:
+    """
+    Checks metadata columns against permitted values and regex patterns that are compiled once.
+
+    The permitted values become hash sets and the patterns compiled regexes when the validator is created. Each
+    check makes one vectorized pass per column and returns a boolean validity matrix (one column per checked
+    field, aligned with the input rows) that feeds correctness, per-group aggregation and report_invalid_entries
+    without scanning the data again.
+
+    Args:
+        permitted_values (dict, optional): Column names mapped to lists of permitted values.
+        permitted_patterns (dict, optional): Column names mapped to regex patterns, matched from the start of the value.
+
+    Example:
+        >>> validator = MetadataValidator(permitted_values_dict, permitted_patterns_dict)
+        >>> correctness_df = validator.correctness_per_group(df, 'worksheet')
+        >>> invalid = report_invalid_entries(df, validator.check_patterns(df))
+    """
+
+    def __init__(self, permitted_values=None, permitted_patterns=None):
+        self.permitted_values = {column: frozenset(values) for column, values in (permitted_values or {}).items()}
+        self.patterns = {column: re.compile(pattern) for column, pattern in (permitted_patterns or {}).items()}
+
+    def check_values(self, df):
+        """Return a boolean frame of which cells hold a permitted value, for the columns of df with permitted values."""
+        return pd.DataFrame({column: is_permitted(df[column], self.permitted_values[column])
+                             for column in df.columns if column in self.permitted_values}, index=df.index)
+
+    def check_patterns(self, df, max_workers=1):
+        """
+        Return a boolean frame of which cells match their pattern, for the columns of df with a pattern.
+
+        With max_workers > 1 the columns are matched across a process pool (see check_patterns_parallel).
+        """
+        if max_workers > 1:
+            return check_patterns_parallel(df, {column: regex.pattern for column, regex in self.patterns.items()},
+                                           max_workers=max_workers)
+        return pd.DataFrame({column: match_pattern(df[column], self.patterns[column])
+                             for column in df.columns if column in self.patterns}, index=df.index)
+
+    def correctness(self, df):
+        """
+        Return the percentage of valid values of every checked column as a one-row frame.
+
+        Columns are named '<column>_value_correctness' and '<column>_pattern_correctness'.
+        """
+        values = self.check_values(df).mean() * 100
+        patterns = self.check_patterns(df).mean() * 100
+        correctness = {}
+        for column in df.columns:
+            if column in values:
+                correctness[column + '_value_correctness'] = values[column]
+            if column in patterns:
+                correctness[column + '_pattern_correctness'] = patterns[column]
+        correctness_df = pd.DataFrame([correctness])
+        return correctness_df.fillna(0)  # Fill NaN with 0 where there's no data
+
+    def correctness_per_group(self, df, group_by='worksheet'):
+        """
+        Return the percentage of valid values of every checked column per group, one row per group.
+
+        A column with both permitted values and a pattern scores the better of the two checks.
+        """
+        groups = df[group_by]
+        values = self.check_values(df).groupby(groups).mean() * 100
+        patterns = self.check_patterns(df).groupby(groups).mean() * 100
+        correctness = {}
+        for column in df.columns:
+            if column in values and column in patterns:
+                correctness[column] = np.maximum(values[column], patterns[column])
+            elif column in values:
+                correctness[column] = values[column]
+            elif column in patterns:
+                correctness[column] = patterns[column]
+        if not correctness:
+            return pd.DataFrame()
+        return pd.DataFrame(correctness).rename_axis(None)
+
 def validate_pattern(df, column_name, pattern):
     """
     Validates a column in a DataFrame against a provided regex pattern.
@@ -82,33 +304,26 @@ def validate_pattern(df, column_name, pattern):
         pd.Series: A boolean series indicating whether each value matches the pattern.
     """
     if column_name in df.columns:
-        # Compiling the regular expression pattern for efficiency in matching
-        regex = re.compile(pattern)
-        # Applying the regex to the column
-        valid_mask = df[column_name].astype(str).apply(lambda x: bool(regex.match(x)))
-        return valid_mask
+        return match_pattern(df[column_name], re.compile(pattern))
     else:
         raise ValueError(f"The column '{column_name}' does not exist in the DataFrame.")
 
-def validate_columns_with_patterns(df, patterns):
+def validate_columns_with_patterns(df, patterns, max_workers=1):
     """
     Validates columns in a DataFrame that are specified in the patterns dictionary.
     
     Parameters:
         df (pd.DataFrame): The dataframe to validate.
         patterns (dict): A dictionary of column names and their corresponding regex patterns.
+        max_workers (int): Worker processes for very large tables. 1 validates in this process; more shards the
+            columns and row chunks across a process pool (requires pyarrow).
     
     Returns:
         dict: A dictionary with column names as keys and Series of boolean values indicating validity.
     """
-    validation_results = {}
-    for column, pattern in patterns.items():
-        if column in df.columns:  # Check if the column exists in the DataFrame
-            regex = re.compile(pattern)
-            validation_results[column] = df[column].astype(str).apply(lambda x: bool(regex.match(x)))
-        else:
-            validation_results[column] = pd.Series([], dtype=bool)  # Return empty series if column not in df
-    return validation_results
+    validity = MetadataValidator(permitted_patterns=patterns).check_patterns(df, max_workers=max_workers)
+    # Return an empty series for columns that are not in df
+    return {column: validity[column] if column in validity else pd.Series([], dtype=bool) for column in patterns}
 
 def validate_allowed_values(df, allowed_values):
     """
@@ -121,13 +336,9 @@ def validate_allowed_values(df, allowed_values):
     Returns:
         dict: Dictionary with validation results; each key is a column name, and the value is a Series of booleans.
     """
-    validation_results = {}
-    for column, values in allowed_values.items():
-        if column in df.columns:
-            validation_results[column] = df[column].isin(values)
-        else:
-            validation_results[column] = pd.Series([], dtype=bool)  # Return empty series if column not in df
-    return validation_results
+    validity = MetadataValidator(permitted_values=allowed_values).check_values(df)
+    # Return an empty series for columns that are not in df
+    return {column: validity[column] if column in validity else pd.Series([], dtype=bool) for column in allowed_values}
 
 def report_invalid_entries(df, validation_results):
     """
@@ -151,11 +362,22 @@ def report_invalid_entries(df, validation_results):
             invalid_entries[column] = invalid_df
     return invalid_entries
 
-def completeness_by_dataset(df, grouping_var):
-    """ Group the dataframe by grouping_var and calculate completeness for each group. """
-    grouped = df.groupby(grouping_var)
-    completeness = grouped.apply(check_completeness)
-    return completeness
+def completeness_by_dataset(df, grouping_var, ignore_values=None, meta_col_dict=None):
+    """
+    Group the dataframe by grouping_var and calculate completeness for each group.
+
+    The completeness mask is built once for the whole frame and averaged per group in a single groupby.
+
+    Returns:
+        pd.DataFrame: 'Percentage' and 'Required' indexed by (group, field), as check_completeness per group.
+    """
+    grouping_columns = grouping_var if isinstance(grouping_var, list) else [grouping_var]
+    groups = [df[column] for column in grouping_var] if isinstance(grouping_var, list) else df[grouping_var]
+    # check_completeness leaves out the first field of df; the grouping columns are not fields either
+    values = df.iloc[:, 1:]
+    values = values.drop(columns=[column for column in grouping_columns if column in values.columns])
+    percentage = completeness_mask(values, ignore_values).groupby(groups).mean() * 100
+    return _completeness_frame(percentage.stack(), meta_col_dict or {})
 
 
 def plot_completeness(completeness_df, title):
@@ -167,33 +389,12 @@ def plot_completeness(completeness_df, title):
 
 
 def calculate_correctness(df, permitted_values, permitted_patterns):
-    correctness = {}
-    for column in df.columns:
-        if column in permitted_values:
-            correctness[column + '_value_correctness'] = (df[column].isin(permitted_values[column]).mean()) * 100
-        if column in permitted_patterns:
-            pattern = re.compile(permitted_patterns[column])
-            correctness[column + '_pattern_correctness'] = (df[column].astype(str).apply(lambda x: bool(pattern.match(x))).mean()) * 100
-    correctness_df = pd.DataFrame([correctness])
-    return correctness_df.fillna(0)  # Fill NaN with 0 where there's no data
+    """ Percentage of values of each column that are permitted values or match the column's pattern. """
+    return MetadataValidator(permitted_values, permitted_patterns).correctness(df)
 
 def calculate_correctness_per_group(df, permitted_values, permitted_patterns, group_by='worksheet'):
-    # Create an empty DataFrame to store aggregated correctness data
-    all_correctness = pd.DataFrame()
-    # Group the DataFrame by the specified 'worksheet' column
-    groups = df.groupby(group_by)
-    for group_key, group_data in groups:
-        correctness = {}
-        for column in group_data.columns:
-            if column in permitted_values:
-                correctness[column] = (group_data[column].isin(permitted_values[column]).mean()) * 100
-            if column in permitted_patterns:
-                pattern = re.compile(permitted_patterns[column])
-                correctness[column] = max(correctness.get(column, 0), (group_data[column].astype(str).apply(lambda x: bool(pattern.match(x))).mean()) * 100)
-        # Transpose and rename index to include group_key for clarity
-        correctness_df = pd.DataFrame(correctness, index=[group_key])
-        all_correctness = pd.concat([all_correctness, correctness_df], axis=0)
-    return all_correctness
+    """ Correctness of each column per group, the better of the value and pattern checks where a column has both. """
+    return MetadataValidator(permitted_values, permitted_patterns).correctness_per_group(df, group_by)
 
 def plot_correctness_heatmap(correctness_df, title):
     correctness_df = correctness_df.round().astype(int)
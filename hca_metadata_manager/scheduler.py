@@ -0,0 +1,191 @@
+import threading
+import time
+import random
+from .instrumentation import current_phase, describe_call, describe_request
+
+# Per-minute request quotas of the Google APIs used by this package. The effective rate of a bucket is the
+# stricter of the project and per-user quota. Adjust these if your project has been granted a higher quota.
+API_QUOTAS = {
+    'read': {'per_project': 300, 'per_user': 60},     # Sheets API read requests
+    'write': {'per_project': 300, 'per_user': 60},    # Sheets API write requests
+    'drive': {'per_project': 12000, 'per_user': 12000},  # Drive API queries
+}
+
+def backoff(attempt, max_delay=60):
+    """ Calculate sleep time in seconds for exponential backoff. """
+    delay = min(max_delay, (2 ** attempt) + (random.randint(0, 1000) / 1000))
+    time.sleep(delay)
+    return delay
+
+def is_rate_limit_error(error):
+    """Return True if an exception from googleapiclient or gspread reports an exhausted quota."""
+    status = getattr(getattr(error, 'resp', None), 'status', None)  # googleapiclient HttpError
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)  # gspread APIError
+    message = str(error)
+    return (str(status) == '429' or 'Quota exceeded' in message
+            or 'ratelimitexceeded' in message.lower().replace('_', ''))
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled continuously at a per-minute rate.
+
+    Callers take one token per request and sleep until the bucket can cover it, so requests are spread out at
+    the highest rate the quota sustains instead of bursting into 429 errors. The bucket counts how often a
+    caller had to wait (was saturated) and for how long.
+
+    Args:
+        name (str): Name used in reports.
+        rate_per_minute (float): Sustained number of requests per minute.
+        capacity (float, optional): Maximum burst size. Defaults to ten seconds worth of requests.
+    """
+
+    def __init__(self, name, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.saturated = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket, sleeping until they are available. Returns the time waited in seconds."""
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= tokens  # reserve now so concurrent callers queue up behind us
+            wait = max(0.0, -self.tokens / self.rate)
+            self.acquired += 1
+            if wait > 0:
+                self.saturated += 1
+                self.wait_seconds += wait
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def stats(self):
+        """Return the number of acquisitions, how many of them were throttled, and the total wait."""
+        return {
+            'bucket': self.name,
+            'requests': self.acquired,
+            'saturated': self.saturated,
+            'saturation_rate': self.saturated / self.acquired if self.acquired else 0.0,
+            'wait_seconds': round(self.wait_seconds, 3),
+        }
+
+
+class RequestScheduler:
+    """
+    Paces every Sheets and Drive call through per-kind token buckets and retries calls that hit a quota.
+
+    Sheets reads and writes have separate per-minute quotas, so they get separate buckets; Drive calls share a
+    third bucket. Rate-limit errors are retried with exponential backoff; other errors are raised immediately.
+
+    Every call is reported to the attached sinks (see instrumentation.py) as a record with its call type,
+    spreadsheet ID, workflow phase, latency, payload size, retry count and throttling delay.
+
+    Args:
+        quotas (dict, optional): Per-kind {'per_project': n, 'per_user': n} quotas. Defaults to API_QUOTAS.
+        max_attempts (int): Attempts per call before a rate-limit error is raised.
+        sinks (list, optional): Objects with a record(record) method that receive every call record.
+
+    Example:
+        >>> scheduler = RequestScheduler()
+        >>> response = scheduler.execute(service.spreadsheets().get(spreadsheetId=spreadsheet_id), 'read')
+    """
+
+    def __init__(self, quotas=None, max_attempts=8, clock=time.monotonic, sleep=time.sleep, sinks=None):
+        quotas = quotas or API_QUOTAS
+        self.buckets = {
+            kind: TokenBucket(kind, min(quota['per_project'], quota['per_user']), clock=clock, sleep=sleep)
+            for kind, quota in quotas.items()
+        }
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.sinks = list(sinks or [])
+
+    def add_sink(self, sink):
+        """Start reporting call records to sink."""
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+
+    def remove_sink(self, sink):
+        """Stop reporting call records to sink."""
+        with self._lock:
+            self.sinks = [s for s in self.sinks if s is not sink]
+
+    def call(self, func, kind, *args, max_attempts=None, call_info=None, **kwargs):
+        """
+        Call func(*args, **kwargs) once a token of the given kind is available, retrying on rate limits.
+
+        call_info is an optional (call type, spreadsheet ID, payload bytes) tuple for the sinks; it is derived
+        from func and its arguments when omitted.
+        """
+        max_attempts = max_attempts or self.max_attempts
+        bucket = self.buckets[kind]
+        sinks = self.sinks
+        attempt = 0
+        throttled = latency = 0.0
+        while True:
+            throttled += bucket.acquire()
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                latency += time.perf_counter() - start
+                if not is_rate_limit_error(e) or attempt >= max_attempts - 1:
+                    if sinks:
+                        self._emit(sinks, func, kind, args, kwargs, call_info, latency, attempt, throttled, False)
+                    raise
+                with self._lock:
+                    self.retries += 1
+                sleep_time = backoff(attempt)
+                throttled += sleep_time
+                print(f"Quota exceeded, retried after {sleep_time:.2f} seconds...")
+                attempt += 1
+            else:
+                if sinks:
+                    latency += time.perf_counter() - start
+                    self._emit(sinks, func, kind, args, kwargs, call_info, latency, attempt, throttled, True)
+                return result
+
+    def execute(self, request, kind='read', max_attempts=None):
+        """Execute a googleapiclient request through the bucket of the given kind."""
+        call_info = describe_request(request) if self.sinks else None
+        return self.call(request.execute, kind, max_attempts=max_attempts, call_info=call_info)
+
+    @staticmethod
+    def _emit(sinks, func, kind, args, kwargs, call_info, latency, retries, throttled, ok):
+        call, spreadsheet_id, payload_bytes = call_info or describe_call(func, args, kwargs)
+        record = {
+            'call': call, 'kind': kind, 'spreadsheet_id': spreadsheet_id, 'phase': current_phase(),
+            'latency': round(latency, 6), 'payload_bytes': payload_bytes, 'retries': retries,
+            'throttle_seconds': round(throttled, 6), 'ok': ok, 'timestamp': time.time(),
+        }
+        for sink in sinks:
+            sink.record(record)
+
+    def stats(self):
+        """Return the statistics of every bucket."""
+        return [bucket.stats() for bucket in self.buckets.values()]
+
+    def report(self):
+        """Print how often each bucket was saturated."""
+        for stats in self.stats():
+            if stats['requests']:
+                print(f"{stats['bucket']}: {stats['requests']} requests, saturated {stats['saturated']} times "
+                      f"({stats['saturation_rate']:.0%}), waited {stats['wait_seconds']:.1f}s")
+        if self.retries:
+            print(f"{self.retries} requests retried after quota errors")
+
+
+# Shared by every call made without an explicit session, so separate calls respect the same quotas
+default_scheduler = RequestScheduler()
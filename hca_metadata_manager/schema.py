@@ -0,0 +1,136 @@
+import re
+import numpy as np
+import pandas as pd
+from .utils import build_dropdowns_config, load_descriptions
+
+# Cell values that mean "no value" rather than an invalid one, compared case-insensitively after stripping
+MISSING_VALUES = ('', 'na', 'n/a', 'nan', 'none', 'not applicable', 'not_applicable', 'unknown')
+TRUE_VALUES = ('true', 't', 'yes', '1')
+FALSE_VALUES = ('false', 'f', 'no', '0')
+# Plain decimals only: float() would also accept dates written as 2022_12_10
+NUMBER = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+
+
+def _listed_values(cell):
+    """Split a Values or Examples cell of the descriptions into its ';'- or line-separated values."""
+    if pd.isna(cell):
+        return []
+    return [token.strip().strip('"') for token in re.split(r'[;\n]', str(cell)) if token.strip()]
+
+def infer_field_types(descriptions=None, metadata_dfs=None, num_header_rows=1):
+    """
+    Derive the type of every metadata field from the field descriptions and the schema dataframes.
+
+    A field is
+      - 'boolean' if its examples are true/false or its allowed values are TRUE/FALSE,
+      - 'numeric' if all of its examples are numbers,
+      - 'category' if the schema gives it allowed values (a dropdown), it is an ontology term, or the
+        descriptions list a few short options for it, e.g. 'tissue; organoid; cell culture'.
+    Other fields are free text and are left as they are. Coded fields whose options mix numbers and
+    placeholders, such as manner_of_death ('1; 2; 3; 4; 0; unknown; not applicable'), are categories.
+
+    Args:
+        descriptions (pd.DataFrame, optional): Field descriptions with 'Values' and 'Examples' rows, as returned
+            by load_descriptions. Defaults to the packaged metadata_descriptions.csv.
+        metadata_dfs (dict, optional): Schema DataFrames whose rows after the header rows hold allowed values.
+        num_header_rows (int): Number of header rows at the top of each schema DataFrame.
+
+    Returns:
+        dict: Field names mapped to 'category', 'numeric' or 'boolean'.
+    """
+    if descriptions is None:
+        descriptions = load_descriptions()
+    field_types = {}
+    for column in descriptions.columns:
+        # pandas renames repeated headers to name.1, name.2, ...; the first occurrence wins
+        field = re.sub(r'\.\d+$', '', str(column)).strip()
+        if field.startswith('Unnamed:') or field in field_types:
+            continue
+        values = _listed_values(descriptions[column].get('Values'))
+        examples = _listed_values(descriptions[column].get('Examples')) or values
+        known = [token for token in examples if token.lower() not in MISSING_VALUES]
+        if known and {token.lower() for token in known} <= {'true', 'false'}:
+            field_types[field] = 'boolean'
+        elif known and len(known) == len(examples) and all(NUMBER.match(token) for token in known):
+            field_types[field] = 'numeric'
+        elif field.endswith(('_ontology_term_id', '_ontology_term')):
+            field_types[field] = 'category'
+        elif any(len(options) > 1 and all(len(token) <= 40 for token in options) for options in (values, examples)):
+            field_types[field] = 'category'
+    for tab_config in build_dropdowns_config(metadata_dfs or {}, num_header_rows=num_header_rows).values():
+        for field, allowed in tab_config.items():
+            if {str(value).lower() for value in allowed} <= {'true', 'false'}:
+                field_types[field] = 'boolean'
+            else:
+                field_types[field] = 'category'
+    return field_types
+
+def _parse_unique(series, parse):
+    """Apply parse to the distinct stripped, lower-cased strings of a series and broadcast the result to every row."""
+    codes, uniques = pd.factorize(series)
+    parsed = parse(pd.Index(uniques).astype(str).str.strip().str.lower(), pd.Index(uniques).astype(str).str.strip())
+    # Rows with code -1 are None/NaN: missing, not invalid
+    values = np.append(parsed[0], parsed[2])[codes]
+    invalid = np.append(parsed[1], False)[codes]
+    return values, invalid
+
+def _parse_numbers(lowered, stripped):
+    numbers = pd.to_numeric(pd.Series(stripped), errors='coerce').to_numpy(dtype=float)
+    missing = lowered.isin(MISSING_VALUES)
+    numbers[missing] = np.nan
+    return numbers, ~missing & np.isnan(numbers), np.nan
+
+def _parse_booleans(lowered, stripped):
+    values = pd.array([True if value in TRUE_VALUES else False if value in FALSE_VALUES else pd.NA
+                       for value in lowered], dtype='boolean')
+    return values, ~lowered.isin(TRUE_VALUES + FALSE_VALUES + MISSING_VALUES), pd.NA
+
+def coerce_metadata_table(df, field_types, categorical=('worksheet',)):
+    """
+    Convert the string columns of a harvested table to compact, typed columns.
+
+    Category fields become pandas categoricals, numeric fields floats and boolean fields nullable booleans. Each
+    distinct value is parsed once and the result broadcast to every row, so the conversion is vectorized over
+    the table. Values listed in MISSING_VALUES become missing; values that cannot be parsed also become missing
+    and are flagged in the returned mask.
+
+    Args:
+        df (pd.DataFrame): A harvested table, e.g. one value of load_sheets_metadata.
+        field_types (dict): Field names mapped to 'category', 'numeric' or 'boolean', as from infer_field_types.
+        categorical (tuple): Further columns to store as categoricals.
+
+    Returns:
+        tuple: (coerced DataFrame, boolean DataFrame marking the unparseable cells of numeric and boolean fields).
+
+    Example:
+        >>> field_types = infer_field_types(metadata_dfs=metadata_dfs)
+        >>> donors, invalid = coerce_metadata_table(all_dfs['donor'], field_types)
+        >>> all_dfs['donor'][invalid['age']]
+    """
+    coerced, invalid = [], {}
+    for position, column in enumerate(df.columns):
+        series = df.iloc[:, position]
+        kind = 'category' if column in categorical else field_types.get(column)
+        if kind is None or df.columns.get_indexer_for([column]).size > 1:
+            coerced.append(series)  # free text, or a repeated header whose copies cannot share a type
+        elif kind == 'category':
+            coerced.append(series.astype('category'))
+        else:
+            parse = _parse_numbers if kind == 'numeric' else _parse_booleans
+            values, invalid[column] = _parse_unique(series, parse)
+            coerced.append(pd.Series(values, index=df.index, name=column,
+                                     dtype='float64' if kind == 'numeric' else 'boolean'))
+    result = pd.concat(coerced, axis=1) if coerced else df.copy()
+    return result, pd.DataFrame(invalid, index=df.index)
+
+def coerce_metadata_tables(all_dfs, field_types, categorical=('worksheet',)):
+    """
+    Apply coerce_metadata_table to every metadata type of a harvest.
+
+    Returns:
+        tuple: (metadata types mapped to coerced DataFrames, metadata types mapped to invalid-value masks).
+    """
+    coerced, invalid = {}, {}
+    for metadata_type, df in all_dfs.items():
+        coerced[metadata_type], invalid[metadata_type] = coerce_metadata_table(df, field_types, categorical)
+    return coerced, invalid
@@ -0,0 +1,118 @@
+import threading
+import httplib2
+import gspread
+import google_auth_httplib2
+from googleapiclient.discovery import build
+from .scheduler import default_scheduler
+
+
+def _memoize_collections(resource):
+    """
+    Make the collection accessors of a discovery resource (e.g. service.spreadsheets().values()) return one
+    cached object. googleapiclient otherwise rebuilds every method of the collection, docstrings included,
+    on each access, which costs more CPU than serving the request itself.
+    """
+    for name in resource._resourceDesc.get('resources', {}):
+        def accessor(build_collection=getattr(resource, name), cached=[]):
+            if not cached:
+                cached.append(_memoize_collections(build_collection()))
+            return cached[0]
+        setattr(resource, name, accessor)
+    return resource
+
+
+class SheetsSession:
+    """
+    Holds the Google API clients and spreadsheet metadata shared across a run.
+
+    Building a discovery service re-parses the discovery document and opens a new connection, so the
+    session builds the Sheets and Drive services once (per thread, as httplib2 connections are not
+    thread-safe) over keep-alive HTTP transports and reuses them for every call. The gspread client
+    shares a single pooled requests session. Spreadsheet metadata fetched through the session is cached
+    per spreadsheet until a write to that spreadsheet invalidates it.
+
+    Args:
+        credentials: Google API credentials.
+        gc (gspread.client.Client, optional): An authorized gspread client to reuse. Created lazily if omitted.
+        http_factory (callable, optional): Returns a new httplib2-compatible transport. Defaults to an
+            authorized keep-alive httplib2.Http.
+        timeout (int): Socket timeout in seconds for the default transport.
+        scheduler (RequestScheduler, optional): Paces the session's API calls. Defaults to the shared scheduler.
+
+    Example:
+        >>> session = SheetsSession(credentials)
+        >>> sheets_info = fetch_sheets_with_indices('your_spreadsheet_id', credentials, session=session)
+    """
+
+    def __init__(self, credentials, gc=None, http_factory=None, timeout=60, scheduler=None):
+        self.credentials = credentials
+        self.scheduler = scheduler if scheduler is not None else default_scheduler
+        self._gc = gc
+        self._http_factory = http_factory
+        self._timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._metadata_cache = {}
+
+    def _new_http(self):
+        if self._http_factory is not None:
+            return self._http_factory()
+        return google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self._timeout))
+
+    def _service(self, api_name, api_version):
+        services = getattr(self._local, 'services', None)
+        if services is None:
+            services = self._local.services = {}
+        key = (api_name, api_version)
+        if key not in services:
+            services[key] = _memoize_collections(
+                build(api_name, api_version, http=self._new_http(), cache_discovery=False))
+        return services[key]
+
+    @property
+    def sheets(self):
+        """The Sheets v4 service for the calling thread."""
+        return self._service('sheets', 'v4')
+
+    @property
+    def drive(self):
+        """The Drive v3 service for the calling thread."""
+        return self._service('drive', 'v3')
+
+    @property
+    def gc(self):
+        """The shared gspread client."""
+        with self._lock:
+            if self._gc is None:
+                self._gc = gspread.authorize(self.credentials)
+            return self._gc
+
+    def get_metadata(self, spreadsheet_id, fields='sheets(properties)'):
+        """
+        Return spreadsheet metadata for the given field mask, fetching it only if it is not cached.
+
+        Args:
+            spreadsheet_id (str): The ID of the Google Spreadsheet.
+            fields (str): The field mask passed to spreadsheets.get.
+
+        Returns:
+            dict: The spreadsheets.get response.
+        """
+        key = (spreadsheet_id, fields)
+        with self._lock:
+            cached = self._metadata_cache.get(key)
+        if cached is None:
+            request = self.sheets.spreadsheets().get(spreadsheetId=spreadsheet_id, fields=fields)
+            cached = self.scheduler.execute(request, 'read')
+            with self._lock:
+                self._metadata_cache[key] = cached
+        return cached
+
+    def invalidate(self, spreadsheet_id=None):
+        """Drop cached metadata for one spreadsheet, or for all spreadsheets if no ID is given."""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._metadata_cache.clear()
+            else:
+                for key in [key for key in self._metadata_cache if key[0] == spreadsheet_id]:
+                    del self._metadata_cache[key]
@@ -0,0 +1,151 @@
+import glob
+import os
+from urllib.parse import quote
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITIONING = ds.partitioning(pa.schema([('worksheet', pa.string())]), flavor='hive')
+
+
+def _unique_headers(columns):
+    """Rename blank and repeated sheet headers, which Parquet does not allow, to column_<i> and <name>_<n>."""
+    seen, headers = {}, []
+    for position, column in enumerate(columns):
+        name = str(column) if column is not None and str(column).strip() else f'column_{position}'
+        seen[name] = seen.get(name, 0) + 1
+        headers.append(name if seen[name] == 1 else f'{name}_{seen[name]}')
+    return headers
+
+
+class MetadataStore:
+    """
+    Columnar on-disk store of harvested metadata: one Parquet dataset per metadata type, partitioned by worksheet.
+
+    Tables are written as <root>/<metadata_type>/worksheet=<worksheet>/<spreadsheet_id>.<n>.parquet with every
+    value stored as a dictionary-encoded string, so the few distinct values of metadata fields compress well.
+    Reads go through pyarrow.dataset: only the requested columns are read (projection) and only the matching
+    worksheet partitions are opened (predicate pushdown), which makes reloading a harvest a local read instead of
+    minutes of API calls. Rewriting a spreadsheet replaces its previous tables. Requires pyarrow.
+
+    Blank and repeated sheet headers are renamed to column_<i> and <name>_<n>.
+
+    Args:
+        root (str): Directory holding the datasets. Created if missing.
+
+    Example:
+        >>> store = MetadataStore('atlas_metadata')
+        >>> store.write(iter_sheets_metadata(credentials, iter_google_sheets(credentials, folder_id), max_workers=4))
+        >>> donors = store.load('donor', columns=['donor_id', 'sex_ontology_term_id'], worksheets=['Study1'])
+        >>> check_completeness(donors)
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def metadata_types(self):
+        """Return the metadata types in the store."""
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def remove(self, spreadsheet_id):
+        """Delete every table of a spreadsheet."""
+        for path in glob.glob(os.path.join(glob.escape(self.root), '*', '*', f'{glob.escape(spreadsheet_id)}.*.parquet')):
+            os.remove(path)
+
+    def write_table(self, spreadsheet_id, metadata_type, df, position=0):
+        """
+        Write one harvested table, which must have a 'worksheet' column, into its worksheet partitions.
+
+        Returns:
+            int: The number of rows written.
+        """
+        if 'worksheet' not in df.columns:
+            raise ValueError(f"Table {metadata_type} of {spreadsheet_id} has no 'worksheet' column")
+        values = df.drop(columns='worksheet')
+        headers = _unique_headers(values.columns)
+        for worksheet, rows in df.groupby('worksheet', sort=False, dropna=False).indices.items():
+            part = values.iloc[rows]
+            arrays = [pa.array(part.iloc[:, i].astype('string'), type=pa.string(), from_pandas=True).dictionary_encode()
+                      for i in range(part.shape[1])]
+            directory = os.path.join(self.root, metadata_type, f"worksheet={quote(str(worksheet), safe='')}")
+            os.makedirs(directory, exist_ok=True)
+            pq.write_table(pa.Table.from_arrays(arrays, names=headers),
+                           os.path.join(directory, f'{spreadsheet_id}.{position}.parquet'))
+        return len(df)
+
+    def write(self, stream):
+        """
+        Write streamed tables, replacing the stored tables of every spreadsheet in the stream.
+
+        Only one table is held in memory at a time, so folders of any size can be written.
+
+        Args:
+            stream (iterable): (spreadsheet_id, metadata_type, DataFrame) tuples, as yielded by iter_sheets_metadata.
+
+        Returns:
+            dict: Metadata types mapped to the number of rows written.
+        """
+        positions, rows = {}, {}
+        for spreadsheet_id, metadata_type, df in stream:
+            if spreadsheet_id not in positions:
+                self.remove(spreadsheet_id)
+                positions[spreadsheet_id] = 0
+            rows[metadata_type] = rows.get(metadata_type, 0) + self.write_table(
+                spreadsheet_id, metadata_type, df, position=positions[spreadsheet_id])
+            positions[spreadsheet_id] += 1
+        return rows
+
+    def write_tables(self, all_dfs):
+        """
+        Write the output of load_sheets_metadata, replacing any tables stored for the same worksheets.
+
+        Args:
+            all_dfs (dict): Metadata types mapped to DataFrames with a 'worksheet' column.
+        """
+        for metadata_type, df in all_dfs.items():
+            for worksheet, rows in df.groupby('worksheet', sort=False, dropna=False).indices.items():
+                # The key replaces the spreadsheet ID in file names, which must not contain '.'
+                key = quote(f'{metadata_type}_{worksheet}', safe='').replace('.', '%2E')
+                self.remove(key)
+                self.write_table(key, metadata_type, df.iloc[rows])
+
+    def dataset(self, metadata_type):
+        """
+        Return the pyarrow dataset of a metadata type. Spreadsheets with different columns are read with the
+        union of their columns; missing columns read as nulls.
+        """
+        path = os.path.join(self.root, metadata_type)
+        if not os.path.isdir(path):
+            raise KeyError(f'No {metadata_type} metadata in {self.root}')
+        dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+        schema = pa.unify_schemas([fragment.physical_schema for fragment in dataset.get_fragments()]
+                                  + [PARTITIONING.schema])
+        return ds.dataset(path, schema=schema, format='parquet', partitioning=PARTITIONING)
+
+    def load(self, metadata_type, columns=None, worksheets=None, filter=None, categories=False):
+        """
+        Read a metadata type into a DataFrame, reading only the requested columns and worksheets.
+
+        Args:
+            metadata_type (str): E.g. 'donor'.
+            columns (list, optional): Columns to read. Defaults to every column plus 'worksheet'.
+            worksheets (list, optional): Worksheets to read; the other partitions are not opened.
+            filter (pyarrow.dataset.Expression, optional): Further row filter, e.g. ds.field('sex') == 'female'.
+            categories (bool): Return pandas categoricals instead of strings, using less memory.
+
+        Returns:
+            pandas.DataFrame: One row per stored row, with None for missing values.
+        """
+        dataset = self.dataset(metadata_type)
+        if columns is None:
+            columns = [name for name in dataset.schema.names if name != 'worksheet'] + ['worksheet']
+        else:
+            columns = [name for name in columns if name in dataset.schema.names]
+        if worksheets is not None:
+            selected = ds.field('worksheet').isin(list(worksheets))
+            filter = selected if filter is None else filter & selected
+        table = dataset.to_table(columns=columns, filter=filter)
+        if not categories:
+            table = table.cast(pa.schema([pa.field(field.name, pa.string()) for field in table.schema]))
+        return table.to_pandas()
@@ -0,0 +1,126 @@
+import os
+import json
+from .utils import (
+    SPREADSHEET_MIME_TYPE, _drive_service, _thread_sheets_service, _load_spreadsheet_tables, execute_request,
+    list_google_sheets, map_spreadsheets, merge_metadata_tables
+)
+
+CHANGES_FIELDS = ('nextPageToken,newStartPageToken,'
+                  'changes(fileId,removed,file(id,name,mimeType,parents,trashed,modifiedTime,version))')
+CHECKPOINTS_FILE = 'sync_checkpoints.json'
+
+def load_checkpoint(cache_dir, folder_id):
+    """Return the saved Drive changes page token for a folder, or None if the folder was never synced."""
+    path = os.path.join(cache_dir, CHECKPOINTS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get(folder_id)
+
+def save_checkpoint(cache_dir, folder_id, page_token):
+    """Save the Drive changes page token to resume from on the next sync of a folder."""
+    path = os.path.join(cache_dir, CHECKPOINTS_FILE)
+    checkpoints = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            checkpoints = json.load(f)
+    checkpoints[folder_id] = page_token
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoints, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def get_start_page_token(credentials, session=None):
+    """Return the Drive changes page token marking the current state of the drive."""
+    service = _drive_service(credentials, session)
+    response = execute_request(service.changes().getStartPageToken(supportsAllDrives=True), 'drive', session)
+    return response['startPageToken']
+
+def fetch_folder_changes(credentials, folder_id, page_token, session=None):
+    """
+    List the spreadsheets in a folder that changed since a Drive changes page token.
+
+    Args:
+        credentials: Google API credentials.
+        folder_id (str): The ID of the folder in Google Drive.
+        page_token (str): Page token from get_start_page_token or a previous call.
+        session (SheetsSession, optional): Shared session providing the Drive client.
+
+    Returns:
+        tuple: (changed, removed, new_page_token). changed lists spreadsheet info dictionaries for spreadsheets
+        created or modified in the folder; removed lists the IDs of files that were deleted, trashed or are no
+        longer in the folder. The Changes API reports changes for the whole drive and a deleted file has no
+        parents, so removed also holds files that were never in the folder. Both hold each file at most once,
+        reflecting its latest change.
+    """
+    service = _drive_service(credentials, session)
+    latest = {}
+    while True:
+        request = service.changes().list(pageToken=page_token, spaces='drive', pageSize=1000, includeRemoved=True,
+                                         supportsAllDrives=True, includeItemsFromAllDrives=True, fields=CHANGES_FIELDS)
+        response = execute_request(request, 'drive', session)
+        for change in response.get('changes', []):
+            latest[change['fileId']] = change  # later changes to the same file supersede earlier ones
+        if 'newStartPageToken' in response:
+            new_page_token = response['newStartPageToken']
+            break
+        page_token = response['nextPageToken']
+    changed, removed = [], []
+    for file_id, change in latest.items():
+        file = change.get('file') or {}
+        if file.get('mimeType', SPREADSHEET_MIME_TYPE) != SPREADSHEET_MIME_TYPE:
+            continue
+        if change.get('removed') or file.get('trashed') or folder_id not in file.get('parents', []):
+            removed.append(file_id)
+        else:
+            changed.append({key: file.get(key) for key in ('id', 'name', 'modifiedTime', 'version', 'parents')})
+    return changed, removed, new_page_token
+
+def sync_folder_metadata(credentials, folder_id, cache, session=None, max_workers=1):
+    """
+    Bring the local metadata store for a folder up to date and return its harvested metadata.
+
+    The first run harvests the whole folder and saves a Drive changes checkpoint. Later runs only fetch the
+    spreadsheets created or modified since the checkpoint and drop the ones deleted, trashed or moved away,
+    so a run costs O(changed) API calls instead of a sweep of the folder. Cached entries of other folders
+    sharing the cache are left untouched. The checkpoint only advances when every changed spreadsheet was
+    loaded, so a failed spreadsheet is retried on the next run.
+
+    Args:
+        credentials: Google API credentials.
+        folder_id (str): The ID of the folder in Google Drive.
+        cache (SheetCache): The local metadata store, updated in place.
+        session (SheetsSession, optional): Shared session providing the API clients.
+        max_workers (int): Number of spreadsheets loaded concurrently.
+
+    Returns:
+        dict: Metadata types mapped to DataFrames covering every spreadsheet of the folder in the store.
+
+    Example:
+        >>> cache = SheetCache('metadata_cache')
+        >>> metadata = sync_folder_metadata(credentials, folder_id, cache)
+    """
+    page_token = load_checkpoint(cache.cache_dir, folder_id)
+    if page_token is None:
+        # Take the token before listing so changes made during the full sweep are picked up next time
+        new_page_token = get_start_page_token(credentials, session=session)
+        changed = list_google_sheets(credentials, folder_id, session=session)
+        listed = {sheet_info['id'] for sheet_info in changed}
+        removed = [entry['id'] for entry in cache.entries(folder_id) if entry['id'] not in listed]
+    else:
+        changed, removed, new_page_token = fetch_folder_changes(credentials, folder_id, page_token, session=session)
+        # Changes cover the whole drive: only drop spreadsheets cached for this folder, not other folders' entries
+        cached = {entry['id'] for entry in cache.entries(folder_id)}
+        removed = [spreadsheet_id for spreadsheet_id in removed if spreadsheet_id in cached]
+    print(f"Syncing folder {folder_id}: {len(changed)} changed, {len(removed)} removed spreadsheets")
+
+    for spreadsheet_id in removed:
+        cache.remove(spreadsheet_id)
+    get_service = _thread_sheets_service(credentials, session)
+    results = map_spreadsheets(lambda sheet_info: _load_spreadsheet_tables(get_service, sheet_info, session, cache),
+                               changed, max_workers=max_workers)
+    if all(tables is not None for tables in results):
+        save_checkpoint(cache.cache_dir, folder_id, new_page_token)
+    else:
+        print("Some spreadsheets failed to load; keeping the previous checkpoint so they are retried next run.")
+
+    return merge_metadata_tables(cache.load(entry['id']) for entry in cache.entries(folder_id))
@@ -9,16 +9,26 @@ from googleapiclient.discovery import build
 import traceback
 from .gdrive_config import GOOGLE_API_CONFIG, authenticate_with_google
 from .config import authenticate_with_google
+from .session import SheetsSession
+from .scheduler import default_scheduler
+from .instrumentation import in_current_phase, phase
 import pandas as pd
 import pkg_resources
-import time
-import random
-
-def backoff(attempt, max_delay=60):
-    """ Calculate sleep time in seconds for exponential backoff. """
-    delay = min(max_delay, (2 ** attempt) + (random.randint(0, 1000) / 1000))
-    time.sleep(delay)
-    return delay
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+# The Sheets API rejects oversized request bodies; stay comfortably under its payload limit
+MAX_BATCH_UPDATE_BYTES = 2 * 1024 * 1024
+
+SPREADSHEET_MIME_TYPE = 'application/vnd.google-apps.spreadsheet'
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# Everything later stages need from Drive, so spreadsheets never need a separate metadata request
+LIST_FILES_FIELDS = 'nextPageToken,files(id,name,mimeType,modifiedTime,version,size,parents)'
+HEADER_STATE_FIELDS = ('sheets(properties(sheetId,title,gridProperties(rowCount)),'
+                       'data(rowData(values(formattedValue,dataValidation))))')
 
 def convert_numeric_to_string(data):
     if isinstance(data, dict):
@@ -30,6 +40,128 @@ def convert_numeric_to_string(data):
     else:
         return data
 
+def _scheduler(session=None):
+    return session.scheduler if session is not None else default_scheduler
+
+def execute_request(request, kind='read', session=None, max_attempts=None):
+    """
+    Execute a googleapiclient request through the request scheduler.
+
+    Args:
+        request: The googleapiclient request to execute.
+        kind (str): Quota bucket to draw from: 'read' or 'write' for Sheets, 'drive' for Drive.
+        session (SheetsSession, optional): Session whose scheduler paces the call. Defaults to the shared scheduler.
+        max_attempts (int, optional): Attempts before a rate-limit error is raised.
+
+    Returns:
+        dict: The API response.
+    """
+    return _scheduler(session).execute(request, kind, max_attempts=max_attempts)
+
+def call_api(func, *args, kind='read', session=None, **kwargs):
+    """Call a gspread method through the request scheduler, e.g. call_api(gc.open_by_key, key, kind='read')."""
+    return _scheduler(session).call(func, kind, *args, **kwargs)
+
+def _sheets_service(credentials, session=None):
+    if session is not None:
+        return session.sheets
+    return build('sheets', 'v4', credentials=credentials)
+
+def _drive_service(credentials, session=None):
+    if session is not None:
+        return session.drive
+    return build('drive', 'v3', credentials=credentials)
+
+def _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session=None, fields='sheets(properties)'):
+    if session is not None:
+        return session.get_metadata(spreadsheet_id, fields=fields)
+    service = build('sheets', 'v4', credentials=credentials)
+    return execute_request(service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields=fields), 'read')
+
+def _metadata_reads(lookups, session=None):
+    """
+    Return the read requests made by lookups consecutive _fetch_spreadsheet_metadata calls for one spreadsheet
+    with no write in between: a session fetches the metadata once and serves the other lookups from its cache.
+    """
+    return min(lookups, 1) if session is not None else lookups
+
+def _thread_sheets_service(credentials, session=None):
+    """Return a callable giving each worker thread its own Sheets service, as httplib2 is not thread-safe."""
+    local = threading.local()
+    def get_service():
+        if session is not None:
+            return session.sheets
+        if not hasattr(local, 'service'):
+            local.service = build('sheets', 'v4', credentials=credentials)
+        return local.service
+    return get_service
+
+def _thread_drive_service(credentials, session=None):
+    """Return a callable giving each worker thread its own Drive service."""
+    local = threading.local()
+    def get_service():
+        if session is not None:
+            return session.drive
+        if not hasattr(local, 'service'):
+            local.service = build('drive', 'v3', credentials=credentials)
+        return local.service
+    return get_service
+
+def map_spreadsheets(func, items, max_workers=1):
+    """
+    Apply func to every item, optionally across a bounded thread pool, returning results in input order.
+
+    Args:
+        func (callable): Function applied to each item. It should handle its own errors.
+        items (list): Items to process, e.g. spreadsheet info dictionaries from list_google_sheets.
+        max_workers (int): Number of worker threads. 1 processes the items sequentially.
+
+    Returns:
+        list: The results of func, in the same order as items.
+    """
+    return list(imap_spreadsheets(func, items, max_workers=max_workers))
+
+def imap_spreadsheets(func, items, max_workers=1):
+    """
+    Lazily apply func to every item, optionally across a bounded thread pool, yielding results in input order.
+
+    Items are consumed as needed and at most max_workers items are in flight, so memory stays bounded by a few
+    results however many items there are. items may itself be a generator, e.g. iter_google_sheets.
+
+    Args:
+        func (callable): Function applied to each item. It should handle its own errors.
+        items (iterable): Items to process.
+        max_workers (int): Number of worker threads. 1 processes the items sequentially.
+
+    Yields:
+        The result of func for each item, in the same order as items.
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    func = in_current_phase(func)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _reads_made(session=None):
+    """Return the number of Sheets read requests the scheduler has paced so far."""
+    return _scheduler(session).buckets['read'].acquired
+
+def _drive_calls_made(session=None):
+    """Return the number of Drive requests the scheduler has paced so far."""
+    return _scheduler(session).buckets['drive'].acquired
+
+def _invalidate(session, spreadsheet_id):
+    if session is not None:
+        session.invalidate(spreadsheet_id)
+
 def initialize_google_sheets():
     """
     Initializes and returns a Google Sheets client authorized with OAuth2 credentials.
@@ -46,7 +178,32 @@ def initialize_google_sheets():
     gc = gspread.authorize(creds)
     return gc
 
-def upload_to_sheet(df, gc, spreadsheet_id, title):
+def initialize_session():
+    """
+    Initializes and returns a SheetsSession sharing one Sheets, Drive and gspread client.
+
+    Returns:
+        SheetsSession: A session that can be passed as `session=` to the functions in this package.
+
+    Example:
+        >>> session = initialize_session()
+        >>> sheets = list_google_sheets(session.credentials, 'your_folder_id_here', session=session)
+    """
+    creds = authenticate_with_google(GOOGLE_API_CONFIG['scopes'], GOOGLE_API_CONFIG['credentials_file'])
+    return SheetsSession(creds, gc=gspread.authorize(creds))
+
+def dataframe_to_values(df):
+    """
+    Return the header row followed by the data rows of a DataFrame, with missing values and inf replaced by None.
+
+    The cells are masked in one vectorized pass over an object array, which is then converted to lists once.
+    """
+    values = df.to_numpy(dtype=object, copy=True)
+    values[df.isna().to_numpy(dtype=bool) | df.isin([np.inf, -np.inf]).to_numpy(dtype=bool)] = None
+    return [df.columns.tolist()] + values.tolist()
+
+@phase('upload')
+def upload_to_sheet(df, gc, spreadsheet_id, title, session=None):
     """
     Uploads data from a DataFrame to a specific Google Sheet, cleaning the data beforehand.
 
@@ -58,6 +215,7 @@ def upload_to_sheet(df, gc, spreadsheet_id, title):
         gc (gspread.client.Client): An authorized Google Sheets client instance.
         spreadsheet_id (str): The ID of the Google Spreadsheet to update.
         title (str): The title of the worksheet to update or create.
+        session (SheetsSession, optional): Shared session whose cached metadata is invalidated by the upload.
 
     Returns:
         gspread.models.Spreadsheet: The updated Google Spreadsheet object.
@@ -67,22 +225,79 @@ def upload_to_sheet(df, gc, spreadsheet_id, title):
         >>> df = pandas.DataFrame({'A': [1, 2], 'B': [3, 4]})
         >>> spreadsheet = upload_to_sheet(df, gc, 'your_spreadsheet_id_here', 'Sheet1')
     """
-    df_cleaned = df.replace([np.nan, np.inf, -np.inf], None)  # Clean the DataFrame
-    spreadsheet = gc.open_by_key(spreadsheet_id)  # Open the spreadsheet
+    spreadsheet = call_api(gc.open_by_key, spreadsheet_id, kind='read', session=session)  # Open the spreadsheet
 
     try:
-        worksheet = spreadsheet.worksheet(title)
-        worksheet.clear()  # Clear existing content before update
-        worksheet.resize(rows=len(df_cleaned) + 1, cols=len(df_cleaned.columns))  # Resize if needed
+        worksheet = call_api(spreadsheet.worksheet, title, kind='read', session=session)
+        call_api(worksheet.clear, kind='write', session=session)  # Clear existing content before update
+        call_api(worksheet.resize, rows=len(df) + 1, cols=len(df.columns), kind='write', session=session)  # Resize if needed
     except gspread.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(title=title, rows=1000, cols=str(len(df_cleaned.columns)))
+        worksheet = call_api(spreadsheet.add_worksheet, title=title, rows=1000, cols=str(len(df.columns)), kind='write', session=session)
 
-    values_to_upload = [df_cleaned.columns.tolist()] + df_cleaned.values.tolist()
-    worksheet.update(values_to_upload)  # Update worksheet with new values
+    values_to_upload = dataframe_to_values(df)  # NaN, inf and -inf become empty cells
+    call_api(worksheet.update, values_to_upload, kind='write', session=session)  # Update worksheet with new values
+    _invalidate(session, spreadsheet_id)
 
     return spreadsheet
 
-def add_empty_rows(spreadsheet_id, gc, num_rows):
+@phase('upload')
+def upload_tables(tables, spreadsheet_id, credentials, session=None, delete_tabs=()):
+    """
+    Upload several DataFrames to tabs of a spreadsheet in two write requests, whatever the number of tabs.
+
+    One structural batchUpdate clears and resizes the existing tabs, adds the missing ones and deletes the tabs
+    in delete_tabs; one values.batchUpdate then writes every table. Either is skipped if it has nothing to do. Each tab ends up as upload_to_sheet leaves
+    it: the column names in the first row and the data below, with NaN, inf and -inf left empty.
+
+    Args:
+        tables (dict): Tab titles mapped to DataFrames.
+        spreadsheet_id (str): The ID of the Google Spreadsheet.
+        credentials: Google API credentials.
+        session (SheetsSession, optional): Shared session providing the client and cached tab metadata.
+        delete_tabs (tuple): Titles of tabs to delete if present, e.g. ('Sheet1',) for a new spreadsheet.
+
+    Returns:
+        dict: Summary with the number of 'tabs' written, 'added' and 'deleted', and the 'requests' sent, including
+            the tab metadata read unless a session served it from its cache.
+
+    Example:
+        >>> upload_tables({'donor metadata': donor_df, 'sample metadata': sample_df}, file_id, credentials,
+        ...               session=session, delete_tabs=('Sheet1',))
+    """
+    reads_before = _reads_made(session)
+    metadata = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
+    sent = _reads_made(session) - reads_before
+    existing = {sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in metadata.get('sheets', [])}
+    requests, added = [], 0
+    for title, df in tables.items():
+        if title in existing:
+            sheet_id = existing[title]
+            requests.append({'updateCells': {'range': {'sheetId': sheet_id}, 'fields': 'userEnteredValue'}})
+            requests.append({'updateSheetProperties': {
+                'properties': {'sheetId': sheet_id, 'gridProperties': {'rowCount': len(df) + 1, 'columnCount': len(df.columns)}},
+                'fields': 'gridProperties(rowCount,columnCount)'}})
+        else:
+            added += 1
+            requests.append({'addSheet': {'properties': {
+                'title': title, 'gridProperties': {'rowCount': max(1000, len(df) + 1), 'columnCount': len(df.columns)}}}})
+    # Deletions go last so that a spreadsheet never runs out of tabs
+    deleted = [title for title in delete_tabs if title in existing and title not in tables]
+    requests += [{'deleteSheet': {'sheetId': existing[title]}} for title in deleted]
+    service = _sheets_service(credentials, session)
+    if requests:
+        execute_request(service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body={'requests': requests}),
+                        'write', session)
+        sent += 1
+    data = [{'range': f"{quote_sheet_title(title)}!A1", 'values': dataframe_to_values(df)} for title, df in tables.items()]
+    if data:
+        execute_request(service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id, body={'valueInputOption': 'RAW', 'data': data}), 'write', session)
+        sent += 1
+    if requests or data:
+        _invalidate(session, spreadsheet_id)
+    return {'tabs': len(tables), 'added': added, 'deleted': len(deleted), 'requests': sent}
+
+def add_empty_rows(spreadsheet_id, gc, num_rows, session=None):
     """
     Add rows to the Google Sheet specified by the spreadsheet_id.
 
@@ -90,8 +305,9 @@ def add_empty_rows(spreadsheet_id, gc, num_rows):
         spreadsheet_id (str): The ID of the Google Sheet.
         gc (gspread.client.Client): An authorized Google Sheets client instance.
         num_rows (int): Number of rows to add.
+        session (SheetsSession, optional): Shared session whose cached metadata is invalidated by the write.
     """
-    spreadsheet = gc.open_by_key(spreadsheet_id)
+    spreadsheet = call_api(gc.open_by_key, spreadsheet_id, kind='read', session=session)
     requests = [{
         "appendCells": {
             "sheetId": 0,  # Assuming you're working with the first sheet
@@ -100,9 +316,13 @@ def add_empty_rows(spreadsheet_id, gc, num_rows):
         }
     }]
     
-    spreadsheet.batch_update({'requests': requests})
+    call_api(spreadsheet.batch_update, {'requests': requests}, kind='write', session=session)
+    _invalidate(session, spreadsheet_id)
+
+# gspread reads delete_sheet makes to look the worksheet up: open_by_key and worksheet
+DELETE_SHEET_READS = 2
 
-def delete_sheet(spreadsheet_id, sheet_title, gc):
+def delete_sheet(spreadsheet_id, sheet_title, gc, session=None):
     """
     Deletes a specific worksheet from a Google Spreadsheet based on the title.
 
@@ -110,6 +330,7 @@ def delete_sheet(spreadsheet_id, sheet_title, gc):
         spreadsheet_id (str): The ID of the Google Spreadsheet from which to delete the worksheet.
         sheet_title (str): The title of the worksheet to delete.
         gc (gspread.client.Client): An authorized Google Sheets client instance.
+        session (SheetsSession, optional): Shared session whose cached metadata is invalidated by the deletion.
 
     Returns:
         dict: A response from the Google Sheets API after deleting the worksheet.
@@ -118,8 +339,8 @@ def delete_sheet(spreadsheet_id, sheet_title, gc):
         >>> gc = initialize_google_sheets()
         >>> response = delete_sheet('your_spreadsheet_id_here', 'Sheet1', gc)
     """
-    spreadsheet = gc.open_by_key(spreadsheet_id)
-    sheet = spreadsheet.worksheet(sheet_title)
+    spreadsheet = call_api(gc.open_by_key, spreadsheet_id, kind='read', session=session)
+    sheet = call_api(spreadsheet.worksheet, sheet_title, kind='read', session=session)
     sheet_id = sheet._properties['sheetId']
     
     requests = [{
@@ -129,21 +350,81 @@ def delete_sheet(spreadsheet_id, sheet_title, gc):
     }]
     
     body = {"requests": requests}
-    response = spreadsheet.batch_update(body)
+    response = call_api(spreadsheet.batch_update, body, kind='write', session=session)
+    _invalidate(session, spreadsheet_id)
     return response
 
-def list_google_sheets(creds, folder_id):
+def _list_folder(get_service, folder_id, session=None, page_size=1000):
+    """Return every spreadsheet and subfolder directly inside a folder, following nextPageToken."""
+    query = (f"'{folder_id}' in parents and trashed=false and "
+             f"(mimeType='{SPREADSHEET_MIME_TYPE}' or mimeType='{FOLDER_MIME_TYPE}')")
+    files, page_token = [], None
+    while True:
+        request = get_service().files().list(q=query, pageSize=page_size, pageToken=page_token, fields=LIST_FILES_FIELDS,
+                                             supportsAllDrives=True, includeItemsFromAllDrives=True)
+        response = execute_request(request, 'drive', session)
+        files.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return files
+
+def iter_google_sheets(creds, folder_id, session=None, recursive=True, max_workers=4, page_size=1000):
+    """
+    Stream the Google Sheets in a Drive folder, including shared drives, optionally walking its subfolders.
+
+    Every folder listing follows nextPageToken, so large folders are never truncated. Subfolders are walked
+    breadth-first, listing all folders of a level concurrently. Spreadsheets are yielded as soon as the
+    listing of their folder completes, each with the Drive metadata later stages need.
+
+    Args:
+        creds (google.auth.credentials.Credentials): The OAuth2 credentials for accessing Google Drive.
+        folder_id (str): The ID of the folder in Google Drive.
+        session (SheetsSession, optional): Shared session providing the Drive client.
+        recursive (bool): Whether to include spreadsheets in nested folders.
+        max_workers (int): Number of folders listed concurrently.
+        page_size (int): Number of files requested per page.
+
+    Yields:
+        dict: 'id', 'name', 'mimeType', 'modifiedTime', 'version', 'size' and 'parents' of a spreadsheet.
+
+    Example:
+        >>> for sheet in iter_google_sheets(creds, 'your_folder_id_here'):
+        ...     print(sheet['name'], sheet['modifiedTime'])
+    """
+    get_service = _thread_drive_service(creds, session)
+    seen_folders, seen_files = {folder_id}, set()
+    level = [folder_id]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while level:
+            list_folder = in_current_phase(_list_folder)
+            futures = [executor.submit(list_folder, get_service, folder, session, page_size) for folder in level]
+            level = []
+            for future in futures:  # in submission order, so the output order is deterministic
+                for item in future.result():
+                    if item['mimeType'] == FOLDER_MIME_TYPE:
+                        if recursive and item['id'] not in seen_folders:
+                            seen_folders.add(item['id'])
+                            level.append(item['id'])
+                    elif item['id'] not in seen_files:
+                        seen_files.add(item['id'])
+                        yield item
+
+def list_google_sheets(creds, folder_id, session=None, recursive=False, max_workers=4):
     """
     Lists all Google Sheets within a specified Google Drive folder.
 
     This function retrieves the names and IDs of all spreadsheets in a given folder, printing them and returning a list.
+    See iter_google_sheets for streaming the listing.
 
     Args:
         creds (google.auth.credentials.Credentials): The OAuth2 credentials for accessing Google Drive.
         folder_id (str): The ID of the folder in Google Drive.
+        session (SheetsSession, optional): Shared session providing the Drive client.
+        recursive (bool): Whether to include spreadsheets in nested folders.
+        max_workers (int): Number of folders listed concurrently when recursive.
 
     Returns:
-        list: A list of dictionaries where each dictionary contains 'id' and 'name' of a spreadsheet.
+        list: A list of dictionaries where each dictionary contains 'id', 'name', 'mimeType', 'modifiedTime', 'version', 'size' and 'parents' of a spreadsheet.
 
     Example:
         >>> creds = authenticate_with_google(scopes)
@@ -151,10 +432,7 @@ def list_google_sheets(creds, folder_id):
         >>> for sheet in sheets:
         ...     print(sheet['name'], sheet['id'])
     """
-    service = build('drive', 'v3', credentials=creds)
-    query = f"'{folder_id}' in parents and mimeType='application/vnd.google-apps.spreadsheet'"
-    results = service.files().list(q=query, fields="files(id, name)").execute()
-    items = results.get('files', [])
+    items = list(iter_google_sheets(creds, folder_id, session=session, recursive=recursive, max_workers=max_workers))
     if not items:
         print('No files found.')
     else:
@@ -163,7 +441,7 @@ def list_google_sheets(creds, folder_id):
             print(f"{item['name']} ({item['id']})")
     return items
 
-def concatenate_worksheets(client, sheet_id, worksheet_name, df):
+def concatenate_worksheets(client, sheet_id, worksheet_name, df, session=None):
     """
     Concatenates data from a specific Google Sheet worksheet into an existing pandas DataFrame.
 
@@ -175,6 +453,7 @@ def concatenate_worksheets(client, sheet_id, worksheet_name, df):
         sheet_id (str): The ID of the Google Spreadsheet.
         worksheet_name (str): The name of the worksheet to fetch data from.
         df (pandas.DataFrame): The existing DataFrame to which data will be appended.
+        session (SheetsSession, optional): Session whose scheduler paces the calls.
 
     Returns:
         pandas.DataFrame: The DataFrame containing the original and appended data.
@@ -188,29 +467,59 @@ def concatenate_worksheets(client, sheet_id, worksheet_name, df):
         >>> updated_df = concatenate_worksheets(gc, 'your_sheet_id_here', 'Sheet1', existing_df)
     """
     try:
-        sheet = client.open_by_key(sheet_id)
-        worksheet = sheet.worksheet(worksheet_name)
-        data = worksheet.get_all_values()
-        headers = data.pop(0)
-        df_temp = pd.DataFrame(data, columns=headers)
+        df_temp = read_worksheet(client, sheet_id, worksheet_name, session=session)
         return pd.concat([df, df_temp], ignore_index=True)
     except Exception as e:
         print(f"Error processing worksheet '{worksheet_name}' in sheet {sheet_id}: {str(e)}")
         traceback.print_exc()
         return df
 
-def format_all_sheets(spreadsheet_id, credentials):
-    service = build('sheets', 'v4', credentials=credentials)
-    
-    # First, retrieve all sheets in the spreadsheet
-    spreadsheet = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-    sheets = spreadsheet.get('sheets', [])
-    
-    requests = []
-    
-    for sheet in sheets:
-        sheet_id = sheet['properties']['sheetId']  # Access the sheetId from the sheet properties
+def read_worksheet(client, sheet_id, worksheet_name, session=None):
+    """Return the values of one worksheet as a DataFrame whose columns are its first row."""
+    sheet = call_api(client.open_by_key, sheet_id, kind='read', session=session)
+    worksheet = call_api(sheet.worksheet, worksheet_name, kind='read', session=session)
+    data = call_api(worksheet.get_all_values, kind='read', session=session)
+    headers = data.pop(0)
+    return pd.DataFrame(data, columns=headers)
+
+def iter_worksheets(client, worksheets, session=None):
+    """
+    Read worksheets one at a time, skipping those that fail.
+
+    Calling concatenate_worksheets in a loop copies the accumulated rows on every call; collect the frames
+    yielded here and concatenate them once instead.
+
+    Args:
+        client (gspread.client.Client): An authorized Google Sheets client instance.
+        worksheets (iterable): (sheet_id, worksheet_name) pairs.
+        session (SheetsSession, optional): Session whose scheduler paces the calls.
+
+    Yields:
+        tuple: (sheet_id, worksheet_name, DataFrame) for every worksheet that could be read.
+
+    Example:
+        >>> frames = [df for _, _, df in iter_worksheets(gc, [(sheet_id, 'Sheet1'), (other_id, 'Sheet1')])]
+        >>> combined = pd.concat(frames, ignore_index=True)
+    """
+    for sheet_id, worksheet_name in worksheets:
+        try:
+            yield sheet_id, worksheet_name, read_worksheet(client, sheet_id, worksheet_name, session=session)
+        except Exception as e:
+            print(f"Error processing worksheet '{worksheet_name}' in sheet {sheet_id}: {str(e)}")
+
+def build_format_requests(sheet_ids):
+    """
+    Build the batchUpdate requests that format metadata entry tabs: column widths, header styles and the
+    "FILL OUT INFORMATION BELOW THIS ROW" banner in row 5.
 
+    Args:
+        sheet_ids (list): IDs of the sheets to format.
+
+    Returns:
+        list: batchUpdate request dictionaries.
+    """
+    requests = []
+    for sheet_id in sheet_ids:
         # Set column widths and row heights
         requests.append({
             "updateDimensionProperties": {
@@ -406,12 +715,32 @@ def format_all_sheets(spreadsheet_id, credentials):
             }
         })
 
+    return requests
+
+@phase('format')
+def format_all_sheets(spreadsheet_id, credentials, session=None, plan=None):
+    """
+    Format every tab of a spreadsheet in a single batchUpdate. With a RequestPlan, the batchUpdate is recorded instead of sent.
+    """
+    service = _sheets_service(credentials, session)
+    
+    # First, retrieve all sheets in the spreadsheet
+    reads_before = _reads_made(session)
+    spreadsheet = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
+    sheets = spreadsheet.get('sheets', [])
+    requests = build_format_requests([sheet['properties']['sheetId'] for sheet in sheets])
+    if plan is not None:
+        plan.record_reads(spreadsheet_id, _reads_made(session) - reads_before)
+        plan.batch_update(spreadsheet_id, requests)
+        return
+
     # Execute the batch update
     body = {"requests": requests}
-    response = service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
+    response = execute_request(service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body), 'write', session)
+    _invalidate(session, spreadsheet_id)
     print(f"Formatting {len(sheets)} sheets")
 
-def get_sheet_title_from_id(spreadsheet_id, sheet_id, credentials):
+def get_sheet_title_from_id(spreadsheet_id, sheet_id, credentials, session=None):
     """
     Retrieve the title of a sheet given its ID in a specific spreadsheet.
 
@@ -419,18 +748,18 @@ def get_sheet_title_from_id(spreadsheet_id, sheet_id, credentials):
     sheet_service: Authenticated googleapiclient.discovery service object.
     spreadsheet_id (str): The ID of the spreadsheet.
     sheet_id (int): The ID of the sheet.
+    session (SheetsSession, optional): Shared session providing the client and cached metadata.
 
     Returns:
     str: The title of the sheet.
     """
-    service = build('sheets', 'v4', credentials=credentials)
-    spreadsheet_info = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)').execute()
+    spreadsheet_info = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
     for sheet in spreadsheet_info['sheets']:
         if sheet['properties']['sheetId'] == sheet_id:
             return sheet['properties']['title']
     raise ValueError("Sheet ID not found in the spreadsheet.")
 
-def fetch_sheets_with_indices(spreadsheet_id, credentials):
+def fetch_sheets_with_indices(spreadsheet_id, credentials, session=None):
     """
     Fetches the indices and titles of all sheets in a specified Google Spreadsheet.
 
@@ -440,6 +769,7 @@ def fetch_sheets_with_indices(spreadsheet_id, credentials):
     Args:
         spreadsheet_id (str): The ID of the Google Spreadsheet.
         credentials: Google API credentials used for accessing the sheet.
+        session (SheetsSession, optional): Shared session providing the client and cached metadata.
 
     Returns:
         dict: A dictionary where the keys are sheet indices (int) and the values are sheet titles (str).
@@ -453,15 +783,14 @@ def fetch_sheets_with_indices(spreadsheet_id, credentials):
         >>> print(sheets_info)
         {1: 'dataset metadata', 2: 'donor metadata', 3: 'sample metadata', 4: 'celltype metadata'}
     """
-    service = build('sheets', 'v4', credentials=credentials)
-    response = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)').execute()
+    response = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
     sheets = response.get('sheets', [])
     return {sheet['properties']['index']: sheet['properties']['title'] for sheet in sheets}
 
-def cache_column_indices(spreadsheet_id, credentials):
-    service = build('sheets', 'v4', credentials=credentials)
+def cache_column_indices(spreadsheet_id, credentials, session=None):
+    service = _sheets_service(credentials, session)
     # Fetch sheet titles and ids
-    sheet_metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)').execute()
+    sheet_metadata = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
     sheets = sheet_metadata.get('sheets', [])
     
     column_cache = {}
@@ -469,7 +798,7 @@ def cache_column_indices(spreadsheet_id, credentials):
         title = sheet['properties']['title']
         index = sheet['properties']['index']
         range_name = f"'{title}'!1:1"
-        result = service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
+        result = execute_request(service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name), 'read', session)
         headers = result.get('values', [[]])[0]
         
         # Map each column name to its index in this sheet
@@ -488,22 +817,22 @@ def get_column_index(sheet_index, column_name, column_cache):
         return -1  # Column name not found
 
 
-def cache_sheet_columns(spreadsheet_id, credentials):
+def cache_sheet_columns(spreadsheet_id, credentials, session=None):
     """
     Cache column headers for each sheet to minimize API calls.
     Returns a dictionary with sheet titles as keys and another dictionary as values, mapping column names to indices.
     """
-    service = build('sheets', 'v4', credentials=credentials)
+    service = _sheets_service(credentials, session)
     sheets_headers = {}
     try:
         # Fetch metadata for all sheets to get their titles
-        response = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)').execute()
+        response = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
         sheets = response.get('sheets', [])
         for sheet in sheets:
             sheet_title = sheet['properties']['title']
             range_name = f"'{sheet_title}'!1:1"  # Adjust if headers are not in the first row
             # Fetch headers for each sheet
-            result = service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
+            result = execute_request(service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name), 'read', session)
             headers = result.get('values', [[]])[0]
             # Map column names to their indices
             sheets_headers[sheet_title] = {header: idx for idx, header in enumerate(headers)}
@@ -518,7 +847,7 @@ def cache_sheet_columns(spreadsheet_id, credentials):
 #     sheets = sheet_metadata.get('sheets', '')
 #     return {sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in sheets}
 
-def set_dropdown_list(spreadsheet_id, sheet_title, column_index, values, gc, credentials):
+def set_dropdown_list(spreadsheet_id, sheet_title, column_index, values, gc, credentials, session=None):
     """
     Set a dropdown list for a specified column in a Google Sheet using gspread.
     
@@ -528,13 +857,13 @@ def set_dropdown_list(spreadsheet_id, sheet_title, column_index, values, gc, cre
     column_index (int): The column index where the dropdown will be applied.
     values (list): List of allowed values for the dropdown.
     gc: Authenticated gspread client.
+    session (SheetsSession, optional): Shared session whose cached metadata is invalidated by the write.
     
     Returns:
     response: API response from the batch_update method.
     """
-    service = build('sheets', 'v4', credentials=credentials)
-    spreadsheet = gc.open_by_key(spreadsheet_id)
-    sheet = spreadsheet.worksheet(sheet_title)
+    spreadsheet = call_api(gc.open_by_key, spreadsheet_id, kind='read', session=session)
+    sheet = call_api(spreadsheet.worksheet, sheet_title, kind='read', session=session)
     sheet_id = sheet._properties['sheetId']
     
     # Prepare the setDataValidation request
@@ -560,10 +889,11 @@ def set_dropdown_list(spreadsheet_id, sheet_title, column_index, values, gc, cre
     }]
     
     body = {"requests": requests}
-    response = spreadsheet.batch_update(body)
+    response = call_api(spreadsheet.batch_update, body, kind='write', session=session)
+    _invalidate(session, spreadsheet_id)
     return response
 
-def set_dropdown_list_by_id_old(spreadsheet_id, sheet_index, column_index, num_header_rows, values, credentials):
+def set_dropdown_list_by_id_old(spreadsheet_id, sheet_index, column_index, num_header_rows, values, credentials, session=None):
     """
     Apply data validation dropdown list to a specified column in a Google Sheet.
 
@@ -573,18 +903,19 @@ def set_dropdown_list_by_id_old(spreadsheet_id, sheet_index, column_index, num_h
     column_index (int): The column index where the dropdown should be applied (0-based index).
     values (list): A list of values that will appear in the dropdown.
     credentials: Google API credentials.
+    session (SheetsSession, optional): Shared session providing the client and cached metadata.
 
     Returns:
     response from the API call
     """
-    service = build('sheets', 'v4', credentials=credentials)
+    service = _sheets_service(credentials, session)
     
     # Fetch the actual sheet ID from the index
-    sheet_id = fetch_sheet_id_from_index(spreadsheet_id, sheet_index, credentials)
+    sheet_id = fetch_sheet_id_from_index(spreadsheet_id, sheet_index, credentials, session=session)
     if not sheet_id:
         raise ValueError("Failed to find a sheet at the given index.")
 
-    sheet_properties = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)').execute()
+    sheet_properties = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
     for sheet in sheet_properties['sheets']:
         if sheet['properties']['sheetId'] == sheet_id:
             max_rows = sheet['properties'].get('gridProperties', {}).get('rowCount', 1000)
@@ -613,10 +944,11 @@ def set_dropdown_list_by_id_old(spreadsheet_id, sheet_index, column_index, num_h
 
     # Send the batch update request to the Sheets API
     body = {"requests": requests}
-    response = service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
+    response = execute_request(service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body), 'write', session)
+    _invalidate(session, spreadsheet_id)
     return response
 
-def set_dropdown_list_by_id(spreadsheet_id, sheet_index, column_index, num_header_rows, values, credentials, sheet_properties_cache):
+def set_dropdown_list_by_id(spreadsheet_id, sheet_index, column_index, num_header_rows, values, credentials, sheet_properties_cache, session=None):
     """
     Apply data validation dropdown list to a specified column in a Google Sheet using cached properties.
     """
@@ -624,7 +956,7 @@ def set_dropdown_list_by_id(spreadsheet_id, sheet_index, column_index, num_heade
         raise ValueError(f"Sheet ID not found for index {sheet_index}")
     sheet_id, max_rows = sheet_properties_cache[sheet_index]
     # Initialize Google Sheets API service
-    service = build('sheets', 'v4', credentials=credentials)
+    service = _sheets_service(credentials, session)
     # Check if there are meaningful values to add in the dropdown
     if not values or (len(values) == 1 and values[0] == ""):
         # print(f"No valid dropdown values to set for column index {column_index} in sheet index {sheet_index}.")
@@ -652,15 +984,237 @@ def set_dropdown_list_by_id(spreadsheet_id, sheet_index, column_index, num_heade
     }]
     # Send the batch update request to the Sheets API
     body = {"requests": requests}
+    response = None
     try:
-        response = service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
+        response = execute_request(service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body), 'write', session)
+        _invalidate(session, spreadsheet_id)
         # print(f"Dropdowns set successfully for sheet ID {sheet_id} at column index {column_index}")
     except Exception as e:
         print(f"Failed to set dropdowns: {str(e)}")
     return response
 
+def build_dropdown_requests(sheets_info, dropdowns_config, column_cache, sheet_properties_cache, num_header_rows):
+    """
+    Build every setDataValidation request for a spreadsheet from a dropdown configuration.
+
+    Args:
+        sheets_info (dict): Sheet indices mapped to sheet titles, as returned by fetch_sheets_with_indices.
+        dropdowns_config (dict): Lower-cased sheet titles mapped to {column_name: [allowed values]}.
+        column_cache (dict): Column header cache, as returned by cache_column_indices.
+        sheet_properties_cache (dict): Sheet properties cache, as returned by cache_sheet_properties.
+        num_header_rows (int): Number of header rows, not including the row names or the "fill out below" banner.
+
+    Returns:
+        list: setDataValidation requests ready to be sent in a batchUpdate.
+    """
+    requests = []
+    for sheet_index, sheet_title in sheets_info.items():
+        tab_config = dropdowns_config.get(sheet_title.lower(), {})
+        if not tab_config:
+            print(f"No dropdown configuration found for '{sheet_title}'. Missing or empty configuration.")
+            continue
+        if sheet_index not in sheet_properties_cache:
+            raise ValueError(f"Sheet ID not found for index {sheet_index}")
+        sheet_id, max_rows = sheet_properties_cache[sheet_index]
+        print(f"Applying dropdowns for '{sheet_title}'")
+        for column_name, values in tab_config.items():
+            col_index = get_column_index(sheet_index, column_name, column_cache)
+            if col_index < 0:
+                continue
+            # Skip the header name rows and the "fill out below" banner
+            request = create_set_dropdown_request(sheet_id, col_index, values, num_header_rows + 1, max_rows)
+            if request is not None:
+                requests.append(request)
+    return requests
+
+def build_dropdowns_config(metadata_dfs, num_header_rows=1):
+    """
+    Compute the allowed dropdown values of every tab from the schema dataframes.
+
+    Args:
+        metadata_dfs (dict): Tab names mapped to schema DataFrames whose rows after the header rows hold allowed values.
+        num_header_rows (int): Number of header rows at the top of each schema DataFrame.
+
+    Returns:
+        dict: Tab names mapped to {column_name: [allowed values]} for every column that has allowed values.
+    """
+    dropdowns_config = {}
+    for tab_name, df_config in metadata_dfs.items():
+        valid_rows = df_config.iloc[num_header_rows:]
+        dropdowns_config[tab_name] = {col: valid_rows[col].dropna().unique().tolist()
+                                      for col in df_config.columns if not valid_rows[col].isnull().all()}
+    return dropdowns_config
+
+def fetch_header_state(get_service, spreadsheet_id, tab_names, num_header_rows=1, session=None):
+    """
+    Read the headers, row counts and dropdown values of a spreadsheet's tabs in one batched read.
+
+    The tab titles come from the (session-cached) spreadsheet metadata; the header row and the first
+    validated row of every requested tab are then fetched with a single spreadsheets.get.
+
+    Args:
+        get_service (callable): Returns the Sheets service for the calling thread.
+        spreadsheet_id (str): The ID of the Google Spreadsheet.
+        tab_names (iterable): Titles of the tabs to read. Tabs missing from the spreadsheet are skipped.
+        num_header_rows (int): Number of header rows; dropdowns start on the row after them.
+        session (SheetsSession, optional): Shared session providing cached metadata and the request scheduler.
+
+    Returns:
+        dict: Tab titles mapped to {'sheet_id', 'row_count', 'headers', 'validations'}, where validations maps
+        0-based column indices to the ONE_OF_LIST values currently set on the first validated row.
+    """
+    if session is not None:
+        metadata = session.get_metadata(spreadsheet_id)
+    else:
+        metadata = execute_request(get_service().spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)'), 'read')
+    tab_names = set(tab_names)
+    titles = [sheet['properties']['title'] for sheet in metadata.get('sheets', []) if sheet['properties']['title'] in tab_names]
+    if not titles:
+        return {}
+    ranges = [f"{quote_sheet_title(title)}!1:{num_header_rows + 1}" for title in titles]
+    request = get_service().spreadsheets().get(spreadsheetId=spreadsheet_id, ranges=ranges, includeGridData=True,
+                                               fields=HEADER_STATE_FIELDS)
+    response = execute_request(request, 'read', session)
+    header_state = {}
+    for sheet in response.get('sheets', []):
+        properties = sheet['properties']
+        data = sheet.get('data') or [{}]
+        rows = [row.get('values', []) for row in data[0].get('rowData', [])]
+        validations = {}
+        if len(rows) > num_header_rows:
+            for col_index, cell in enumerate(rows[num_header_rows]):
+                condition = cell.get('dataValidation', {}).get('condition', {})
+                if condition.get('type') == 'ONE_OF_LIST':
+                    validations[col_index] = [value.get('userEnteredValue') for value in condition.get('values', [])]
+        header_state[properties['title']] = {
+            'sheet_id': properties['sheetId'],
+            'row_count': properties['gridProperties']['rowCount'],
+            'headers': [cell.get('formattedValue', '') for cell in rows[0]] if rows else [],
+            'validations': validations,
+        }
+    return header_state
+
+def plan_sheet_updates(header_state, metadata_dfs, dropdowns_config, num_header_rows=1):
+    """
+    Diff the live tabs of a spreadsheet against the schema and build only the requests needed to reconcile them.
+
+    Columns missing from a tab are inserted at their schema position and their header is written. A dropdown is
+    (re)set only when its column was just inserted or its current allowed values differ from the schema, so an
+    up-to-date spreadsheet produces no requests at all.
 
-def fetch_sheet_id_from_index(spreadsheet_id, sheet_index, credentials):
+    Args:
+        header_state (dict): Live tab state, as returned by fetch_header_state.
+        metadata_dfs (dict): Tab names mapped to schema DataFrames.
+        dropdowns_config (dict): Allowed values per tab and column, as returned by build_dropdowns_config.
+        num_header_rows (int): Number of header rows; dropdowns start on the row after them.
+
+    Returns:
+        list: batchUpdate requests, in the order they must be applied.
+    """
+    requests = []
+    for tab_name, df_config in metadata_dfs.items():
+        if tab_name not in header_state:
+            continue
+        tab = header_state[tab_name]
+        current_headers = list(tab['headers'])
+        current_validations = {current_headers[i]: values for i, values in tab['validations'].items() if i < len(current_headers)}
+        config_headers = list(df_config.columns)
+        # Check for new columns and insert them at the index they have in metadata_dfs
+        for col in config_headers:
+            if col not in current_headers:
+                insert_at_index = config_headers.index(col)
+                requests.append({
+                    'insertDimension': {
+                        'range': {
+                            'sheetId': tab['sheet_id'],
+                            'dimension': 'COLUMNS',
+                            'startIndex': insert_at_index,
+                            'endIndex': insert_at_index + 1
+                        },
+                        'inheritFromBefore': False
+                    }
+                })
+                requests.append({
+                    'updateCells': {
+                        'rows': [{'values': [{'userEnteredValue': {'stringValue': col}}]}],
+                        'fields': 'userEnteredValue',
+                        'start': {'sheetId': tab['sheet_id'], 'rowIndex': 0, 'columnIndex': insert_at_index}
+                    }
+                })
+                current_headers.insert(insert_at_index, col)
+        header_to_index = {header: i for i, header in enumerate(current_headers)}
+        # Set dropdowns whose allowed values changed
+        for column, values in dropdowns_config.get(tab_name, {}).items():
+            if current_validations.get(column) == [str(val) for val in values]:
+                continue
+            request = create_set_dropdown_request(tab['sheet_id'], header_to_index[column], values,
+                                                  num_header_rows=num_header_rows, max_rows=tab['row_count'])
+            if request is not None:
+                requests.append(request)
+    return requests
+
+def chunk_batch_requests(requests, max_bytes=MAX_BATCH_UPDATE_BYTES):
+    """
+    Split batchUpdate requests into chunks whose serialized body stays under max_bytes.
+
+    A single request larger than max_bytes is still sent on its own, since it cannot be split further.
+
+    Args:
+        requests (list): batchUpdate request dictionaries.
+        max_bytes (int): Maximum size of the JSON body of a single batchUpdate call.
+
+    Returns:
+        list: A list of request lists, one per batchUpdate call.
+    """
+    chunks = []
+    current = []
+    current_size = len(json.dumps({"requests": []}))
+    for request in requests:
+        request_size = len(json.dumps(request)) + 2  # separator between list items
+        if current and current_size + request_size > max_bytes:
+            chunks.append(current)
+            current = []
+            current_size = len(json.dumps({"requests": []}))
+        current.append(request)
+        current_size += request_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def batch_update_in_chunks(spreadsheet_id, requests, credentials, max_bytes=MAX_BATCH_UPDATE_BYTES, session=None, plan=None):
+    """
+    Send batchUpdate requests to a spreadsheet in as few calls as the payload limit allows.
+
+    Args:
+        spreadsheet_id (str): The ID of the Google Spreadsheet.
+        requests (list): batchUpdate request dictionaries.
+        credentials: Google API credentials.
+        max_bytes (int): Maximum size of the JSON body of a single batchUpdate call.
+        session (SheetsSession, optional): Shared session providing the client and cached metadata.
+        plan (RequestPlan, optional): Record the batches in this plan instead of sending them.
+
+    Returns:
+        dict: Summary with the number of 'requests' merged, 'batches' sent and 'failed' batches.
+    """
+    summary = {'requests': len(requests), 'batches': 0, 'failed': 0}
+    if not requests:
+        return summary
+    if plan is not None:
+        summary['batches'] = len(plan.batch_update(spreadsheet_id, requests))
+        return summary
+    service = _sheets_service(credentials, session)
+    for chunk in chunk_batch_requests(requests, max_bytes=max_bytes):
+        body = {"requests": chunk}
+        summary['batches'] += 1
+        try:
+            execute_request(service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body), 'write', session)
+        except Exception as e:
+            summary['failed'] += 1
+            print(f"Failed to send batch of {len(chunk)} requests: {str(e)}")
+    _invalidate(session, spreadsheet_id)
+    return summary
+
+def fetch_sheet_id_from_index(spreadsheet_id, sheet_index, credentials, session=None):
     """
     Fetch the sheet ID using the sheet index.
 
@@ -668,12 +1222,12 @@ def fetch_sheet_id_from_index(spreadsheet_id, sheet_index, credentials):
     spreadsheet_id (str): The ID of the Google Spreadsheet.
     sheet_index (int): The index of the sheet.
     credentials: Google API credentials.
+    session (SheetsSession, optional): Shared session providing the client and cached metadata.
 
     Returns:
     The actual sheet ID corresponding to the index or None if not found.
     """
-    service = build('sheets', 'v4', credentials=credentials)
-    response = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)').execute()
+    response = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
     sheets = response.get('sheets', [])
     
     for sheet in sheets:
@@ -682,16 +1236,15 @@ def fetch_sheet_id_from_index(spreadsheet_id, sheet_index, credentials):
     
     return None
 
-def cache_sheet_properties(spreadsheet_id, credentials):
+def cache_sheet_properties(spreadsheet_id, credentials, session=None):
     """
     Cache sheet properties including sheet IDs, their indexes, and row counts to minimize API calls.
     Returns a dictionary with sheet indexes as keys and a tuple of (sheet ID, row count) as values.
     """
-    service = build('sheets', 'v4', credentials=credentials)
     sheet_properties_cache = {}
     try:
         # Fetch metadata for all sheets to get their indexes and IDs
-        response = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets(properties)').execute()
+        response = _fetch_spreadsheet_metadata(spreadsheet_id, credentials, session)
         sheets = response.get('sheets', [])
         for sheet in sheets:
             sheet_index = sheet['properties']['index']
@@ -709,7 +1262,89 @@ def concatenate_metadata(descriptions, metadata_tb):
     descriptions_tb.reset_index(inplace=True, drop=True)
     return descriptions_tb
 
-def move_sheet_in_drive(file_id, folder_id, credentials):
+def read_obs(path):
+    """
+    Read only the obs table of an .h5ad file, without loading X, layers or any other element.
+
+    Memory stays proportional to obs however large the expression matrix is. Requires h5py and anndata, which
+    scanpy installs.
+
+    Args:
+        path (str): Path of the .h5ad file.
+
+    Returns:
+        pandas.DataFrame: The obs table, with categorical columns kept as categoricals.
+
+    Example:
+        >>> obs = read_obs('atlas.h5ad')
+    """
+    import h5py
+    try:
+        from anndata.io import read_elem
+    except ImportError:
+        try:
+            from anndata.experimental import read_elem
+        except ImportError:
+            # anndata before 0.8: backed mode maps X instead of reading it
+            import anndata
+            adata = anndata.read_h5ad(path, backed='r')
+            obs = adata.obs.copy()
+            adata.file.close()
+            return obs
+    with h5py.File(path, 'r') as f:
+        return read_elem(f['obs'])
+
+def obs_table(adata):
+    """Return the obs table of an AnnData object (in memory or backed), an .h5ad path or an obs DataFrame."""
+    if isinstance(adata, pd.DataFrame):
+        return adata
+    if isinstance(adata, (str, os.PathLike)):
+        return read_obs(adata)
+    return adata.obs
+
+def collapse_to_entities(obs, columns, key=None):
+    """
+    Collapse per-cell metadata to one row per entity (e.g. donor or sample) and report conflicting fields.
+
+    Every column is reduced to integer codes (category codes, or factorized values) and the distinct code
+    combinations are found with one drop_duplicates, so a study of many cells reduces to its few distinct rows
+    before any per-entity work. Each entity takes the first non-missing value of every field; a field is in
+    conflict if an entity has more than one distinct non-missing value for it.
+
+    Args:
+        obs (pandas.DataFrame): Per-cell metadata, e.g. adata.obs.
+        columns (list): The columns to keep.
+        key (str, optional): The column identifying an entity. Defaults to the first column.
+
+    Returns:
+        tuple: (DataFrame with one row per entity and the given columns, DataFrame of conflicts with the key,
+            'field' and the conflicting 'values' joined by '; ').
+
+    Example:
+        >>> donors, conflicts = collapse_to_entities(adata.obs, ['donor_id', 'donor_age', 'donor_sex'])
+    """
+    columns = list(columns)
+    if not columns:
+        return pd.DataFrame(), pd.DataFrame(columns=[key or 'key', 'field', 'values'])
+    key = key or columns[0]
+    codes = pd.DataFrame({column: obs[column].cat.codes.to_numpy() if isinstance(obs[column].dtype, pd.CategoricalDtype)
+                          else pd.factorize(obs[column])[0] for column in columns})
+    distinct = obs[columns].iloc[codes.drop_duplicates().index].astype(object).reset_index(drop=True)
+    conflicts = []
+    if distinct[key].duplicated().any():
+        # Only entities with more than one distinct row can have conflicting fields
+        repeated = distinct[distinct[key].duplicated(keep=False)]
+        for field in repeated.columns.drop(key):
+            values = repeated[[key, field]].dropna().drop_duplicates()
+            for entity, group in values[values[key].duplicated(keep=False)].groupby(key, sort=False):
+                conflicts.append({key: entity, 'field': field, 'values': '; '.join(map(str, group[field]))})
+        entities = distinct.groupby(key, sort=False, dropna=False).first().reset_index()[columns]
+    else:
+        entities = distinct
+    return entities, pd.DataFrame(conflicts, columns=[key, 'field', 'values'])
+
+@phase('move')
+def move_sheet_in_drive(file_id, folder_id, credentials, session=None, previous_parents=None, plan=None):
     """
     Move a Google Sheet to a specified folder in Google Drive.
 
@@ -717,14 +1352,128 @@ def move_sheet_in_drive(file_id, folder_id, credentials):
         file_id (str): The ID of the file to move.
         folder_id (str): The ID of the destination folder.
         credentials: Google API credentials.
+        session (SheetsSession, optional): Shared session providing the Drive client.
+        previous_parents (str, optional): Comma-separated IDs of the folders the file is in. Looked up with an
+            extra Drive request if omitted.
+        plan (RequestPlan, optional): Record the Drive requests in this plan instead of sending them.
+    """
+    if plan is not None:
+        if previous_parents is None:
+            plan.record(file_id, 'files.get', kind='drive')
+        plan.record(file_id, 'files.update', kind='drive')
+        return
+    drive_service = _drive_service(credentials, session)
+    if previous_parents is None:
+        file = execute_request(drive_service.files().get(fileId=file_id, fields='parents'), 'drive', session)
+        previous_parents = ",".join(file.get('parents'))
+    execute_request(drive_service.files().update(fileId=file_id,
+                                                 addParents=folder_id,
+                                                 removeParents=previous_parents,
+                                                 fields='id, parents'), 'drive', session)
+
+def cell_data(value):
+    """Return the CellData of a value as the Sheets API stores it with valueInputOption RAW."""
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return {}
+    if isinstance(value, (bool, np.bool_)):
+        return {'userEnteredValue': {'boolValue': bool(value)}}
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return {'userEnteredValue': {'numberValue': value.item() if isinstance(value, np.generic) else value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+def build_spreadsheet_body(title, tables, sheet_ids=None, min_rows=1000):
+    """
+    Build a spreadsheets.create body holding every tab of a new spreadsheet with its initial cells.
+
+    Tabs get the sheet IDs given, so batchUpdate requests for them can be built before the spreadsheet exists,
+    and no default "Sheet1" is created.
+
+    Args:
+        title (str): The title of the spreadsheet.
+        tables (dict): Tab titles mapped to DataFrames, written with their column names as the first row.
+        sheet_ids (dict, optional): Tab titles mapped to sheet IDs. Defaults to 1, 2, ... in tab order.
+        min_rows (int): Minimum number of rows of each tab, as add_worksheet creates them in upload_to_sheet.
+
+    Returns:
+        dict: The request body.
+    """
+    sheet_ids = sheet_ids or {tab: index for index, tab in enumerate(tables, start=1)}
+    sheets = []
+    for index, (tab, df) in enumerate(tables.items()):
+        values = dataframe_to_values(df)
+        sheets.append({
+            'properties': {'sheetId': sheet_ids[tab], 'title': tab, 'index': index,
+                           'gridProperties': {'rowCount': max(min_rows, len(values)), 'columnCount': len(df.columns)}},
+            'data': [{'startRow': 0, 'startColumn': 0,
+                      'rowData': [{'values': [cell_data(value) for value in row]} for row in values]}],
+        })
+    return {'properties': {'title': title}, 'sheets': sheets}
+
+@phase('create')
+def create_spreadsheet(title, tables, credentials, folder_id=None, requests=None, sheet_ids=None, session=None,
+                       plan=None):
     """
-    drive_service = googleapiclient.discovery.build('drive', 'v3', credentials=credentials)
-    file = drive_service.files().get(fileId=file_id, fields='parents').execute()
-    previous_parents = ",".join(file.get('parents'))
-    drive_service.files().update(fileId=file_id,
-                                 addParents=folder_id,
-                                 removeParents=previous_parents,
-                                 fields='id, parents').execute()
+    Create a spreadsheet with all its tabs and cells in one spreadsheets.create call, apply any further
+    batchUpdate requests (formatting, merges, validations) in one more call, and move it into a Drive folder.
+
+    Sheets creates spreadsheets in the root of My Drive, so the move is a single Drive update that needs no
+    lookup of the current parents. A spreadsheet with formatting and dropdowns costs three API calls.
+
+    Args:
+        title (str): The title of the spreadsheet.
+        tables (dict): Tab titles mapped to DataFrames, see build_spreadsheet_body.
+        credentials: Google API credentials.
+        folder_id (str, optional): The Drive folder to move the spreadsheet into.
+        requests (list, optional): batchUpdate requests referring to the tabs by their sheet IDs.
+        sheet_ids (dict, optional): Tab titles mapped to sheet IDs. Defaults to 1, 2, ... in tab order.
+        session (SheetsSession, optional): Shared session providing the clients.
+        plan (RequestPlan, optional): Record the three calls in this plan instead of sending them.
+
+    Returns:
+        str: The ID of the new spreadsheet, or 'new:<title>' with a plan.
+
+    Example:
+        >>> tables = {'Donor Metadata': donor_df}
+        >>> file_id = create_spreadsheet('Study1 metadata', tables, credentials, folder_id,
+        ...                              requests=build_format_requests([1]), session=session)
+    """
+    body = build_spreadsheet_body(title, tables, sheet_ids)
+    if plan is not None:
+        file_id = f"new:{title}"
+        plan.record(file_id, 'spreadsheets.create', body=body)
+    else:
+        service = _sheets_service(credentials, session)
+        spreadsheet = execute_request(service.spreadsheets().create(body=body, fields='spreadsheetId'), 'write', session)
+        file_id = spreadsheet['spreadsheetId']
+    if requests:
+        batch_update_in_chunks(file_id, requests, credentials, session=session, plan=plan)
+    if folder_id is not None:
+        move_sheet_in_drive(file_id, folder_id, credentials, session=session, previous_parents='root', plan=plan)
+    return file_id
+
+@phase('create')
+def copy_spreadsheet(file_id, name, folder_id, credentials, session=None, plan=None):
+    """
+    Copy a spreadsheet, with its tabs, formatting and dropdowns, straight into a Drive folder under a new name.
+
+    Args:
+        file_id (str): The ID of the spreadsheet to copy, e.g. a template from build_metadata_templates.
+        name (str): The name of the copy.
+        folder_id (str): The ID of the folder the copy is created in.
+        credentials: Google API credentials.
+        session (SheetsSession, optional): Shared session providing the Drive client.
+        plan (RequestPlan, optional): Record the copy in this plan instead of making it.
+
+    Returns:
+        str: The ID of the copy, or 'new:<name>' with a plan.
+    """
+    body = {'name': name, 'parents': [folder_id]}
+    if plan is not None:
+        plan.record(f"new:{name}", 'files.copy', kind='drive', body=body)
+        return f"new:{name}"
+    drive_service = _drive_service(credentials, session)
+    copy = execute_request(drive_service.files().copy(fileId=file_id, body=body, fields='id'), 'drive', session)
+    return copy['id']
 
 def load_descriptions(csv_path=None):
     """
@@ -826,51 +1575,161 @@ def add_metadata_descriptions(metadata_dfs, descriptions_csv=None):
 
 #     return all_dfs
 
-def load_sheets_metadata(credentials, googlesheets):
-    service = build('sheets', 'v4', credentials=credentials)
-    all_dfs = {}  # Dictionary to store dataframes for each metadata type
-    for sheet_info in googlesheets:
-        spreadsheet_id = sheet_info['id']
-        attempt = 0  # Initialize attempt counter
-        while attempt < 8:  # Allow up to 5 attempts
-            try:
-                print(f'Loading data from Spreadsheet ID: {spreadsheet_id}')
-                spreadsheet = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-                sheets = spreadsheet.get('sheets', [])
-                for sheet in sheets:
-                    title = sheet['properties']['title']
-                    if 'metadata' in title.lower():
-                        # First retrieve only the first row to count non-empty columns
-                        first_row_range = f'{title}!1:1'
-                        first_row_result = service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=first_row_range).execute()
-                        first_row_values = first_row_result.get('values', [])
-                        if first_row_values:
-                            non_empty_columns = len(first_row_values[0])
-                            last_column_letter = column_to_gsheet_letter(non_empty_columns)
-                            range_name = f'{title}!A:{last_column_letter}'     
-                            result = service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
-                            rows = result.get('values', [])
-                            if rows:
-                                headers = rows.pop(0)
-                                adjusted_rows = [row + [None] * (len(headers) - len(row)) for row in rows[4:]]
-                                df_temp = pd.DataFrame(adjusted_rows, columns=headers)
-                                df_temp['worksheet'] = spreadsheet['properties']['title'].split(" ")[0]
-                                metadata_type = title.lower().split('metadata')[0].strip()
-                                if metadata_type in all_dfs:
-                                    all_dfs[metadata_type] = pd.concat([all_dfs[metadata_type], df_temp], ignore_index=True)
-                                else:
-                                    all_dfs[metadata_type] = df_temp
-                break  # Exit loop after successful load
-            except Exception as e:
-                if 'Quota exceeded' in str(e) and attempt < 7:  # Check if the error is due to quota exceeded
-                    sleep_time = backoff(attempt)
-                    print(f"Quota exceeded, retrying after {sleep_time:.2f} seconds...")
-                    time.sleep(sleep_time)
-                    attempt += 1
-                else:
-                    print(f"Failed to load sheet {spreadsheet_id} on attempt {attempt + 1}: {str(e)}")
-                    break  # Break after max attempts or other types of errors
-    return all_dfs
+# Only the fields the metadata loader needs from spreadsheets.get
+LOAD_METADATA_FIELDS = 'properties(title),sheets(properties(title,gridProperties(rowCount,columnCount)))'
+
+def quote_sheet_title(title):
+    """Quote a sheet title for use in A1 notation, escaping embedded single quotes."""
+    return "'" + title.replace("'", "''") + "'"
+
+def metadata_rows_to_frame(rows, worksheet, num_description_rows=4):
+    """
+    Convert the raw values of a metadata tab into a DataFrame.
+
+    The first row holds the column names and the following num_description_rows rows hold the field
+    descriptions, which are skipped. Ragged rows are padded with None and trimmed to the header width.
+
+    Args:
+        rows (list): Rows of cell values as returned by the Sheets values API.
+        worksheet (str): Value for the 'worksheet' column identifying the source spreadsheet.
+        num_description_rows (int): Number of description rows below the header row.
+
+    Returns:
+        pandas.DataFrame or None: The tab contents, or None if the tab has no header row.
+    """
+    if not rows or not rows[0]:
+        return None
+    headers = rows[0]
+    width = len(headers)
+    adjusted_rows = [row[:width] + [None] * (width - len(row)) for row in rows[1 + num_description_rows:]]
+    df_temp = pd.DataFrame(adjusted_rows, columns=headers)
+    df_temp['worksheet'] = worksheet
+    return df_temp
+
+def fetch_metadata_tables(service, spreadsheet_id, session=None):
+    """
+    Fetch every metadata tab of a spreadsheet with one masked spreadsheets.get and one values.batchGet.
+
+    Args:
+        service: An authorized Sheets v4 service.
+        spreadsheet_id (str): The ID of the Google Spreadsheet.
+        session (SheetsSession, optional): Session whose scheduler paces the calls.
+
+    Returns:
+        list: (metadata_type, DataFrame) tuples in tab order.
+    """
+    spreadsheet = execute_request(service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields=LOAD_METADATA_FIELDS), 'read', session)
+    worksheet = spreadsheet['properties']['title'].split(" ")[0]
+    tabs = [sheet['properties'] for sheet in spreadsheet.get('sheets', [])
+            if 'metadata' in sheet['properties']['title'].lower()]
+    if not tabs:
+        return []
+    ranges = []
+    for properties in tabs:
+        grid = properties.get('gridProperties', {})
+        last_column_letter = column_to_gsheet_letter(grid.get('columnCount', 26))
+        ranges.append(f"{quote_sheet_title(properties['title'])}!A1:{last_column_letter}{grid.get('rowCount', 1000)}")
+    result = execute_request(service.spreadsheets().values().batchGet(spreadsheetId=spreadsheet_id, ranges=ranges), 'read', session)
+    tables = []
+    for properties, value_range in zip(tabs, result.get('valueRanges', [])):
+        df_temp = metadata_rows_to_frame(value_range.get('values', []), worksheet)
+        if df_temp is not None:
+            metadata_type = properties['title'].lower().split('metadata')[0].strip()
+            tables.append((metadata_type, df_temp))
+    return tables
+
+def _load_spreadsheet_tables(get_service, sheet_info, session=None, cache=None):
+    """Load the metadata tabs of one spreadsheet. Quota errors are retried by the scheduler. Returns None on failure."""
+    spreadsheet_id = sheet_info['id']
+    if cache is not None and cache.is_fresh(sheet_info):
+        print(f'Loading cached data for Spreadsheet ID: {spreadsheet_id}')
+        return cache.load(spreadsheet_id)
+    try:
+        print(f'Loading data from Spreadsheet ID: {spreadsheet_id}')
+        tables = fetch_metadata_tables(get_service(), spreadsheet_id, session=session)
+    except Exception as e:
+        print(f"Failed to load sheet {spreadsheet_id}: {str(e)}")
+        return None
+    if cache is not None:
+        cache.store(sheet_info, tables)
+    return tables
+
+def load_sheets_metadata(credentials, googlesheets, session=None, max_workers=1, cache=None):
+    """
+    Load the metadata tabs of every listed spreadsheet into one DataFrame per metadata type.
+
+    Args:
+        credentials: Google API credentials.
+        googlesheets (list): Spreadsheet info dictionaries with an 'id' key, as returned by list_google_sheets.
+        session (SheetsSession, optional): Shared session providing the Sheets clients.
+        max_workers (int): Number of spreadsheets loaded concurrently. Results are merged in the order of
+            googlesheets, so the output is the same as a sequential load. A spreadsheet that fails is skipped
+            without affecting the others.
+        cache (SheetCache, optional): On-disk cache. Spreadsheets whose Drive modifiedTime and version match the
+            cached copy are read from disk; the others are downloaded and cached.
+
+    Returns:
+        dict: Metadata types (e.g. 'donor') mapped to DataFrames with a 'worksheet' column.
+    """
+    return collect_metadata_tables(iter_sheets_metadata(credentials, googlesheets, session=session,
+                                                        max_workers=max_workers, cache=cache))
+
+def iter_sheets_metadata(credentials, googlesheets, session=None, max_workers=1, cache=None):
+    """
+    Stream the metadata tabs of every listed spreadsheet as they are loaded.
+
+    Unlike load_sheets_metadata, nothing is accumulated: only the spreadsheets being loaded are held in memory,
+    so a consumer that writes each table to disk handles folders of any size.
+
+    Args:
+        credentials: Google API credentials.
+        googlesheets (iterable): Spreadsheet info dictionaries with an 'id' key, e.g. from list_google_sheets or
+            iter_google_sheets.
+        session (SheetsSession, optional): Shared session providing the Sheets clients.
+        max_workers (int): Number of spreadsheets loaded concurrently. Tables are still yielded in the order of
+            googlesheets. A spreadsheet that fails is skipped.
+        cache (SheetCache, optional): On-disk cache, as for load_sheets_metadata.
+
+    Yields:
+        tuple: (spreadsheet_id, metadata_type, DataFrame) for every metadata tab.
+
+    Example:
+        >>> for spreadsheet_id, metadata_type, df in iter_sheets_metadata(credentials, iter_google_sheets(credentials, folder_id)):
+        ...     df.to_csv(f'{spreadsheet_id}_{metadata_type}.csv', index=False)
+    """
+    get_service = _thread_sheets_service(credentials, session)
+    load = lambda sheet_info: (sheet_info['id'], _load_spreadsheet_tables(get_service, sheet_info, session, cache))
+    for spreadsheet_id, tables in imap_spreadsheets(load, googlesheets, max_workers=max_workers):
+        for metadata_type, df in tables or []:
+            yield spreadsheet_id, metadata_type, df
+
+def collect_metadata_tables(stream):
+    """
+    Concatenate streamed tables into one DataFrame per metadata type, copying each table once.
+
+    Args:
+        stream (iterable): (spreadsheet_id, metadata_type, DataFrame) tuples, as yielded by iter_sheets_metadata.
+
+    Returns:
+        dict: Metadata types mapped to the concatenated DataFrames, in the order the types first appear.
+    """
+    frames = {}
+    for _, metadata_type, df in stream:
+        frames.setdefault(metadata_type, []).append(df)
+    return {metadata_type: dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
+            for metadata_type, dfs in frames.items()}
+
+def merge_metadata_tables(results):
+    """
+    Merge per-spreadsheet tables into one DataFrame per metadata type, in the order given.
+
+    Args:
+        results (list): For each spreadsheet, a list of (metadata_type, DataFrame) tuples, or None if it failed to load.
+
+    Returns:
+        dict: Metadata types mapped to the concatenated DataFrames.
+    """
+    return collect_metadata_tables((None, metadata_type, df) for tables in results for metadata_type, df in tables or [])
 
 def column_to_gsheet_letter(column_number):
     """
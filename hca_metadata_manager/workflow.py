@@ -1,26 +1,77 @@
 from hca_metadata_manager.utils import * 
+from hca_metadata_manager.utils import (
+    _thread_sheets_service, _sheets_service, _invalidate, _scheduler, _reads_made, _metadata_reads, _drive_calls_made
+)
+from hca_metadata_manager.instrumentation import HistogramSink, phase
+from contextlib import contextmanager
 import os
+import json
+import time
 from google_auth_oauthlib.flow import InstalledAppFlow
-from time import sleep
 import pandas as pd
 
+@contextmanager
+def _phase_summary(session=None):
+    """
+    Collect the API calls made inside the block in a fresh HistogramSink and print the requests per quota kind
+    and per phase when it ends. Only the calls of this block are reported, even though the scheduler, e.g. the
+    shared default one, keeps counting across runs. Sinks attached to the scheduler that have a flush() method
+    (e.g. PrometheusSink) are flushed.
+    """
+    scheduler = _scheduler(session)
+    histogram = HistogramSink()
+    scheduler.add_sink(histogram)
+    try:
+        yield histogram
+    finally:
+        scheduler.remove_sink(histogram)
+        # Requests, throttles and waits per quota kind, then calls and latency per phase
+        histogram.report_kinds()
+        histogram.report()
+        for sink in scheduler.sinks:
+            if hasattr(sink, 'flush'):
+                sink.flush()
+
+# Tab metadata lookups of _read_dropdown_state: fetch_sheets_with_indices, cache_sheet_properties and cache_column_indices
+DROPDOWN_STATE_LOOKUPS = 3
+
+def _read_dropdown_state(spreadsheet_id, credentials, session=None):
+    """Return the tab titles by index, the tab properties and the header columns of every tab for apply_dropdowns."""
+    sheets_info = fetch_sheets_with_indices(spreadsheet_id, credentials, session=session)
+    properties_cache = cache_sheet_properties(spreadsheet_id, credentials, session=session)  # Cache sheet properties
+    column_cache = cache_column_indices(spreadsheet_id, credentials, session=session)
+    return sheets_info, properties_cache, column_cache
+
+def _dropdown_state_reads(num_tabs, session=None):
+    """Return the read requests _read_dropdown_state makes: the tab metadata lookups and one header read per tab."""
+    return _metadata_reads(DROPDOWN_STATE_LOOKUPS, session) + num_tabs
+
+@phase('dropdowns')
 def apply_dropdowns(spreadsheet_id, credentials, gc, 
-    metadata_dfs=None, num_header_rows=1, manual_config_mode=False):
+    metadata_dfs=None, num_header_rows=1, manual_config_mode=False, session=None, plan=None, delete_default_sheet=True):
     """
     Apply dropdown configurations to specified Google Sheet based on predefined settings,
-    considering additional header rows.
+    considering additional header rows. With a RequestPlan, the writes are recorded instead of sent.
+    Pass delete_default_sheet=False when the default "Sheet1" was already deleted, e.g. by upload_tables.
     """
-    sheets_info = fetch_sheets_with_indices(spreadsheet_id, credentials)
-    column_cache = {}  # Initialize cache
+    reads_before = _reads_made(session)
     print(f"Starting to apply dropdowns on spreadsheet {spreadsheet_id}")
     # headers_cache = cache_sheet_columns(spreadsheet_id, credentials)  # Cache column headers
-    properties_cache = cache_sheet_properties(spreadsheet_id, credentials)  # Cache sheet properties
-    column_cache = cache_column_indices(spreadsheet_id, credentials)
-    try:
-        delete_sheet(spreadsheet_id, "Sheet1", gc)
-        print("Default 'Sheet1' deleted.")
-    except gspread.exceptions.WorksheetNotFound:
-        print("Sheet1 does not exist or was already deleted.")
+    sheets_info, properties_cache, column_cache = _read_dropdown_state(spreadsheet_id, credentials, session=session)
+    if plan is not None:
+        # delete_sheet looks the sheet up through gspread before deleting it
+        plan.record_reads(spreadsheet_id, _reads_made(session) - reads_before
+                          + (DELETE_SHEET_READS if delete_default_sheet else 0))
+        for sheet_index, sheet_title in list(sheets_info.items()):
+            if sheet_title == "Sheet1" and delete_default_sheet:
+                plan.batch_update(spreadsheet_id, [{"deleteSheet": {"sheetId": properties_cache[sheet_index][0]}}])
+                del sheets_info[sheet_index]
+    elif delete_default_sheet:
+        try:
+            delete_sheet(spreadsheet_id, "Sheet1", gc, session=session)
+            print("Default 'Sheet1' deleted.")
+        except gspread.exceptions.WorksheetNotFound:
+            print("Sheet1 does not exist or was already deleted.")
     dropdowns_config = {}
     if manual_config_mode:
         print('Using manual dropdown config mode.')
@@ -51,25 +102,14 @@ def apply_dropdowns(spreadsheet_id, credentials, gc,
         }
     else:
         print("Automatically configuring dropdowns based on metadata definitions.")
-        for sheet_title, df in metadata_dfs.items():
-            valid_rows = df.iloc[num_header_rows:]
-            dropdowns_config[sheet_title.lower()] = {col: valid_rows[col].dropna().unique().tolist() for col in df.columns if not valid_rows[col].isnull().all()}
+        for sheet_title, tab_config in build_dropdowns_config(metadata_dfs, num_header_rows=num_header_rows).items():
+            dropdowns_config[sheet_title.lower()] = tab_config
     dropdowns_config = convert_numeric_to_string(dropdowns_config)
-    # Apply dropdowns using the fetched sheet information
-    for sheet_index, sheet_title in sheets_info.items():
-        tab_config = dropdowns_config.get(sheet_title.lower(), {})
-        print(f"Applying dropdowns for '{sheet_title}'")
-        if tab_config:  # Only proceed if there's a config to apply
-            for column_name, values in tab_config.items():
-                # col_index = get_column_index(spreadsheet_id, sheet_index, column_name, credentials, column_cache)
-                col_index = get_column_index(sheet_index, column_name, column_cache)
-                if col_index >= 0:
-                    set_dropdown_list_by_id(spreadsheet_id, sheet_index, col_index, num_header_rows, values, credentials, properties_cache)
-                else:
-                    pass
-                    # print(f"Column {column_name} not found in {sheet_title}.")
-        else:
-            print(f"No dropdown configuration found for '{sheet_title}'. Missing or empty configuration.")
+    # Gather every validation for the spreadsheet and send them together
+    requests = build_dropdown_requests(sheets_info, dropdowns_config, column_cache, properties_cache, num_header_rows)
+    summary = batch_update_in_chunks(spreadsheet_id, requests, credentials, session=session, plan=plan)
+    print(f"Merged {summary['requests']} dropdown requests into {summary['batches']} batchUpdate call(s)")
+    return summary
 
 # def upload_metadata_to_drive(adata, descriptions, donor_metadata_config, sample_metadata_config,
 #                            dataset_metadata_config, celltype_metadata_config, gc, credentials, folder_id):
@@ -140,184 +180,499 @@ def apply_dropdowns(spreadsheet_id, credentials, gc,
 #         # Sleep between datasets to avoid API rate limits
 #         sleep(15)
 
-def upload_metadata_to_drive(adata, metadata_config, gc, credentials, folder_id):
+def upload_metadata_to_drive(adata, metadata_config, gc, credentials, folder_id, session=None, metadata_dfs=None):
     """
     Process and upload metadata for each study in the AnnData object, creating separate Google Sheets for Tier 1 and Tier 2 metadata.
 
     Args:
-        adata: AnnData object containing study data.
+        adata: AnnData object containing study data, a path to an .h5ad file, of which only obs is read, or an obs DataFrame.
         metadata_config: Dict with configurations for donor, sample, dataset, and celltype metadata.
         gc: Google Sheets client authorized with the gspread library.
         credentials: Google API credentials.
         folder_id: Google Drive folder ID where the sheets should be moved.
+        session: Optional SheetsSession shared across all API calls.
+        metadata_dfs: Optional schema dataframes keyed by tab name used to configure dropdowns. Dropdowns are skipped if omitted.
     """
-    for study in adata.obs.study.unique():
-        subadata = adata[adata.obs.study == study]
-        dataset_id = subadata.obs['dataset_id'].iloc[0]  # Assuming 'dataset_id' is consistent within a study
+    with _phase_summary(session):
+        # Only obs is needed: the expression matrix is never loaded, and studies are split in one pass over obs
+        # instead of slicing the AnnData once per study
+        for study, obs in obs_table(adata).groupby('study', sort=False, observed=True):
+            dataset_id = obs['dataset_id'].iloc[0]  # Assuming 'dataset_id' is consistent within a study
 
-        # Define tiers and associated metadata types
-        tiers = {
-            'Tier 1': ['Dataset', 'Donor', 'Sample', 'Celltype'],
-            'Tier 2': ['Donor', 'Sample']
-        }
-        # Process each tier
-        for tier, meta_types in tiers.items():
-            SHEET_NAME = f"{dataset_id}_HCA_{tier.lower()}_metadata"
-            spreadsheet = gc.create(SHEET_NAME)
-            file_id = spreadsheet.id
-            # Process each metadata type for the current tier
-            for meta_type in meta_types:
-                tab_name = f"{meta_type.lower()} metadata"
-                # Assuming metadata is stored directly in adata.obs
-                metadata_tb = subadata.obs[[col for col in subadata.obs.columns if col.startswith(meta_type.lower())]]
-                upload_to_sheet(metadata_tb, gc, file_id, tab_name)
-            # Delete the default "Sheet1", if it exists
-            try:
-                delete_sheet(file_id, "Sheet1", gc)
-            except gspread.exceptions.WorksheetNotFound:
-                pass
-                # print("Sheet1 does not exist or was already deleted.")
-            # Apply dropdowns
-            apply_dropdowns(file_id, credentials, gc, metadata_dfs=metadata_dfs, num_header_rows=5)
-            format_all_sheets(file_id, credentials)
-            # Move the sheet to the designated Google Drive folder
-            move_sheet_in_drive(file_id, folder_id, credentials)
-            # Sleep to avoid hitting API rate limits
-            sleep(15)
-
-def generate_empty_metadata_entry_sheets(metadata_dfs, gc, credentials, folder_id, dataset_id, num_header_rows=1):
-    dataset_id = dataset_id  # Static dataset ID
-    # configure your tier 1 and 2 tabs here
-    tiers = {
-        'Tier 1': ['Tier 1 Dataset Metadata', 'Tier 1 Donor Metadata', 'Tier 1 Sample Metadata', 'Tier 1 Celltype Metadata'],
-        'Tier 2': ['Tier 2 Dataset Metadata', 'Tier 2 Donor Metadata', 'Tier 2 Sample Metadata']
-    }
-    # and configure what they will be called in the empty sheets
-    for tier, tabs in tiers.items():
-        SHEET_NAME = f"{dataset_id}_HCA_{tier.lower()}_metadata"
-        spreadsheet = gc.create(SHEET_NAME)
-        file_id = spreadsheet.id
+            # Define tiers and associated metadata types
+            tiers = {
+                'Tier 1': ['Dataset', 'Donor', 'Sample', 'Celltype'],
+                'Tier 2': ['Donor', 'Sample']
+            }
+            # Process each tier
+            for tier, meta_types in tiers.items():
+                SHEET_NAME = f"{dataset_id}_HCA_{tier.lower()}_metadata"
+                with phase('create'):
+                    spreadsheet = call_api(gc.create, SHEET_NAME, kind='drive', session=session)
+                file_id = spreadsheet.id
+                # Process each metadata type for the current tier
+                tables = {}
+                for meta_type in meta_types:
+                    tab_name = f"{meta_type.lower()} metadata"
+                    # Assuming metadata is stored directly in adata.obs, one row per cell; upload one row per entity
+                    columns = [col for col in obs.columns if col.startswith(meta_type.lower())]
+                    key = f"{meta_type.lower()}_id" if f"{meta_type.lower()}_id" in columns else None
+                    tables[tab_name], conflicts = collapse_to_entities(obs, columns, key=key)
+                    if len(conflicts):
+                        print(f"Conflicting {meta_type.lower()} metadata in {study} for {conflicts.iloc[:, 0].nunique()} "
+                              f"{meta_type.lower()}(s):\n{conflicts.to_string(index=False)}")
+                # Write every tab and delete the default "Sheet1" in two requests
+                upload_tables(tables, file_id, credentials, session=session, delete_tabs=("Sheet1",))
+                # Apply dropdowns
+                if metadata_dfs is not None:
+                    apply_dropdowns(file_id, credentials, gc, metadata_dfs=metadata_dfs, num_header_rows=5, session=session,
+                                    delete_default_sheet=False)
+                format_all_sheets(file_id, credentials, session=session)
+                # Move the sheet to the designated Google Drive folder
+                move_sheet_in_drive(file_id, folder_id, credentials, session=session)
+
+# Tabs of the tier 1 and tier 2 empty metadata entry sheets
+EMPTY_SHEET_TIERS = {
+    'Tier 1': ['Tier 1 Dataset Metadata', 'Tier 1 Donor Metadata', 'Tier 1 Sample Metadata', 'Tier 1 Celltype Metadata'],
+    'Tier 2': ['Tier 2 Dataset Metadata', 'Tier 2 Donor Metadata', 'Tier 2 Sample Metadata']
+}
+
+def _empty_metadata_table(metadata_tb, num_header_rows):
+    """Keep the header rows of a schema DataFrame and pad it with empty rows to num_header_rows + 10 rows."""
+    return metadata_tb.iloc[:num_header_rows].reset_index(drop=True).reindex(range(num_header_rows + 10))
+
+def _empty_sheet_dropdown_requests(tabs, sheet_ids, metadata_dfs, num_header_rows, row_count=1000):
+    """
+    Build the setDataValidation requests apply_dropdowns sends for new tabs with known sheet IDs, without reading
+    the spreadsheet back: the headers are the columns of metadata_dfs.
+    """
+    sheets_info = dict(enumerate(tabs))
+    column_cache = {index: {str(col).lower(): idx for idx, col in enumerate(metadata_dfs[tab].columns)}
+                    for index, tab in sheets_info.items()}
+    # format_all_sheets inserts the banner row
+    properties_cache = {index: (sheet_ids[index], row_count + 1) for index in sheets_info}
+    dropdowns_config = convert_numeric_to_string({title.lower(): tab_config for title, tab_config in
+                                                  build_dropdowns_config(metadata_dfs, num_header_rows).items()})
+    return build_dropdown_requests(sheets_info, dropdowns_config, column_cache, properties_cache, num_header_rows)
+
+def _plan_empty_spreadsheet(name, tabs, metadata_dfs, num_header_rows, plan, session=None):
+    """
+    Record every request _build_empty_spreadsheet would send for one spreadsheet, without any API call.
+
+    Sheet IDs are assigned by Sheets when the tabs are created, so the plan numbers the new tabs 1, 2, ... in
+    their place; the default "Sheet1" always has sheet ID 0. Reads are counted as the helpers make them with
+    the given session, or without one.
+
+    Returns:
+        str: The placeholder ID the requests are recorded against, 'new:<name>'.
+    """
+    file_id = f"new:{name}"
+    plan.record(file_id, 'files.create', kind='drive',
+                body={'name': name, 'mimeType': 'application/vnd.google-apps.spreadsheet'})
+    created = [tab for tab in tabs if tab in metadata_dfs]
+    tables = {tab: _empty_metadata_table(metadata_dfs[tab], num_header_rows) for tab in created}
+    # upload_tables reads the tab metadata, then adds every tab and deletes "Sheet1" in one batchUpdate
+    plan.record_reads(file_id, _metadata_reads(1, session))
+    plan.batch_update(file_id, [{'addSheet': {'properties': {
+        'title': tab, 'gridProperties': {'rowCount': max(1000, len(df) + 1), 'columnCount': len(df.columns)}}}}
+        for tab, df in tables.items()] + [{'deleteSheet': {'sheetId': 0}}])
+    plan.record(file_id, 'spreadsheets.values.batchUpdate', body={'valueInputOption': 'RAW', 'data': [
+        {'range': f"{quote_sheet_title(tab)}!A1", 'values': dataframe_to_values(df)} for tab, df in tables.items()]})
+    sheet_ids = list(range(1, len(created) + 1))
+    # format_all_sheets reads the tab metadata again after the writes
+    plan.record_reads(file_id, _metadata_reads(1, session))
+    plan.batch_update(file_id, build_format_requests(sheet_ids))
+    plan.record_reads(file_id, _dropdown_state_reads(len(created), session))
+    plan.batch_update(file_id, _empty_sheet_dropdown_requests(created, sheet_ids, metadata_dfs, num_header_rows))
+    plan.record(file_id, 'files.get', kind='drive')
+    plan.record(file_id, 'files.update', kind='drive')
+    return file_id
+
+def _build_empty_spreadsheet(name, tabs, metadata_dfs, gc, credentials, folder_id, num_header_rows=1, session=None,
+                             fused=False, plan=None):
+    """
+    Create, fill, format and add dropdowns to one empty metadata entry spreadsheet, then move it to folder_id.
+
+    With fused, the spreadsheet is built with create_spreadsheet in three API calls instead of step by step.
+    With a RequestPlan, the requests are recorded instead of sent.
+    """
+    if fused:
+        created = [tab for tab in tabs if tab in metadata_dfs]
         for tab in tabs:
-            if tab in metadata_dfs:
-                metadata_tb = metadata_dfs[tab]
-                if len(metadata_tb) > num_header_rows:
-                    metadata_tb = metadata_tb.iloc[:num_header_rows].copy()
-                while len(metadata_tb) < num_header_rows + 10:
-                    metadata_tb = pd.concat([metadata_tb, pd.DataFrame([{}])], ignore_index=True)
-                upload_to_sheet(metadata_tb, gc, file_id, tab)
-            else:
-                print(f"Missing metadata for {tab}")    
-        try:
-            delete_sheet(file_id, "Sheet1", gc)
-        except gspread.exceptions.WorksheetNotFound:
-            print("\n")
-        format_all_sheets(file_id, credentials)
-        apply_dropdowns(file_id, credentials, gc, metadata_dfs=metadata_dfs, num_header_rows = num_header_rows)
-        move_sheet_in_drive(file_id, folder_id, credentials)
-        sleep(30)
+            if tab not in metadata_dfs:
+                print(f"Missing metadata for {tab}")
+        sheet_ids = list(range(1, len(created) + 1))
+        tables = {tab: _empty_metadata_table(metadata_dfs[tab], num_header_rows) for tab in created}
+        requests = (build_format_requests(sheet_ids)
+                    + _empty_sheet_dropdown_requests(created, sheet_ids, metadata_dfs, num_header_rows))
+        return create_spreadsheet(name, tables, credentials, folder_id, requests=requests,
+                                  sheet_ids=dict(zip(created, sheet_ids)), session=session, plan=plan)
+    if plan is not None:
+        return _plan_empty_spreadsheet(name, tabs, metadata_dfs, num_header_rows, plan, session)
+    with phase('create'):
+        spreadsheet = call_api(gc.create, name, kind='drive', session=session)
+    file_id = spreadsheet.id
+    tables = {}
+    for tab in tabs:
+        if tab in metadata_dfs:
+            tables[tab] = _empty_metadata_table(metadata_dfs[tab], num_header_rows)
+        else:
+            print(f"Missing metadata for {tab}")    
+    upload_tables(tables, file_id, credentials, session=session, delete_tabs=("Sheet1",))
+    format_all_sheets(file_id, credentials, session=session)
+    apply_dropdowns(file_id, credentials, gc, metadata_dfs=metadata_dfs, num_header_rows = num_header_rows, session=session,
+                    delete_default_sheet=False)
+    move_sheet_in_drive(file_id, folder_id, credentials, session=session)
+    return file_id
+
+def _first_entry_row(num_header_rows):
+    """
+    Return the 1-based row of the first entry below the header, the header rows and the banner that
+    format_all_sheets inserts as row 5.
+    """
+    return max(num_header_rows + 2, 5) + 1
+
+@phase('upload')
+def prefill_metadata_entry_sheet(spreadsheet_id, prefill, metadata_dfs, credentials, num_header_rows=1, session=None,
+                                 plan=None):
+    """
+    Write dataset-specific values into the first entry row of an empty metadata entry spreadsheet with one
+    values.batchUpdate request.
+
+    Args:
+        spreadsheet_id (str): The ID of the spreadsheet.
+        prefill (dict): Tab titles mapped to {column: value}, e.g. {'Tier 1 Dataset Metadata': {'dataset_id': 'D1'}}.
+            Tabs or columns missing from metadata_dfs are skipped.
+        metadata_dfs (dict): The schema DataFrames the spreadsheet was built from, giving each tab's columns.
+        credentials: Google API credentials.
+        num_header_rows (int): Number of header rows of the schema DataFrames.
+        session (SheetsSession, optional): Shared session providing the Sheets client.
+        plan (RequestPlan, optional): Record the values.batchUpdate in this plan instead of sending it.
+
+    Returns:
+        int: The number of cells written.
+    """
+    row = _first_entry_row(num_header_rows)
+    data = []
+    for tab, values in prefill.items():
+        if tab not in metadata_dfs:
+            continue
+        columns = list(metadata_dfs[tab].columns)
+        for column, value in values.items():
+            if column in columns:
+                cell = f"{column_to_gsheet_letter(columns.index(column) + 1)}{row}"
+                data.append({'range': f"{quote_sheet_title(tab)}!{cell}", 'values': [[value]]})
+    body = {'valueInputOption': 'RAW', 'data': data}
+    if data and plan is not None:
+        plan.record(spreadsheet_id, 'spreadsheets.values.batchUpdate', body=body)
+    elif data:
+        service = _sheets_service(credentials, session)
+        execute_request(service.spreadsheets().values().batchUpdate(spreadsheetId=spreadsheet_id, body=body),
+                        'write', session)
+        _invalidate(session, spreadsheet_id)
+    return len(data)
+
+def build_metadata_templates(metadata_dfs, gc, credentials, folder_id, num_header_rows=1, session=None, name='HCA',
+                             fused=True):
+    """
+    Build the formatted tier 1 and tier 2 empty metadata entry spreadsheets once, to be copied for every dataset
+    by generate_empty_metadata_entry_sheets.
+
+    Args:
+        metadata_dfs (dict): Schema DataFrames keyed by tab title.
+        gc: Google Sheets client authorized with the gspread library.
+        credentials: Google API credentials.
+        folder_id (str): The Drive folder the templates are kept in.
+        num_header_rows (int): Number of header rows of the schema DataFrames.
+        session (SheetsSession, optional): Shared session used for every API call.
+        name (str): Prefix of the template names, '<name>_tier 1_metadata_template'.
+        fused (bool): Build each template in three API calls with create_spreadsheet. If False, build it step by
+            step through the gspread client, as generate_empty_metadata_entry_sheets does by default.
+
+    Returns:
+        dict: Tier names ('Tier 1', 'Tier 2') mapped to template spreadsheet IDs.
+
+    Example:
+        >>> templates = build_metadata_templates(metadata_dfs, gc, credentials, templates_folder_id, session=session)
+        >>> for dataset_id in dataset_ids:
+        ...     generate_empty_metadata_entry_sheets(metadata_dfs, gc, credentials, folder_id, dataset_id,
+        ...                                          session=session, templates=templates)
+    """
+    with _phase_summary(session):
+        return _build_metadata_templates(metadata_dfs, gc, credentials, folder_id, num_header_rows, session, name, fused)
+
+def _build_metadata_templates(metadata_dfs, gc, credentials, folder_id, num_header_rows=1, session=None, name='HCA',
+                              fused=True):
+    return {tier: _build_empty_spreadsheet(f"{name}_{tier.lower()}_metadata_template", tabs, metadata_dfs, gc,
+                                           credentials, folder_id, num_header_rows, session, fused)
+            for tier, tabs in EMPTY_SHEET_TIERS.items()}
+
+def generate_empty_metadata_entry_sheets(metadata_dfs, gc, credentials, folder_id, dataset_id, num_header_rows=1, session=None, plan=None,
+                                         templates=None, prefill=None, fused=False):
+    """
+    Create the empty tier 1 and tier 2 metadata entry spreadsheets of a dataset in a Drive folder.
+
+    With templates from build_metadata_templates, each spreadsheet is one Drive copy of its tier's template,
+    made directly in folder_id, instead of being created, filled, formatted and moved request by request.
+    With fused, each spreadsheet is built from scratch in three API calls: one spreadsheets.create holding every
+    tab and its cells, one batchUpdate with the formatting and dropdowns, and one Drive update moving it into
+    folder_id (see create_spreadsheet).
+    With prefill, dataset-specific values are then written with one request per spreadsheet.
+    With a RequestPlan, nothing is created: the requests of the chosen path are recorded in the plan offline,
+    against placeholder IDs 'new:<name>', and the plan is returned.
+
+    Returns:
+        dict: Tier names mapped to the IDs of the new spreadsheets, or the plan.
+    """
+    if plan is not None:
+        for tier in EMPTY_SHEET_TIERS:
+            _provision_tier(tier, dataset_id, metadata_dfs, gc, credentials, folder_id, num_header_rows, session,
+                            templates, prefill, fused, plan=plan)
+        return plan
+    dataset_id = dataset_id  # Static dataset ID
+    file_ids = {}
+    with _phase_summary(session):
+        # configure your tier 1 and 2 tabs in EMPTY_SHEET_TIERS
+        # and configure what they will be called in the empty sheets
+        for tier in EMPTY_SHEET_TIERS:
+            file_ids[tier] = _provision_tier(tier, dataset_id, metadata_dfs, gc, credentials, folder_id, num_header_rows,
+                                             session, templates, prefill, fused)
+    return file_ids
+
+def _provision_tier(tier, dataset_id, metadata_dfs, gc, credentials, folder_id, num_header_rows=1, session=None,
+                    templates=None, prefill=None, fused=False, plan=None):
+    """Create one tier's empty metadata entry spreadsheet of a dataset, from its template if given, and prefill it."""
+    file_id = _create_tier_spreadsheet(tier, dataset_id, metadata_dfs, gc, credentials, folder_id, num_header_rows,
+                                       session, templates, fused, plan)
+    _prefill_tier(tier, file_id, prefill, metadata_dfs, credentials, num_header_rows, session, plan)
+    return file_id
+
+def _create_tier_spreadsheet(tier, dataset_id, metadata_dfs, gc, credentials, folder_id, num_header_rows=1,
+                             session=None, templates=None, fused=False, plan=None):
+    """Create one tier's empty metadata entry spreadsheet of a dataset, from its template if given."""
+    SHEET_NAME = f"{dataset_id}_HCA_{tier.lower()}_metadata"
+    if templates is not None:
+        return copy_spreadsheet(templates[tier], SHEET_NAME, folder_id, credentials, session=session, plan=plan)
+    return _build_empty_spreadsheet(SHEET_NAME, EMPTY_SHEET_TIERS[tier], metadata_dfs, gc, credentials, folder_id,
+                                    num_header_rows, session, fused, plan=plan)
+
+def _prefill_tier(tier, file_id, prefill, metadata_dfs, credentials, num_header_rows=1, session=None, plan=None):
+    """Write the prefill values of one tier's tabs into its spreadsheet."""
+    if prefill:
+        tabs = EMPTY_SHEET_TIERS[tier]
+        prefill_metadata_entry_sheet(file_id, {tab: prefill[tab] for tab in tabs if tab in prefill},
+                                     metadata_dfs, credentials, num_header_rows, session=session, plan=plan)
+
+MANIFEST_COLUMNS = ['dataset_id', 'tier', 'file_id', 'status', 'seconds', 'error']
+
+def _read_dataset_manifest(datasets):
+    """Return (dataset IDs, {dataset ID: prefill}) from a list of dataset IDs or a manifest CSV with a dataset_id column."""
+    if isinstance(datasets, (str, os.PathLike)):
+        manifest = pd.read_csv(datasets, dtype=str, keep_default_na=False)
+        if 'dataset_id' not in manifest.columns:
+            raise ValueError(f"{datasets} has no dataset_id column")
+        # Every column of a row is prefilled into the dataset tabs that have it
+        dataset_tabs = [tab for tabs in EMPTY_SHEET_TIERS.values() for tab in tabs if 'Dataset' in tab]
+        prefills = {row['dataset_id']: {tab: {column: value for column, value in row.items() if value != ''}
+                                        for tab in dataset_tabs}
+                    for row in manifest.to_dict('records')}
+        return list(dict.fromkeys(manifest['dataset_id'])), prefills
+    return list(dict.fromkeys(datasets)), {}
+
+def generate_metadata_entry_sheets_batch(metadata_dfs, gc, credentials, folder_id, datasets, num_header_rows=1,
+                                         session=None, templates=None, templates_folder_id=None, manifest_path=None,
+                                         max_workers=4):
+    """
+    Create the empty tier 1 and tier 2 metadata entry spreadsheets of many datasets.
+
+    The tier templates, and with them the trimmed and padded header tables and the dropdown configuration, are
+    built once (see build_metadata_templates); every spreadsheet is then a Drive copy, made by max_workers
+    threads whose requests are paced by the session's scheduler. Each created or failed spreadsheet is appended
+    to the manifest CSV as soon as its dataset is done, and spreadsheets already recorded as created there are
+    skipped, so a batch that stopped part way can be rerun with the same arguments to finish it. A spreadsheet
+    that was copied but could not be prefilled is recorded as failed with its file_id, and the rerun prefills
+    that copy instead of making another. Templates built by the batch are saved next to the manifest, in
+    <manifest>_templates.json, and reused by the reruns.
+
+    Args:
+        metadata_dfs (dict): Schema DataFrames keyed by tab title.
+        gc: Google Sheets client authorized with the gspread library.
+        credentials: Google API credentials.
+        folder_id (str): The Drive folder the spreadsheets are created in.
+        datasets (list or str): Dataset IDs, or the path of a CSV with a dataset_id column whose other columns
+            are prefilled into the dataset tabs, e.g. dataset_id,title.
+        num_header_rows (int): Number of header rows of the schema DataFrames.
+        session (SheetsSession, optional): Shared session used for every API call.
+        templates (dict, optional): Tier names mapped to template IDs from an earlier build_metadata_templates.
+        templates_folder_id (str, optional): Folder the templates are built in if templates is omitted and no
+            earlier run of the batch saved them. Defaults to folder_id.
+        manifest_path (str, optional): CSV recording the spreadsheets created, read first to resume a batch.
+        max_workers (int): Number of datasets provisioned concurrently.
+
+    Returns:
+        pandas.DataFrame: The manifest, one row per dataset and tier with the columns dataset_id, tier, file_id,
+            status ('created' or 'failed'), seconds and error.
+
+    Example:
+        >>> manifest = generate_metadata_entry_sheets_batch(metadata_dfs, gc, credentials, folder_id,
+        ...                                                 'cohort.csv', session=session, manifest_path='cohort_sheets.csv')
+        >>> manifest[manifest.status == 'failed']
+    """
+    dataset_ids, prefills = _read_dataset_manifest(datasets)
+    previous = pd.DataFrame(columns=MANIFEST_COLUMNS)
+    if manifest_path is not None and os.path.exists(manifest_path):
+        previous = pd.read_csv(manifest_path, dtype={'dataset_id': str, 'file_id': str}, keep_default_na=False)
+    created = set(zip(*[previous.loc[previous['status'] == 'created', column] for column in ('dataset_id', 'tier')]))
+    # Spreadsheets copied by an earlier run whose prefill failed are prefilled again rather than copied again
+    latest = previous.drop_duplicates(['dataset_id', 'tier'], keep='last')
+    latest = latest[(latest['status'] == 'failed') & (latest['file_id'] != '')]
+    copied = dict(zip(zip(latest['dataset_id'], latest['tier']), latest['file_id']))
+    pending = [(dataset_id, [tier for tier in EMPTY_SHEET_TIERS if (dataset_id, tier) not in created])
+               for dataset_id in dataset_ids]
+    pending = [(dataset_id, tiers) for dataset_id, tiers in pending if tiers]
+    rows = []
+
+    def provision(item):
+        dataset_id, tiers = item
+        results = []
+        for tier in tiers:
+            start = time.perf_counter()
+            file_id = copied.get((dataset_id, tier), '')
+            try:
+                if not file_id:
+                    file_id = _create_tier_spreadsheet(tier, dataset_id, metadata_dfs, gc, credentials, folder_id,
+                                                       num_header_rows, session, templates)
+                _prefill_tier(tier, file_id, prefills.get(dataset_id), metadata_dfs, credentials, num_header_rows,
+                              session)
+                results.append([dataset_id, tier, file_id, 'created', time.perf_counter() - start, ''])
+            except Exception as e:
+                # Keep the ID of a spreadsheet that was copied before the failure so the rerun reuses it
+                results.append([dataset_id, tier, file_id, 'failed', time.perf_counter() - start, str(e)])
+        return results
+
+    templates_path = None if manifest_path is None else os.path.splitext(manifest_path)[0] + '_templates.json'
+    if pending and templates is None and templates_path is not None and os.path.exists(templates_path):
+        with open(templates_path) as f:
+            templates = json.load(f)
+
+    with _phase_summary(session):
+        if pending and templates is None:
+            templates = _build_metadata_templates(metadata_dfs, gc, credentials, templates_folder_id or folder_id,
+                                                  num_header_rows, session)
+            if templates_path is not None:
+                with open(templates_path, 'w') as f:
+                    json.dump(templates, f, indent=1)
+        for results in imap_spreadsheets(provision, pending, max_workers=max_workers):
+            rows.extend(results)
+            if manifest_path is not None:
+                pd.DataFrame(results, columns=MANIFEST_COLUMNS).to_csv(
+                    manifest_path, mode='a', index=False, header=not os.path.exists(manifest_path))
+            failed = [row for row in results if row[3] == 'failed']
+            print(f"{results[0][0]}: {len(results) - len(failed)} created, {len(failed)} failed")
+    frames = [frame for frame in (previous, pd.DataFrame(rows, columns=MANIFEST_COLUMNS)) if len(frame)]
+    manifest = pd.concat(frames, ignore_index=True) if frames else previous
+    # A tier that failed and was created on a later run keeps only its latest row
+    return manifest.drop_duplicates(['dataset_id', 'tier'], keep='last').reset_index(drop=True)
 
 # Helper function for debugging
 def debug_print(msg, var):
     print(f"{msg}: {var}")
 
-def debug_generate_empty_metadata_entry_sheets(metadata_dfs, gc, credentials, folder_id, dataset_id, num_header_rows=1):
+def debug_generate_empty_metadata_entry_sheets(metadata_dfs, gc, credentials, folder_id, dataset_id, num_header_rows=1, session=None):
     debug_print("Starting to generate empty metadata entry sheets", "")
     dataset_id = dataset_id  # Static dataset ID
-    # configure your tier 1 and 2 tabs here
-    tiers = {
-        'Tier 1': ['Tier 1 Dataset Metadata', 'Tier 1 Donor Metadata', 'Tier 1 Sample Metadata', 'Tier 2 Celltype Metadata'],
-        'Tier 2': ['Tier 2 Dataset Metadata', 'Tier 2 Donor Metadata', 'Tier 2 Sample Metadata']
-    }
-    # and configure what they will be called in the empty sheets
-    for tier, tabs in tiers.items():
-        SHEET_NAME = f"{dataset_id}_HCA_{tier.lower()}_metadata"
-        spreadsheet = gc.create(SHEET_NAME)
-        file_id = spreadsheet.id
-        debug_print("Created spreadsheet with ID", file_id)
-        for tab in tabs:
-            # tab_name = tab.replace('Tier 1 ', '').replace('Tier 2 ', '')
-            debug_print("Processing tab", tab)
-            if tab in metadata_dfs:
-                metadata_tb = metadata_dfs[tab]
-                debug_print("Initial metadata table", metadata_tb.head())
-                if len(metadata_tb) > num_header_rows:
-                    metadata_tb = metadata_tb.iloc[:num_header_rows].copy()
-                debug_print("Metadata table after trimming", metadata_tb)
-                while len(metadata_tb) < num_header_rows + 10:
-                    metadata_tb = pd.concat([metadata_tb, pd.DataFrame([{}])], ignore_index=True)
-                upload_to_sheet(metadata_tb, gc, file_id, tab)
-            else:
-                print(f"Missing metadata for {tab}")    
-        try:
-            delete_sheet(file_id, "Sheet1", gc)
-        except gspread.exceptions.WorksheetNotFound:
-            print("Sheet1 does not exist or was already deleted.")
-        format_all_sheets(file_id, credentials)
-        apply_dropdowns(file_id, credentials, gc, metadata_dfs=metadata_dfs, num_header_rows=5)
-        move_sheet_in_drive(file_id, folder_id, credentials)
-        sleep(30)
-
-
-def update_existing_sheets(folder_id, credentials, gc, metadata_dfs, num_header_rows=1, attempts = 8):
-    """Update existing Google Sheets with new column headers and dropdown configurations."""
-    sheets_service = build('sheets', 'v4', credentials=credentials)
-    # List all sheets in the folder
-    sheets = list_google_sheets(credentials, folder_id)
-    for sheet_info in sheets:
-        spreadsheet_id = sheet_info['id']
-        attempt = 0  # Initialize attempt counter
-        while attempt < attempts:  # Allow up to 5 attempts
-            try:
-                # Load the current structure of the spreadsheet
-                current_sheets = gc.open_by_key(spreadsheet_id).worksheets()
-                current_sheets_dict = {sheet.title: sheet for sheet in current_sheets}
-                # Prepare for updates
-                requests = []
-                for tab_name, df_config in metadata_dfs.items():
-                    # Prepare data from the configuration dataframe
-                    valid_rows = df_config.iloc[num_header_rows:]
-                    dropdown_config = {col: valid_rows[col].dropna().unique().tolist() for col in df_config.columns if not valid_rows[col].isnull().all()}
-                    if tab_name in current_sheets_dict:
-                        sheet = current_sheets_dict[tab_name]
-                        current_headers = sheet.row_values(1)  # Assuming headers are in the first row
-                        header_to_index = {header: i for i, header in enumerate(current_headers)}
-                        config_headers = list(df_config.columns)
-                        # Check for new columns and append them
-                        for col in config_headers:
-                            if col not in current_headers:
-                                insert_at_index = config_headers.index(col)  # Find index from metadata_dfs
-                                # Append column at the specific index found from metadata_dfs
-                                requests.append({
-                                    'insertDimension': {
-                                        'range': {
-                                            'sheetId': sheet.id,
-                                            'dimension': 'COLUMNS',
-                                            'startIndex': insert_at_index,
-                                            'endIndex': insert_at_index + 1
-                                        },
-                                        'inheritFromBefore': False
-                                    }
-                                })
-                                # Need to update local tracking of headers and indices post-insertion
-                                current_headers.insert(insert_at_index, col)
-                                header_to_index = {header: i for i, header in enumerate(current_headers)}  # Re-map headers to indices
-                        # Set or update dropdowns
-                        for column, values in dropdown_config.items():
-                            column_index = header_to_index[column] + 1  # 1-based index for Sheets API
-                            if values:  # Only add dropdowns if there are actual options
-                                dropdown_request = create_set_dropdown_request(sheet.id, column_index - 1, values, num_header_rows = num_header_rows, max_rows = len(sheet.get_all_values()))
-                                requests.append(dropdown_request)
-                if requests:
-                    body = {'requests': requests}
-                    response = sheets_service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
-                    print(f"Updated {len(requests)} elements in spreadsheet '{spreadsheet_id}'")
-                break  # Exit loop after successful update
-            except Exception as e:
-                if 'Quota exceeded' in str(e) and attempt < attempts - 1:  # Check if the error is due to quota exceeded
-                    sleep_time = backoff(attempt)
-                    print(f"Google Sheets API quota exceeded, retrying after {sleep_time:.2f} seconds...")
-                    time.sleep(sleep_time)
-                    attempt += 1
+    with _phase_summary(session):
+        # configure your tier 1 and 2 tabs here
+        tiers = {
+            'Tier 1': ['Tier 1 Dataset Metadata', 'Tier 1 Donor Metadata', 'Tier 1 Sample Metadata', 'Tier 2 Celltype Metadata'],
+            'Tier 2': ['Tier 2 Dataset Metadata', 'Tier 2 Donor Metadata', 'Tier 2 Sample Metadata']
+        }
+        # and configure what they will be called in the empty sheets
+        for tier, tabs in tiers.items():
+            SHEET_NAME = f"{dataset_id}_HCA_{tier.lower()}_metadata"
+            with phase('create'):
+                spreadsheet = call_api(gc.create, SHEET_NAME, kind='drive', session=session)
+            file_id = spreadsheet.id
+            debug_print("Created spreadsheet with ID", file_id)
+            for tab in tabs:
+                # tab_name = tab.replace('Tier 1 ', '').replace('Tier 2 ', '')
+                debug_print("Processing tab", tab)
+                if tab in metadata_dfs:
+                    metadata_tb = metadata_dfs[tab]
+                    debug_print("Initial metadata table", metadata_tb.head())
+                    if len(metadata_tb) > num_header_rows:
+                        metadata_tb = metadata_tb.iloc[:num_header_rows].copy()
+                    debug_print("Metadata table after trimming", metadata_tb)
+                    while len(metadata_tb) < num_header_rows + 10:
+                        metadata_tb = pd.concat([metadata_tb, pd.DataFrame([{}])], ignore_index=True)
+                    upload_to_sheet(metadata_tb, gc, file_id, tab, session=session)
                 else:
-                    print(f"Failed to update sheet {spreadsheet_id} on attempt {attempt + 1}: {str(e)}")
-                    break  # Break after max attempts or other types of errors
+                    print(f"Missing metadata for {tab}")    
+            try:
+                with phase('upload'):
+                    delete_sheet(file_id, "Sheet1", gc, session=session)
+            except gspread.exceptions.WorksheetNotFound:
+                print("Sheet1 does not exist or was already deleted.")
+            format_all_sheets(file_id, credentials, session=session)
+            apply_dropdowns(file_id, credentials, gc, metadata_dfs=metadata_dfs, num_header_rows=5, session=session)
+            move_sheet_in_drive(file_id, folder_id, credentials, session=session)
+
+
+@phase('update')
+def _update_spreadsheet(spreadsheet_id, get_service, metadata_dfs, dropdowns_config, num_header_rows, attempts, session, plan=None):
+    """Add missing columns and changed dropdowns to one spreadsheet. Returns the number of requests sent, or None on failure."""
+    try:
+        # Load the headers, row counts and current dropdowns of every tab in one read
+        header_state = fetch_header_state(get_service, spreadsheet_id, metadata_dfs, num_header_rows=num_header_rows, session=session)
+        requests = plan_sheet_updates(header_state, metadata_dfs, dropdowns_config, num_header_rows=num_header_rows)
+        if plan is not None:
+            # The tab titles, then the headers with their dropdowns unless no schema tab exists; workers share
+            # the scheduler, so its read count cannot be attributed to this spreadsheet
+            plan.record_reads(spreadsheet_id, _metadata_reads(1, session) + bool(header_state))
+            if requests:
+                plan.record(spreadsheet_id, 'spreadsheets.batchUpdate', body={'requests': requests})
+        elif requests:
+            body = {'requests': requests}
+            request = get_service().spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body)
+            response = execute_request(request, 'write', session, max_attempts=attempts)
+            _invalidate(session, spreadsheet_id)
+            print(f"Updated {len(requests)} elements in spreadsheet '{spreadsheet_id}'")
+        return len(requests)
+    except Exception as e:
+        # Quota errors have already been retried by the scheduler
+        print(f"Failed to update sheet {spreadsheet_id}: {str(e)}")
+        return None
+
+def update_existing_sheets(folder_id, credentials, gc, metadata_dfs, num_header_rows=1, attempts = 8, session=None, max_workers=1, sheets=None, plan=None):
+    """
+    Update existing Google Sheets with new column headers and dropdown configurations.
+
+    Spreadsheets are processed by up to max_workers threads; a failure in one spreadsheet does not affect the others.
+    Every call is paced by the request scheduler, which retries quota errors up to `attempts` times.
+    Pass `sheets` (e.g. the changed spreadsheets from sync.fetch_folder_changes) to update only those instead of
+    every spreadsheet listed in the folder.
+
+    The dropdown configuration is derived from metadata_dfs once per run. Each spreadsheet costs one batched read
+    of its headers and dropdowns plus, only if it differs from the schema, one batchUpdate with the differences.
+    `gc` is no longer used and is kept for backwards compatibility. With a RequestPlan, the headers are still read
+    but the batchUpdates are recorded in the plan instead of sent.
+
+    Returns:
+        dict: Spreadsheet IDs, in listing order, mapped to the number of update requests sent, or None if the update failed.
+    """
+    get_service = _thread_sheets_service(credentials, session)
+    with _phase_summary(session):
+        if sheets is None:
+            # List all sheets in the folder
+            drive_calls_before = _drive_calls_made(session)
+            with phase('list'):
+                sheets = list_google_sheets(credentials, folder_id, session=session)
+            if plan is not None:
+                # One files.list per page of the listing
+                for _ in range(_drive_calls_made(session) - drive_calls_before):
+                    plan.record(folder_id, 'files.list', kind='drive')
+        dropdowns_config = build_dropdowns_config(metadata_dfs, num_header_rows=num_header_rows)
+        results = map_spreadsheets(
+            lambda sheet_info: _update_spreadsheet(sheet_info['id'], get_service, metadata_dfs, dropdowns_config, num_header_rows, attempts, session, plan),
+            sheets, max_workers=max_workers)
+    return {sheet_info['id']: result for sheet_info, result in zip(sheets, results)}
@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name='hca_metadata_manager',
     version='0.1',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks']),
     package_data={
         'hca_metadata_manager': ['data/*.csv'],
         '': ['data/*.csv'],
@@ -20,6 +20,11 @@ setup(
         'numpy',
         'scanpy'
     ],
+    extras_require={
+        'cache': ['pyarrow'],
+        'parallel': ['pyarrow'],
+        'store': ['pyarrow'],
+    },
     entry_points={
         'console_scripts': [
             # Add any console scripts if necessary
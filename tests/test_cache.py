@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from hca_metadata_manager.cache import SheetCache
+from hca_metadata_manager.utils import load_sheets_metadata
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+@unittest.skipUnless(HAS_PYARROW, 'pyarrow is required for the Parquet cache')
+class TestSheetCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.endpoint = FakeGoogleBackend()
+        description_rows = [['description'], ['examples'], ['required'], ['tier']]
+        self.endpoint.add_spreadsheet('sheet0', 'Study0 metadata', {
+            'Donor Metadata': [['donor_id', '', 'sex']] + description_rows + [['D1', 'x', 'female'], ['D2']],
+        })
+        self.endpoint.add_spreadsheet('sheet1', 'Study1 metadata', {
+            'Donor Metadata': [['donor_id']] + description_rows + [['D3']],
+        })
+        self.googlesheets = [
+            {'id': 'sheet0', 'name': 'Study0', 'modifiedTime': '2024-05-01T10:00:00.000Z', 'version': '12'},
+            {'id': 'sheet1', 'name': 'Study1', 'modifiedTime': '2024-05-02T10:00:00.000Z', 'version': '7'},
+        ]
+        self.session = self.endpoint.session()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def load(self, googlesheets):
+        return load_sheets_metadata(self.session.credentials, googlesheets, session=self.session,
+                                    cache=SheetCache(self.cache_dir))
+
+    def test_unchanged_spreadsheets_are_served_from_disk(self):
+        first = self.load(self.googlesheets)
+        self.assertEqual(len(self.endpoint.requests), 4)
+        second = self.load(self.googlesheets)
+        self.assertEqual(len(self.endpoint.requests), 4)
+        pd.testing.assert_frame_equal(first['donor'], second['donor'])
+        self.assertEqual(list(second['donor'].columns), ['donor_id', '', 'sex', 'worksheet'])
+
+    def test_repeated_headers_round_trip(self):
+        cache = SheetCache(self.cache_dir)
+        df = pd.DataFrame([['D1', 'female', None]], columns=['donor_id', 'sex', 'sex'])
+        cache.store(self.googlesheets[0], [('donor', df)])
+        self.assertTrue(SheetCache(self.cache_dir).is_fresh(self.googlesheets[0]))
+        [(metadata_type, loaded)] = SheetCache(self.cache_dir).load('sheet0')
+        self.assertEqual(metadata_type, 'donor')
+        self.assertEqual(loaded.values.tolist(), df.values.tolist())
+        self.assertEqual(list(loaded.columns), ['donor_id', 'sex', 'sex'])
+
+    def test_modified_spreadsheet_is_fetched_again(self):
+        self.load(self.googlesheets)
+        self.googlesheets[1] = dict(self.googlesheets[1], modifiedTime='2024-06-01T10:00:00.000Z', version='8')
+        self.load(self.googlesheets)
+        self.assertEqual(len(self.endpoint.requests), 6)
+        self.assertEqual(SheetCache(self.cache_dir).spreadsheet_ids(), ['sheet0', 'sheet1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
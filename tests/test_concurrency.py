@@ -0,0 +1,71 @@
+import unittest
+import pandas as pd
+from hca_metadata_manager.utils import iter_sheets_metadata, load_sheets_metadata, merge_metadata_tables
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
+
+
+class TestConcurrentLoad(unittest.TestCase):
+    def setUp(self):
+        self.endpoint = FakeGoogleBackend(latency=0.01)
+        description_rows = [['description'], ['examples'], ['required'], ['tier']]
+        self.googlesheets = []
+        for i in range(12):
+            spreadsheet_id = f'sheet{i}'
+            self.endpoint.add_spreadsheet(spreadsheet_id, f'Study{i} tier 1 metadata', {
+                'Donor Metadata': [['donor_id', 'sex']] + description_rows + [[f'D{i}_{j}', 'female'] for j in range(i % 3 + 1)],
+                'Sample Metadata': [['sample_id']] + description_rows + [[f'S{i}']],
+                'Notes': [['ignored']],
+            })
+            self.googlesheets.append({'id': spreadsheet_id, 'name': f'Study{i}'})
+        self.endpoint.failing.add('sheet5')
+
+    def session(self):
+        return self.endpoint.session()
+
+    def load(self, max_workers):
+        session = self.session()
+        return load_sheets_metadata(session.credentials, self.googlesheets, session=session, max_workers=max_workers)
+
+    def test_concurrent_load_matches_sequential(self):
+        sequential = self.load(max_workers=1)
+        concurrent = self.load(max_workers=6)
+        self.assertEqual(sorted(sequential), ['donor', 'sample'])
+        for metadata_type in sequential:
+            pd.testing.assert_frame_equal(sequential[metadata_type], concurrent[metadata_type])
+
+    def test_failed_spreadsheet_is_isolated(self):
+        all_dfs = self.load(max_workers=4)
+        self.assertNotIn('Study5', set(all_dfs['sample']['worksheet']))
+        self.assertEqual(len(all_dfs['sample']), 11)
+        self.assertEqual(list(all_dfs['sample']['worksheet'])[:2], ['Study0', 'Study1'])
+
+    def test_two_requests_per_spreadsheet(self):
+        self.load(max_workers=4)
+        self.assertEqual(len(self.endpoint.requests), 2 * 11 + 1)
+
+
+    def test_stream_is_ordered_and_lazy(self):
+        session = self.session()
+        pulled = []
+        def listing():
+            for sheet_info in self.googlesheets:
+                pulled.append(sheet_info['id'])
+                yield sheet_info
+        stream = iter_sheets_metadata(session.credentials, listing(), session=session, max_workers=3)
+        self.assertEqual(next(stream)[:2], ('sheet0', 'donor'))
+        self.assertLessEqual(len(pulled), 3)
+        rest = list(stream)
+        self.assertEqual([entry[:2] for entry in rest[:3]], [('sheet0', 'sample'), ('sheet1', 'donor'), ('sheet1', 'sample')])
+        self.assertNotIn('sheet5', {spreadsheet_id for spreadsheet_id, _, _ in rest})
+
+    def test_merge_concatenates_in_order(self):
+        first = pd.DataFrame({'donor_id': ['D1']})
+        merged = merge_metadata_tables([[('donor', first)], None, [('donor', pd.DataFrame({'donor_id': ['D2'], 'sex': ['male']}))],
+                                        [('sample', pd.DataFrame({'sample_id': ['S1']}))]])
+        self.assertEqual(list(merged), ['donor', 'sample'])
+        self.assertEqual(merged['donor']['donor_id'].tolist(), ['D1', 'D2'])
+        self.assertEqual(list(merged['donor'].columns), ['donor_id', 'sex'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from googleapiclient.errors import HttpError
+from hca_metadata_manager.fake_backend import UNLIMITED_QUOTAS, FakeGoogleBackend, parse_a1_range
+from hca_metadata_manager.utils import list_google_sheets, load_sheets_metadata, upload_to_sheet
+from hca_metadata_manager.workflow import generate_empty_metadata_entry_sheets
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFakeGoogleBackend(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.backend = FakeGoogleBackend(quotas={'read': 5}, clock=self.clock)
+        self.backend.add_folder('target', 'root')
+        self.session = self.backend.session()
+
+    def test_sessions_get_their_own_unthrottled_scheduler(self):
+        other = self.backend.session()
+        self.assertIsNot(other.scheduler, self.session.scheduler)
+        self.assertEqual(other.scheduler.buckets['write'].rate, UNLIMITED_QUOTAS['write']['per_user'] / 60)
+
+    def test_parse_a1_range(self):
+        self.assertEqual(parse_a1_range("'Donor''s tab'!B2:C10"), ("Donor's tab", (1, 1, 10, 3)))
+        self.assertEqual(parse_a1_range("'Sheet1'!1:2"), ('Sheet1', (0, 0, 2, None)))
+        self.assertEqual(parse_a1_range('Sheet1'), ('Sheet1', (0, 0, None, None)))
+
+    def test_generation_runs_end_to_end(self):
+        self.backend.quotas = {}
+        metadata_dfs = {'Tier 1 Donor Metadata': pd.DataFrame({'donor_id': ['id', None], 'sex': ['sex', 'female']})}
+        generate_empty_metadata_entry_sheets(metadata_dfs, self.session.gc, None, 'target', 'Kimler2025', session=self.session)
+        [tier1, tier2] = self.backend.spreadsheets.values()
+        self.assertEqual(tier1['parents'], ['target'])
+        self.assertEqual(list(tier1['tabs']), ['Tier 1 Donor Metadata'])
+        self.assertEqual(tier1['tabs']['Tier 1 Donor Metadata'][0], ['donor_id', 'sex'])
+        self.assertEqual(tier1['validations'], {'Tier 1 Donor Metadata': {1: ['female']}})
+        self.assertEqual(list(tier2['tabs']), [])
+        counts = self.backend.counts()
+        self.assertEqual(counts['drive'], 6)
+        self.assertGreater(counts['write'], 0)
+
+    def test_gspread_round_trip(self):
+        self.backend.quotas = {}
+        self.backend.add_spreadsheet('sheet0', 'Study0', {'Sheet1': []}, folder_id='target')
+        upload_to_sheet(pd.DataFrame({'donor_id': ['D1', 'D2']}), self.session.gc, 'sheet0', 'donor metadata',
+                        session=self.session)
+        worksheet = self.session.gc.open_by_key('sheet0').worksheet('donor metadata')
+        self.assertEqual(worksheet.get_all_values(), [['donor_id'], ['D1'], ['D2']])
+
+    def test_quota_window_returns_429(self):
+        self.backend.add_spreadsheet('sheet0', 'Study0', {'Sheet1': []})
+        service = self.session.sheets
+        for _ in range(5):
+            service.spreadsheets().get(spreadsheetId='sheet0').execute()
+        with self.assertRaises(HttpError) as raised:
+            service.spreadsheets().get(spreadsheetId='sheet0').execute()
+        self.assertEqual(raised.exception.resp.status, 429)
+        self.clock.now += 60
+        service.spreadsheets().get(spreadsheetId='sheet0').execute()
+        self.assertEqual(self.backend.counts()['rate_limited'], 1)
+
+    @patch('hca_metadata_manager.scheduler.backoff', return_value=0.0)
+    def test_injected_rate_limits_are_retried(self, mock_backoff):
+        self.backend.quotas = {}
+        self.backend.add_spreadsheet('sheet0', 'Study0', {'Donor Metadata': [['donor_id'], [], [], [], [], ['D1']]},
+                                     folder_id='target')
+        self.backend.inject_rate_limits(2)
+        sheets = list_google_sheets(None, 'target', session=self.session)
+        metadata = load_sheets_metadata(None, sheets, session=self.session)
+        self.assertEqual(metadata['donor']['donor_id'].tolist(), ['D1'])
+        self.assertEqual(mock_backoff.call_count, 2)
+        self.assertEqual(self.session.scheduler.retries, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
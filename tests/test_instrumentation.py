@@ -0,0 +1,127 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import Mock, patch
+import pandas as pd
+from hca_metadata_manager.instrumentation import HistogramSink, JsonLinesSink, PrometheusSink, phase
+from hca_metadata_manager.scheduler import RequestScheduler
+from hca_metadata_manager.workflow import update_existing_sheets
+from hca_metadata_manager.fake_backend import UNLIMITED_QUOTAS, FakeGoogleBackend
+
+
+class RateLimited(Exception):
+    pass
+
+
+def record(**fields):
+    defaults = {'call': 'sheets.spreadsheets.get', 'kind': 'read', 'spreadsheet_id': 'sheet0', 'phase': 'upload',
+                'latency': 0.2, 'payload_bytes': 100, 'retries': 0, 'throttle_seconds': 0.0, 'ok': True}
+    defaults.update(fields)
+    return defaults
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_histogram_summarises_per_phase(self):
+        histogram = HistogramSink()
+        histogram.record(record(latency=0.03))
+        histogram.record(record(latency=0.7, retries=2, throttle_seconds=1.5, ok=False))
+        histogram.record(record(phase='move', kind='drive', call='drive.files.update', payload_bytes=0))
+        summary = histogram.summary()
+        self.assertEqual(list(summary), ['upload', 'move'])
+        self.assertEqual(summary['upload']['calls'], 2)
+        self.assertEqual(summary['upload']['errors'], 1)
+        self.assertEqual(summary['upload']['retries'], 2)
+        self.assertEqual(summary['upload']['bytes'], 200)
+        self.assertAlmostEqual(summary['upload']['throttle_seconds'], 1.5)
+        self.assertEqual(summary['upload']['p50'], 0.05)
+        self.assertEqual(summary['upload']['p95'], 1.0)
+
+    def test_json_lines_sink_appends_records(self):
+        path = os.path.join(self.tmp_dir, 'calls.jsonl')
+        sink = JsonLinesSink(path)
+        sink.record(record())
+        sink.record(record(phase='format'))
+        with open(path) as f:
+            phases = [json.loads(line)['phase'] for line in f]
+        self.assertEqual(phases, ['upload', 'format'])
+
+    def test_prometheus_sink_writes_cumulative_buckets(self):
+        path = os.path.join(self.tmp_dir, 'metrics.prom')
+        sink = PrometheusSink(path)
+        sink.record(record(latency=0.03))
+        sink.record(record(latency=0.3, retries=1))
+        sink.flush()
+        with open(path) as f:
+            text = f.read()
+        labels = 'phase="upload",kind="read",call="sheets.spreadsheets.get"'
+        self.assertIn('# TYPE hca_api_request_duration_seconds histogram', text)
+        self.assertIn(f'hca_api_request_duration_seconds_bucket{{{labels},le="0.05"}} 1', text)
+        self.assertIn(f'hca_api_request_duration_seconds_bucket{{{labels},le="0.5"}} 2', text)
+        self.assertIn(f'hca_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f'hca_api_request_duration_seconds_count{{{labels}}} 2', text)
+        self.assertIn(f'hca_api_retries_total{{{labels}}} 1', text)
+
+
+class TestSchedulerInstrumentation(unittest.TestCase):
+    def test_records_retries_phase_and_spreadsheet(self):
+        histogram = HistogramSink()
+        records = []
+        sink = Mock(record=records.append)
+        scheduler = RequestScheduler(quotas=UNLIMITED_QUOTAS, sinks=[histogram, sink])
+        spreadsheet = Mock(id='sheet0')
+        spreadsheet.batch_update.side_effect = [RateLimited('Quota exceeded for quota metric'), {'replies': []}]
+        spreadsheet.batch_update.__qualname__ = 'Spreadsheet.batch_update'
+        with patch('hca_metadata_manager.scheduler.backoff', return_value=1.0), redirect_stdout(io.StringIO()):
+            with phase('format'):
+                scheduler.call(spreadsheet.batch_update, 'write', {'requests': []})
+        [call] = records
+        self.assertEqual(call['call'], 'gspread.Spreadsheet.batch_update')
+        self.assertEqual(call['phase'], 'format')
+        self.assertEqual(call['retries'], 1)
+        self.assertEqual(call['throttle_seconds'], 1.0)
+        self.assertEqual(call['payload_bytes'], len(json.dumps([[{'requests': []}], {}])))
+        self.assertTrue(call['ok'])
+        self.assertEqual(histogram.summary()['format']['calls'], 1)
+
+    def test_workflow_prints_phase_summary(self):
+        endpoint = FakeGoogleBackend()
+        endpoint.add_spreadsheet('sheet0', 'Study0 metadata', {'Donor Metadata': [['donor_id'], ['D1']]})
+        session = endpoint.session()
+        metadata_dfs = {'Donor Metadata': pd.DataFrame(columns=['donor_id', 'sex'])}
+        output = io.StringIO()
+        with redirect_stdout(output):
+            update_existing_sheets('folder', None, None, metadata_dfs, session=session, max_workers=2)
+        lines = output.getvalue().splitlines()
+        self.assertTrue(any(line.startswith('list: 1 calls') for line in lines))
+        self.assertTrue(any(line.startswith('update: 3 calls') for line in lines))
+        self.assertEqual(session.scheduler.sinks, [])
+
+    def test_summary_covers_only_the_current_run(self):
+        endpoint = FakeGoogleBackend()
+        endpoint.add_spreadsheet('sheet0', 'Study0 metadata', {'Donor Metadata': [['donor_id'], ['D1']]})
+        session = endpoint.session()
+        metadata_dfs = {'Donor Metadata': pd.DataFrame(columns=['donor_id', 'sex'])}
+        outputs = []
+        for _ in range(2):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                update_existing_sheets('folder', None, None, metadata_dfs, session=session)
+            outputs.append([line for line in output.getvalue().splitlines() if line.startswith('read: ')])
+        # The second run reads the same spreadsheet and sends nothing, so it reports only its own reads
+        self.assertEqual(outputs[0], ['read: 2 requests, throttled 0 times, waited 0.0s'])
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(session.scheduler.buckets['read'].acquired, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from hca_metadata_manager.utils import iter_google_sheets, list_google_sheets
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
+
+
+class TestListGoogleSheets(unittest.TestCase):
+    def setUp(self):
+        self.endpoint = FakeGoogleBackend()
+        self.endpoint.files_page_size = 2
+        for i in range(5):
+            self.endpoint.add_spreadsheet(f'top{i}', f'Top{i}', {})
+        self.endpoint.add_folder('sub', 'folder')
+        self.endpoint.add_folder('subsub', 'sub')
+        self.endpoint.add_spreadsheet('nested', 'Nested', {}, folder_id='sub')
+        self.endpoint.add_spreadsheet('deep', 'Deep', {}, folder_id='subsub')
+        self.endpoint.add_spreadsheet('trashed', 'Trashed', {})
+        self.endpoint.trash_spreadsheet('trashed')
+        self.session = self.endpoint.session()
+
+    def test_follows_pagination(self):
+        sheets = list_google_sheets(self.session.credentials, 'folder', session=self.session)
+        self.assertEqual([sheet['id'] for sheet in sheets], [f'top{i}' for i in range(5)])
+        self.assertEqual(len(self.endpoint.requests), 3)
+
+    def test_walks_nested_folders(self):
+        sheets = list(iter_google_sheets(self.session.credentials, 'folder', session=self.session, max_workers=2))
+        self.assertEqual([sheet['id'] for sheet in sheets], [f'top{i}' for i in range(5)] + ['nested', 'deep'])
+        self.assertEqual(sheets[-1]['parents'], ['subsub'])
+        self.assertIn('modifiedTime', sheets[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
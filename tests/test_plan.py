@@ -0,0 +1,120 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+from hca_metadata_manager.plan import RequestPlan
+from hca_metadata_manager.workflow import build_metadata_templates, generate_empty_metadata_entry_sheets, update_existing_sheets
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
+
+
+class TestRequestPlan(unittest.TestCase):
+    def setUp(self):
+        self.metadata_dfs = {
+            'Tier 1 Donor Metadata': pd.DataFrame({'donor_id': ['id', None, None], 'sex': ['sex', 'female', 'male']}),
+            'Tier 2 Sample Metadata': pd.DataFrame({'sample_id': ['id', None]}),
+        }
+
+    def test_generation_is_planned_offline(self):
+        gc = MagicMock()
+        plan = generate_empty_metadata_entry_sheets(self.metadata_dfs, gc, MagicMock(), 'folder', 'Kimler2025',
+                                                    plan=RequestPlan())
+        gc.assert_not_called()
+        self.assertFalse(gc.method_calls)
+        grouped = plan.requests_by_spreadsheet()
+        self.assertEqual(list(grouped), ['new:Kimler2025_HCA_tier 1_metadata', 'new:Kimler2025_HCA_tier 2_metadata'])
+        tier1 = [call['body']['requests'] for call in grouped['new:Kimler2025_HCA_tier 1_metadata']
+                 if call['method'] == 'spreadsheets.batchUpdate']
+        dropdowns = [request['setDataValidation'] for request in tier1[-1]]
+        self.assertEqual(len(dropdowns), 1)
+        self.assertEqual(dropdowns[0]['range']['startColumnIndex'], 1)
+        self.assertEqual([value['userEnteredValue'] for value in dropdowns[0]['rule']['condition']['values']], ['female', 'male'])
+        self.assertEqual(plan.counts()['drive'], 6)
+        json.loads(plan.to_json())
+
+    def test_step_by_step_plan_matches_the_requests_sent(self):
+        endpoint = FakeGoogleBackend()
+        session = endpoint.session()
+        plan = generate_empty_metadata_entry_sheets(self.metadata_dfs, session.gc, None, 'target', 'Kimler2025',
+                                                    session=session, plan=RequestPlan())
+        self.assertFalse(endpoint.requests)
+        generate_empty_metadata_entry_sheets(self.metadata_dfs, session.gc, None, 'target', 'Kimler2025',
+                                             session=session)
+        self.assertEqual(plan.counts(), {kind: bucket.acquired for kind, bucket in session.scheduler.buckets.items()})
+
+    def test_template_plan_matches_the_requests_sent(self):
+        endpoint = FakeGoogleBackend()
+        session = endpoint.session()
+        templates = build_metadata_templates(self.metadata_dfs, session.gc, None, 'templates', session=session)
+        prefill = {'Tier 1 Donor Metadata': {'sex': 'female'}}
+        plan = generate_empty_metadata_entry_sheets(self.metadata_dfs, session.gc, None, 'target', 'Kimler2025',
+                                                    templates=templates, prefill=prefill, plan=RequestPlan())
+        self.assertEqual([call['method'] for call in plan.calls],
+                         ['files.copy', 'spreadsheets.values.batchUpdate', 'files.copy'])
+        self.assertEqual(plan.calls[0]['body'], {'name': 'Kimler2025_HCA_tier 1_metadata', 'parents': ['target']})
+        self.assertEqual(plan.calls[1]['body']['data'], [{'range': "'Tier 1 Donor Metadata'!B6", 'values': [['female']]}])
+        requests_before = len(endpoint.requests)
+        generate_empty_metadata_entry_sheets(self.metadata_dfs, session.gc, None, 'target', 'Kimler2025',
+                                             session=session, templates=templates, prefill=prefill)
+        self.assertEqual(len(endpoint.requests) - requests_before, len(plan.calls))
+
+    def test_fused_plan_matches_the_requests_sent(self):
+        plan = generate_empty_metadata_entry_sheets(self.metadata_dfs, None, None, 'target', 'Kimler2025', fused=True,
+                                                    plan=RequestPlan())
+        self.assertEqual([call['method'] for call in plan.calls],
+                         ['spreadsheets.create', 'spreadsheets.batchUpdate', 'files.update'] * 2)
+        self.assertEqual(plan.counts(), {'read': 0, 'write': 4, 'drive': 2})
+        endpoint = FakeGoogleBackend()
+        session = endpoint.session()
+        generate_empty_metadata_entry_sheets(self.metadata_dfs, session.gc, None, 'target', 'Kimler2025',
+                                             session=session, fused=True)
+        self.assertEqual(len(endpoint.requests), len(plan.calls))
+        created = [spreadsheet for spreadsheet in endpoint.spreadsheets.values()
+                   if spreadsheet['title'] == 'Kimler2025_HCA_tier 1_metadata']
+        self.assertEqual(len(created), 1)
+        self.assertEqual(list(created[0]['tabs']),
+                         [sheet['properties']['title'] for sheet in plan.calls[0]['body']['sheets']])
+
+    def test_estimate_follows_quotas(self):
+        plan = RequestPlan(quotas={'read': {'per_project': 300, 'per_user': 60},
+                                   'write': {'per_project': 300, 'per_user': 60}})
+        for _ in range(70):
+            plan.record('sheet', 'spreadsheets.batchUpdate', body={'requests': []})
+        # A burst of 10 then one write per second
+        self.assertAlmostEqual(plan.estimate_seconds(latency=0.0), 60.0)
+        self.assertAlmostEqual(plan.estimate_seconds(latency=2.0), 140.0)
+
+    def test_oversized_batches_are_flagged(self):
+        plan = RequestPlan(max_bytes=200)
+        chunks = plan.batch_update('sheet', [{'deleteSheet': {'sheetId': i}} for i in range(10)] + [{'big': 'x' * 300}])
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([spreadsheet_id for spreadsheet_id, size in plan.oversized()], ['sheet'])
+
+    def test_update_plan_makes_no_writes(self):
+        endpoint = FakeGoogleBackend()
+        endpoint.add_spreadsheet('stale', 'Stale', {'Tier 1 Donor Metadata': [['donor_id'], ['']]})
+        session = endpoint.session()
+        plan = RequestPlan()
+        update_existing_sheets('folder', session.credentials, None, self.metadata_dfs, session=session, plan=plan)
+        self.assertEqual(endpoint.batch_updates, [])
+        [(method, body)] = [(call['method'], call.get('body')) for call in plan.requests_by_spreadsheet()['stale']
+                            if call['kind'] == 'write']
+        self.assertEqual([next(iter(request)) for request in body['requests']], ['insertDimension', 'updateCells', 'setDataValidation'])
+        self.assertEqual(plan.counts(), {'read': 2, 'write': 1, 'drive': 1})
+
+    def test_update_plan_matches_the_requests_sent(self):
+        endpoint = FakeGoogleBackend()
+        endpoint.files_page_size = 1
+        endpoint.add_spreadsheet('stale', 'Stale', {'Tier 1 Donor Metadata': [['donor_id'], ['']]})
+        endpoint.add_spreadsheet('unrelated', 'Unrelated', {'Sheet1': [['name']]})
+        planning_session = endpoint.session()
+        plan = RequestPlan()
+        update_existing_sheets('folder', planning_session.credentials, None, self.metadata_dfs,
+                               session=planning_session, plan=plan)
+        session = endpoint.session()
+        update_existing_sheets('folder', session.credentials, None, self.metadata_dfs, session=session)
+        self.assertEqual(plan.counts(), {kind: bucket.acquired for kind, bucket in session.scheduler.buckets.items()})
+        self.assertEqual(plan.counts()['drive'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
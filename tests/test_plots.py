@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+import pandas as pd
+from hca_metadata_manager.plots import (
+    MetadataValidator, calculate_correctness, calculate_correctness_per_group, check_completeness,
+    check_patterns_parallel, completeness_by_dataset, completeness_mask, validate_columns_with_patterns
+)
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+class TestCompleteness(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'donor_id': ['D1', 'D2', 'D3', 'D4'],
+            'sex': ['female', '', 'male', None],
+            'age': [30.0, np.nan, 40.0, 50.0],
+            'site': ['colon', 'NA', 'n/a', 'not applicable'],
+            'worksheet': ['A', 'A', 'B', 'B'],
+        })
+        self.meta_col_dict = {'sex': 'MUST', 'age': 'RECOMMENDED'}
+
+    def test_mask_treats_placeholders_and_missing_values_as_empty(self):
+        mask = completeness_mask(self.df[['sex', 'age', 'site']])
+        self.assertEqual(mask['sex'].tolist(), [True, False, True, False])
+        self.assertEqual(mask['age'].tolist(), [True, False, True, True])
+        self.assertEqual(mask['site'].tolist(), [True, False, False, False])
+
+    def test_check_completeness_skips_first_field_and_labels_requirements(self):
+        completeness = check_completeness(self.df.drop(columns='worksheet'), meta_col_dict=self.meta_col_dict)
+        self.assertEqual(list(completeness.index), ['sex', 'age', 'site'])
+        self.assertEqual(completeness['Percentage'].tolist(), [50.0, 75.0, 25.0])
+        self.assertEqual(completeness['Required'].tolist(), ['MUST', 'RECOMMENDED', 'not defined'])
+        self.assertEqual(list(completeness['Required'].cat.categories), ['not defined', 'MUST', 'RECOMMENDED'])
+
+    def test_completeness_by_dataset_matches_per_group_completeness(self):
+        grouped = completeness_by_dataset(self.df, 'worksheet', meta_col_dict=self.meta_col_dict)
+        for worksheet, group in self.df.groupby('worksheet'):
+            expected = check_completeness(group.drop(columns='worksheet'))
+            self.assertEqual(grouped.loc[worksheet, 'Percentage'].tolist(), expected['Percentage'].tolist())
+        self.assertEqual(grouped.loc[('A', 'sex'), 'Required'], 'MUST')
+
+    def test_completeness_by_dataset_with_grouping_column_first(self):
+        df = self.df[['worksheet', 'donor_id', 'sex', 'age', 'site']]
+        grouped = completeness_by_dataset(df, 'worksheet')
+        self.assertEqual(list(grouped.loc['A'].index), ['donor_id', 'sex', 'age', 'site'])
+        for worksheet, group in df.groupby('worksheet'):
+            expected = check_completeness(group)
+            self.assertEqual(grouped.loc[worksheet, 'Percentage'].tolist(), expected['Percentage'].tolist())
+
+
+class TestMetadataValidator(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'donor_id': ['D1', '', 'D3', 'D4'],
+            'disease_ontology_term_id': ['MONDO:0000001', 'PATO:0000461', 'MONDO:1', None],
+            'sex': ['female', 'male', 'unknown', 'female'],
+            'worksheet': ['A', 'A', 'B', 'B'],
+        })
+        self.permitted_values = {'sex': ['female', 'male'], 'disease_ontology_term_id': ['PATO:0000461']}
+        self.permitted_patterns = {'donor_id': r'^.{1,}$', 'disease_ontology_term_id': r'^(MONDO:\d{7}|PATO:0000461)$'}
+        self.validator = MetadataValidator(self.permitted_values, self.permitted_patterns)
+
+    def test_validity_matrices(self):
+        self.assertEqual(self.validator.check_patterns(self.df).to_dict('list'), {
+            'donor_id': [True, False, True, True],
+            'disease_ontology_term_id': [True, True, False, False],
+        })
+        self.assertEqual(self.validator.check_values(self.df).to_dict('list'), {
+            'disease_ontology_term_id': [False, True, False, False],
+            'sex': [True, True, False, True],
+        })
+
+    def test_patterns_match_from_the_start_of_the_value_as_strings(self):
+        df = pd.DataFrame({'age': [30, None, 4.5]})
+        validity = validate_columns_with_patterns(df, {'age': r'\d', 'missing': r'.'})
+        self.assertEqual(validity['age'].tolist(), [True, False, True])
+        self.assertTrue(validity['missing'].empty)
+
+    def test_correctness(self):
+        correctness = calculate_correctness(self.df, self.permitted_values, self.permitted_patterns)
+        self.assertEqual(correctness.iloc[0].to_dict(), {
+            'donor_id_pattern_correctness': 75.0,
+            'disease_ontology_term_id_value_correctness': 25.0,
+            'disease_ontology_term_id_pattern_correctness': 50.0,
+            'sex_value_correctness': 75.0,
+        })
+
+    def test_correctness_per_group_takes_the_better_check(self):
+        correctness = calculate_correctness_per_group(self.df, self.permitted_values, self.permitted_patterns)
+        self.assertEqual(list(correctness.index), ['A', 'B'])
+        self.assertEqual(correctness.loc['A'].to_dict(), {'donor_id': 50.0, 'disease_ontology_term_id': 100.0, 'sex': 100.0})
+        self.assertEqual(correctness.loc['B'].to_dict(), {'donor_id': 100.0, 'disease_ontology_term_id': 0.0, 'sex': 50.0})
+
+
+@unittest.skipUnless(HAS_PYARROW, 'pyarrow is required for parallel validation')
+class TestParallelValidation(unittest.TestCase):
+    def test_matches_serial_validation_across_chunks(self):
+        df = pd.DataFrame({
+            'donor_id': ['D1', None, 'D3', '', 'None', 'D6', 'x'],
+            'mixed': ['CL:0000001', np.nan, 3, 'CL:1', None, 'CL:0000002', 'nan'],
+            'age': [1.0, np.nan, 2.5, 3.0, 4.0, np.nan, 5.0],
+        }, index=[10, 11, 12, 13, 14, 15, 16])
+        patterns = {'donor_id': r'^(D\d|None)', 'mixed': r'^(CL:\d{7}|nan|3)$', 'age': r'\d', 'missing': r'.'}
+        parallel = check_patterns_parallel(df, patterns, max_workers=2, chunk_rows=3)
+        serial = MetadataValidator(permitted_patterns=patterns).check_patterns(df)
+        pd.testing.assert_frame_equal(parallel, serial)
+        results = validate_columns_with_patterns(df, patterns, max_workers=2)
+        self.assertEqual(list(results), list(patterns))
+        self.assertEqual(results['mixed'].tolist(), [True, True, True, False, False, True, True])
+        self.assertTrue(results['missing'].empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
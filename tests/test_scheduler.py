@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch, Mock
+from hca_metadata_manager.scheduler import TokenBucket, RequestScheduler, is_rate_limit_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RateLimitError(Exception):
+    def __init__(self):
+        super().__init__('Quota exceeded for quota metric Read requests')
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_bucket_paces_at_quota_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket('read', rate_per_minute=60, capacity=2, clock=clock, sleep=clock.sleep)
+        waits = [bucket.acquire() for _ in range(5)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertEqual([round(w, 6) for w in waits[2:]], [1.0, 1.0, 1.0])
+        stats = bucket.stats()
+        self.assertEqual((stats['requests'], stats['saturated']), (5, 3))
+        self.assertAlmostEqual(stats['saturation_rate'], 0.6)
+
+    def test_bucket_refills_while_idle(self):
+        clock = FakeClock()
+        bucket = TokenBucket('write', rate_per_minute=60, capacity=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        clock.now += 10
+        self.assertEqual(bucket.acquire(), 0.0)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    @patch('hca_metadata_manager.scheduler.time.sleep')
+    def test_rate_limit_errors_are_retried(self, mock_sleep):
+        scheduler = RequestScheduler()
+        request = Mock()
+        request.execute.side_effect = [RateLimitError(), RateLimitError(), {'ok': True}]
+        self.assertEqual(scheduler.execute(request, 'read'), {'ok': True})
+        self.assertEqual(request.execute.call_count, 3)
+        self.assertEqual(scheduler.retries, 2)
+
+    def test_other_errors_are_raised(self):
+        scheduler = RequestScheduler()
+        request = Mock()
+        request.execute.side_effect = ValueError('bad request')
+        with self.assertRaises(ValueError):
+            scheduler.execute(request, 'write')
+        self.assertEqual(request.execute.call_count, 1)
+
+    def test_is_rate_limit_error(self):
+        http_error = Exception('error')
+        http_error.resp = Mock(status=429)
+        self.assertTrue(is_rate_limit_error(http_error))
+        self.assertTrue(is_rate_limit_error(Exception('userRateLimitExceeded')))
+        self.assertFalse(is_rate_limit_error(Exception('Requested entity was not found.')))
+
+
+if __name__ == '__main__':
+    unittest.main()
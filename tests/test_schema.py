@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+import pandas as pd
+from hca_metadata_manager.plots import MetadataValidator
+from hca_metadata_manager.schema import coerce_metadata_table, coerce_metadata_tables, infer_field_types
+
+
+class TestInferFieldTypes(unittest.TestCase):
+    def test_types_from_packaged_descriptions(self):
+        field_types = infer_field_types()
+        self.assertEqual(field_types['is_primary_data'], 'boolean')
+        for field in ('age', 'bmi', 'cell_viability_percentage', 'clinical_activity_score'):
+            self.assertEqual(field_types[field], 'numeric')
+        for field in ('sex_ontology_term_id', 'tissue_type', 'suspension_type', 'manner_of_death', 'age_unit'):
+            self.assertEqual(field_types[field], 'category')
+        # A date example such as 2022_12_10 is not a number, and trailing whitespace in headers is dropped
+        self.assertNotIn('sample_collection_time_point', field_types)
+        self.assertNotIn('comments', field_types)
+
+    def test_schema_dropdowns_override_descriptions(self):
+        descriptions = pd.DataFrame({'age': ['Age', '1', '1'], 'notes': ['Notes', None, 'free text']},
+                                    index=['Description', 'Values', 'Examples'])
+        metadata_dfs = {'donor': pd.DataFrame({'age': ['header', 'infant', 'adult'], 'alive': ['header', 'TRUE', 'FALSE']})}
+        field_types = infer_field_types(descriptions, metadata_dfs)
+        self.assertEqual(field_types, {'age': 'category', 'alive': 'boolean'})
+
+
+class TestCoerceMetadataTable(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'donor_id': ['D1', 'D2', 'D3', 'D4', 'D5'],
+            'age': ['30', ' 40.5 ', 'n/a', 'old', None],
+            'is_primary_data': ['TRUE', 'false', 'maybe', None, ''],
+            'sex_ontology_term_id': ['PATO:0000383', 'PATO:0000384', 'PATO:0000383', None, 'unknown'],
+            'worksheet': ['A', 'A', 'B', 'B', 'B'],
+        })
+        self.field_types = {'age': 'numeric', 'is_primary_data': 'boolean', 'sex_ontology_term_id': 'category'}
+
+    def test_typed_columns_and_invalid_mask(self):
+        coerced, invalid = coerce_metadata_table(self.df, self.field_types)
+        self.assertEqual(list(coerced.columns), list(self.df.columns))
+        self.assertEqual(coerced['donor_id'].tolist(), self.df['donor_id'].tolist())
+        np.testing.assert_array_equal(coerced['age'].to_numpy(), [30.0, 40.5, np.nan, np.nan, np.nan])
+        self.assertEqual(str(coerced['is_primary_data'].dtype), 'boolean')
+        self.assertEqual(coerced['is_primary_data'].tolist(), [True, False, pd.NA, pd.NA, pd.NA])
+        self.assertIsInstance(coerced['sex_ontology_term_id'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(coerced['worksheet'].dtype, pd.CategoricalDtype)
+        self.assertEqual(invalid.to_dict('list'), {
+            'age': [False, False, False, True, False],
+            'is_primary_data': [False, False, True, False, False],
+        })
+
+    def test_validation_of_categorical_columns_matches_strings(self):
+        coerced, _ = coerce_metadata_table(self.df, self.field_types)
+        validator = MetadataValidator({'sex_ontology_term_id': ['PATO:0000383', 'PATO:0000384']},
+                                      {'sex_ontology_term_id': r'^PATO:\d{7}$'})
+        pd.testing.assert_frame_equal(validator.check_values(coerced), validator.check_values(self.df))
+        pd.testing.assert_frame_equal(validator.check_patterns(coerced), validator.check_patterns(self.df))
+
+    def test_repeated_headers_are_left_untyped(self):
+        df = pd.DataFrame([['1', '2', 'A']], columns=['age', 'age', 'worksheet'])
+        coerced, invalid = coerce_metadata_tables({'donor': df}, {'age': 'numeric'})
+        self.assertEqual(coerced['donor'].iloc[0].tolist(), ['1', '2', 'A'])
+        self.assertTrue(invalid['donor'].empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import patch, Mock
+from hca_metadata_manager.session import SheetsSession
+from hca_metadata_manager.utils import fetch_sheets_with_indices, cache_sheet_properties, batch_update_in_chunks
+
+
+class TestSheetsSession(unittest.TestCase):
+    def setUp(self):
+        self.credentials = Mock()
+        self.http_factory = Mock()
+
+    @patch('hca_metadata_manager.session.build')
+    def test_services_are_built_once(self, mock_build):
+        session = SheetsSession(self.credentials, http_factory=self.http_factory)
+        self.assertIs(session.sheets, session.sheets)
+        self.assertIs(session.drive, session.drive)
+        self.assertEqual(mock_build.call_count, 2)
+        self.assertEqual(self.http_factory.call_count, 2)
+
+    @patch('hca_metadata_manager.utils.build')
+    @patch('hca_metadata_manager.session.build')
+    def test_metadata_is_cached_until_a_write(self, mock_session_build, mock_utils_build):
+        service = mock_session_build.return_value
+        service.spreadsheets.return_value.get.return_value.execute.return_value = {
+            'sheets': [{'properties': {'index': 0, 'sheetId': 7, 'title': 'donor metadata',
+                                       'gridProperties': {'rowCount': 200}}}]
+        }
+        session = SheetsSession(self.credentials, http_factory=self.http_factory)
+
+        self.assertEqual(fetch_sheets_with_indices('sid', self.credentials, session=session), {0: 'donor metadata'})
+        self.assertEqual(cache_sheet_properties('sid', self.credentials, session=session), {0: (7, 200)})
+        service.spreadsheets.return_value.get.assert_called_once_with(spreadsheetId='sid', fields='sheets(properties)')
+
+        batch_update_in_chunks('sid', [{'deleteSheet': {'sheetId': 7}}], self.credentials, session=session)
+        fetch_sheets_with_indices('sid', self.credentials, session=session)
+        self.assertEqual(service.spreadsheets.return_value.get.call_count, 2)
+        mock_utils_build.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from hca_metadata_manager.utils import iter_sheets_metadata, load_sheets_metadata
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
+
+try:
+    import pyarrow.dataset as ds
+    from hca_metadata_manager.store import MetadataStore
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+@unittest.skipUnless(HAS_PYARROW, 'pyarrow is required for the metadata store')
+class TestMetadataStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.endpoint = FakeGoogleBackend()
+        description_rows = [['description'], ['examples'], ['required'], ['tier']]
+        self.endpoint.add_spreadsheet('sheet0', 'Study0 metadata', {
+            'Donor Metadata': [['donor_id', '', 'sex']] + description_rows + [['D1', 'x', 'female'], ['D2']],
+            'Sample Metadata': [['sample_id']] + description_rows + [['S1']],
+        })
+        self.endpoint.add_spreadsheet('sheet1', 'Study/1 metadata', {
+            'Donor Metadata': [['donor_id', 'age']] + description_rows + [['D3', '40']],
+        })
+        self.googlesheets = [{'id': 'sheet0', 'name': 'Study0'}, {'id': 'sheet1', 'name': 'Study/1'}]
+        self.session = self.endpoint.session()
+        self.store = MetadataStore(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def stream(self):
+        return iter_sheets_metadata(self.session.credentials, self.googlesheets, session=self.session)
+
+    def test_round_trip_of_streamed_tables(self):
+        self.assertEqual(self.store.write(self.stream()), {'donor': 3, 'sample': 1})
+        self.assertEqual(self.store.metadata_types(), ['donor', 'sample'])
+        donors = self.store.load('donor').sort_values('donor_id', ignore_index=True)
+        self.assertEqual(sorted(donors.columns), ['age', 'column_1', 'donor_id', 'sex', 'worksheet'])
+        self.assertEqual(donors.columns[-1], 'worksheet')
+        self.assertEqual(donors['donor_id'].tolist(), ['D1', 'D2', 'D3'])
+        self.assertEqual(donors['sex'].tolist(), ['female', None, None])
+        self.assertEqual(donors['worksheet'].tolist(), ['Study0', 'Study0', 'Study/1'])
+
+    def test_projection_and_partition_filter(self):
+        self.store.write(self.stream())
+        donors = self.store.load('donor', columns=['donor_id', 'missing'], worksheets=['Study/1'])
+        self.assertEqual(donors.to_dict('list'), {'donor_id': ['D3']})
+        females = self.store.load('donor', columns=['donor_id'], filter=ds.field('sex') == 'female', categories=True)
+        self.assertEqual(females['donor_id'].tolist(), ['D1'])
+        self.assertIsInstance(females['donor_id'].dtype, pd.CategoricalDtype)
+
+    def test_rewriting_a_spreadsheet_replaces_its_tables(self):
+        self.store.write(self.stream())
+        self.endpoint.edit_spreadsheet('sheet0', {'Donor Metadata': [['donor_id']] + [['-']] * 4 + [['D9']]})
+        self.store.write(iter_sheets_metadata(self.session.credentials, self.googlesheets[:1], session=self.session))
+        self.assertEqual(sorted(self.store.load('donor')['donor_id']), ['D3', 'D9'])
+        self.assertEqual(self.store.metadata_types(), ['donor', 'sample'])
+        self.assertEqual(len(self.store.load('sample')), 0)
+
+    def test_write_tables_from_load_sheets_metadata(self):
+        all_dfs = load_sheets_metadata(self.session.credentials, self.googlesheets, session=self.session)
+        self.store.write_tables(all_dfs)
+        self.store.write_tables(all_dfs)
+        self.assertEqual(len(self.store.load('donor')), 3)
+        self.assertTrue(os.path.isdir(os.path.join(self.root, 'donor', 'worksheet=Study%2F1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
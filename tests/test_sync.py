@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+import unittest
+from hca_metadata_manager.cache import SheetCache
+from hca_metadata_manager.sync import sync_folder_metadata
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DESCRIPTION_ROWS = [['description'], ['examples'], ['required'], ['tier']]
+
+
+def donor_tab(*donor_ids):
+    return {'Donor Metadata': [['donor_id']] + DESCRIPTION_ROWS + [[donor_id] for donor_id in donor_ids]}
+
+
+@unittest.skipUnless(HAS_PYARROW, 'pyarrow is required for the Parquet cache')
+class TestSyncFolderMetadata(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.endpoint = FakeGoogleBackend()
+        for i in range(3):
+            self.endpoint.add_spreadsheet(f'sheet{i}', f'Study{i} metadata', donor_tab(f'D{i}'))
+        self.endpoint.add_spreadsheet('other', 'Other folder metadata', donor_tab('X'), folder_id='other_folder')
+        self.session = self.endpoint.session()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def sync(self):
+        return sync_folder_metadata(self.session.credentials, 'folder', SheetCache(self.cache_dir), session=self.session)
+
+    def sheets_requests(self):
+        return [path for method, path in self.endpoint.requests if path.startswith('/v4/')]
+
+    def test_first_sync_harvests_the_whole_folder(self):
+        metadata = self.sync()
+        self.assertEqual(sorted(metadata['donor']['donor_id']), ['D0', 'D1', 'D2'])
+        self.assertEqual(len(self.sheets_requests()), 6)
+
+    def test_unchanged_folder_makes_no_sheets_calls(self):
+        self.sync()
+        self.endpoint.requests.clear()
+        metadata = self.sync()
+        self.assertEqual(self.sheets_requests(), [])
+        self.assertEqual(sorted(metadata['donor']['donor_id']), ['D0', 'D1', 'D2'])
+
+    def test_only_changed_spreadsheets_are_fetched(self):
+        self.sync()
+        self.endpoint.edit_spreadsheet('sheet1', donor_tab('D1', 'D1b'))
+        self.endpoint.trash_spreadsheet('sheet2')
+        self.endpoint.add_spreadsheet('sheet3', 'Study3 metadata', donor_tab('D3'))
+        self.endpoint.edit_spreadsheet('other', donor_tab('Y'))
+        self.endpoint.requests.clear()
+        metadata = self.sync()
+        self.assertEqual(sorted(set(path.split('/')[3] for path in self.sheets_requests())), ['sheet1', 'sheet3'])
+        self.assertEqual(sorted(metadata['donor']['donor_id']), ['D0', 'D1', 'D1b', 'D3'])
+        self.assertEqual(sorted(SheetCache(self.cache_dir).spreadsheet_ids()), ['sheet0', 'sheet1', 'sheet3'])
+
+    def test_folders_sharing_a_cache_keep_each_others_entries(self):
+        cache = SheetCache(self.cache_dir)
+        sync_folder_metadata(self.session.credentials, 'other_folder', cache, session=self.session)
+        self.sync()
+        self.endpoint.edit_spreadsheet('other', donor_tab('Y'))
+        self.endpoint.edit_spreadsheet('sheet0', donor_tab('D0b'))
+        self.sync()
+        self.assertIn('other', SheetCache(self.cache_dir).spreadsheet_ids())
+        self.endpoint.requests.clear()
+        metadata = sync_folder_metadata(self.session.credentials, 'other_folder', SheetCache(self.cache_dir),
+                                        session=self.session)
+        self.assertEqual(metadata['donor']['donor_id'].tolist(), ['Y'])
+        self.assertEqual(sorted(set(path.split('/')[3] for path in self.sheets_requests())), ['other'])
+
+    def test_failed_spreadsheet_is_retried_next_sync(self):
+        self.sync()
+        self.endpoint.edit_spreadsheet('sheet0', donor_tab('D0b'))
+        self.endpoint.failing.add('sheet0')
+        self.sync()
+        self.endpoint.failing.clear()
+        metadata = self.sync()
+        self.assertEqual(sorted(metadata['donor']['donor_id']), ['D0b', 'D1', 'D2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
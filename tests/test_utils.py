@@ -1,10 +1,17 @@
+import os
+import tempfile
 import pytest
 import unittest
+import anndata
+import numpy as np
 import pandas as pd
 from unittest.mock import patch, Mock, MagicMock
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
 from hca_metadata_manager.utils import (
     initialize_google_sheets, upload_to_sheet, delete_sheet,
-    fetch_sheets_with_indices
+    fetch_sheets_with_indices, build_dropdown_requests, chunk_batch_requests,
+    batch_update_in_chunks, load_sheets_metadata, collapse_to_entities, read_obs,
+    upload_tables
 )
 
 # # Mock spreadsheet and worksheet objects
@@ -154,7 +161,8 @@ from unittest.mock import patch, Mock
 import pandas as pd
 from hca_metadata_manager.utils import (
     initialize_google_sheets, upload_to_sheet, delete_sheet,
-    fetch_sheets_with_indices
+    fetch_sheets_with_indices, build_dropdown_requests, chunk_batch_requests,
+    batch_update_in_chunks
 )
 
 class TestUtils(unittest.TestCase):
@@ -242,5 +250,129 @@ class TestFetchSheetsWithIndices(unittest.TestCase):
         }
         self.assertEqual(result, expected_result)
 
+class TestBatchedDropdowns(unittest.TestCase):
+    def setUp(self):
+        self.sheets_info = {0: 'Donor Metadata', 1: 'Sample Metadata'}
+        self.column_cache = {0: {'sex': 0, 'age_unit': 2}, 1: {'tissue_type': 1}}
+        self.properties_cache = {0: (101, 500), 1: (102, 1000)}
+        self.dropdowns_config = {
+            'donor metadata': {'sex': ['female', 'male'], 'age_unit': ['years'], 'missing_column': ['x']},
+            'sample metadata': {'tissue_type': ['tissue', 'organoid']}
+        }
+
+    def test_build_dropdown_requests(self):
+        requests = build_dropdown_requests(self.sheets_info, self.dropdowns_config,
+                                           self.column_cache, self.properties_cache, num_header_rows=3)
+        self.assertEqual(len(requests), 3)
+        first_range = requests[0]['setDataValidation']['range']
+        self.assertEqual(first_range, {'sheetId': 101, 'startRowIndex': 4, 'endRowIndex': 500,
+                                       'startColumnIndex': 0, 'endColumnIndex': 1})
+        self.assertEqual(requests[2]['setDataValidation']['range']['sheetId'], 102)
+
+    def test_chunk_batch_requests_respects_max_bytes(self):
+        requests = build_dropdown_requests(self.sheets_info, self.dropdowns_config,
+                                           self.column_cache, self.properties_cache, num_header_rows=3)
+        self.assertEqual(chunk_batch_requests(requests), [requests])
+        chunks = chunk_batch_requests(requests, max_bytes=400)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual([r for chunk in chunks for r in chunk], requests)
+
+    @patch('hca_metadata_manager.utils.build')
+    def test_batch_update_in_chunks_sends_one_call(self, mock_build):
+        requests = build_dropdown_requests(self.sheets_info, self.dropdowns_config,
+                                           self.column_cache, self.properties_cache, num_header_rows=3)
+        summary = batch_update_in_chunks('fake_spreadsheet_id', requests, Mock())
+        batch_update = mock_build.return_value.spreadsheets.return_value.batchUpdate
+        batch_update.assert_called_once_with(spreadsheetId='fake_spreadsheet_id', body={'requests': requests})
+        self.assertEqual(summary, {'requests': 3, 'batches': 1, 'failed': 0})
+
+class TestLoadSheetsMetadata(unittest.TestCase):
+    @patch('hca_metadata_manager.utils.build')
+    def test_loads_all_tabs_with_one_batch_get(self, mock_build):
+        spreadsheets = mock_build.return_value.spreadsheets.return_value
+        spreadsheets.get.return_value.execute.return_value = {
+            'properties': {'title': 'Kimler2025_HCA_tier 1_metadata'},
+            'sheets': [
+                {'properties': {'title': 'Donor Metadata', 'gridProperties': {'rowCount': 100, 'columnCount': 3}}},
+                {'properties': {'title': 'Notes', 'gridProperties': {'rowCount': 10, 'columnCount': 2}}},
+                {'properties': {'title': "Sample's Metadata", 'gridProperties': {'rowCount': 50, 'columnCount': 28}}},
+            ]
+        }
+        description_rows = [['d1'], ['d2'], ['d3'], ['d4']]
+        spreadsheets.values.return_value.batchGet.return_value.execute.return_value = {
+            'valueRanges': [
+                {'values': [['donor_id', 'sex', 'age']] + description_rows + [['D1', 'female'], ['D2', 'male', '40', 'extra']]},
+                {'values': [['sample_id']] + description_rows + [['S1']]},
+            ]
+        }
+
+        all_dfs = load_sheets_metadata(Mock(), [{'id': 'sid'}])
+
+        spreadsheets.values.return_value.batchGet.assert_called_once_with(
+            spreadsheetId='sid', ranges=["'Donor Metadata'!A1:C100", "'Sample''s Metadata'!A1:AB50"])
+        self.assertEqual(spreadsheets.get.call_count, 1)
+        spreadsheets.values.return_value.get.assert_not_called()
+        self.assertEqual(all_dfs['donor'].values.tolist(),
+                         [['D1', 'female', None, 'Kimler2025_HCA_tier'], ['D2', 'male', '40', 'Kimler2025_HCA_tier']])
+        self.assertEqual(list(all_dfs["sample's"].columns), ['sample_id', 'worksheet'])
+
+class TestCollapseToEntities(unittest.TestCase):
+    def test_one_row_per_entity_with_conflicts(self):
+        obs = pd.DataFrame({
+            'donor_id': pd.Categorical(['D1', 'D1', 'D2', 'D2', 'D1', 'D3']),
+            'donor_sex': ['female', 'female', 'male', 'male', 'female', None],
+            'donor_age': [None, '30', '40', '41', '30', None],
+        }, index=[f'cell{i}' for i in range(6)])
+
+        donors, conflicts = collapse_to_entities(obs, ['donor_id', 'donor_sex', 'donor_age'])
+
+        self.assertEqual(donors.values.tolist(), [['D1', 'female', '30'], ['D2', 'male', '40'], ['D3', None, None]])
+        self.assertEqual(conflicts.to_dict('records'), [{'donor_id': 'D2', 'field': 'donor_age', 'values': '40; 41'}])
+
+    def test_entities_without_repeats_and_without_columns(self):
+        obs = pd.DataFrame({'celltype_annotation': ['T', 'B', 'T'], 'sample_id': ['S1', 'S1', 'S2']})
+        celltypes, conflicts = collapse_to_entities(obs, ['celltype_annotation'])
+        self.assertEqual(celltypes['celltype_annotation'].tolist(), ['T', 'B'])
+        self.assertTrue(conflicts.empty)
+        self.assertEqual(collapse_to_entities(obs, [])[0].shape, (0, 0))
+        self.assertEqual(collapse_to_entities(obs, [], key='sample_id')[1].columns.tolist(), ['sample_id', 'field', 'values'])
+
+class TestReadObs(unittest.TestCase):
+    def test_reads_obs_without_x(self):
+        obs = pd.DataFrame({'study': pd.Categorical(['A', 'B']), 'donor_id': ['D1', 'D2']}, index=['c1', 'c2'])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'atlas.h5ad')
+            anndata.AnnData(X=np.ones((2, 3), dtype=np.float32), obs=obs).write_h5ad(path)
+            pd.testing.assert_frame_equal(read_obs(path), obs)
+
+class TestUploadTables(unittest.TestCase):
+    def test_writes_all_tabs_in_two_requests(self):
+        endpoint = FakeGoogleBackend()
+        endpoint.add_spreadsheet('sid', 'Study', {'Sheet1': [], 'donor metadata': [['old'], ['stale'], ['rows']]})
+        session = endpoint.session()
+        tables = {
+            'donor metadata': pd.DataFrame({'donor_id': ['D1'], 'age': [np.inf]}),
+            "sample's metadata": pd.DataFrame({'sample_id': ['S1', None], 'count': [3, 4]}),
+        }
+
+        summary = upload_tables(tables, 'sid', None, session=session, delete_tabs=('Sheet1', 'missing'))
+
+        self.assertEqual(summary, {'tabs': 2, 'added': 1, 'deleted': 1, 'requests': 3})
+        self.assertEqual([method for method, path in endpoint.requests], ['GET', 'POST', 'POST'])
+        tabs = endpoint.spreadsheets['sid']['tabs']
+        self.assertEqual(list(tabs), ['donor metadata', "sample's metadata"])
+        self.assertEqual(tabs['donor metadata'], [['donor_id', 'age'], ['D1', '']])
+        self.assertEqual(tabs["sample's metadata"], [['sample_id', 'count'], ['S1', '3'], ['', '4']])
+        self.assertEqual(endpoint.spreadsheets['sid']['grid']['donor metadata'], (2, 2))
+
+    def test_counts_only_the_requests_sent(self):
+        endpoint = FakeGoogleBackend()
+        endpoint.add_spreadsheet('sid', 'Study', {'Sheet1': [], 'notes': [['note']]})
+        session = endpoint.session()
+        self.assertEqual(upload_tables({}, 'sid', None, session=session)['requests'], 1)
+        # The tab metadata is now cached by the session, and only the deletion is left to send
+        self.assertEqual(upload_tables({}, 'sid', None, session=session, delete_tabs=('Sheet1',))['requests'], 1)
+        self.assertEqual([method for method, path in endpoint.requests], ['GET', 'POST'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
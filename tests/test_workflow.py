@@ -1,7 +1,16 @@
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
 import unittest
 from unittest.mock import patch, MagicMock
+import numpy as np
 import pandas as pd
 from hca_metadata_manager.workflow import generate_empty_metadata_entry_sheets  # Adjust the import based on your actual module structure
+from hca_metadata_manager.workflow import update_existing_sheets, upload_metadata_to_drive
+from hca_metadata_manager.workflow import build_metadata_templates, generate_metadata_entry_sheets_batch
+from hca_metadata_manager import workflow
+from hca_metadata_manager.fake_backend import FakeGoogleBackend
 
 
 class TestGenerateEmptyMetadataSheets(unittest.TestCase):
@@ -49,5 +58,184 @@ class TestGenerateEmptyMetadataSheets(unittest.TestCase):
         self.assertEqual(self.gc.create.call_count, 2, "Two sheets should be created, one for each tier.")
         # More assertions can be added to check other behaviors
 
+
+class TestUpdateExistingSheets(unittest.TestCase):
+    def setUp(self):
+        self.endpoint = FakeGoogleBackend()
+        self.endpoint.add_spreadsheet('current', 'Current', {'Donor Metadata': [['donor_id', 'sex'], ['', '']]})
+        self.endpoint.spreadsheets['current']['validations'] = {'Donor Metadata': {1: ['female', 'male']}}
+        self.endpoint.add_spreadsheet('stale', 'Stale', {'Donor Metadata': [['donor_id'], ['']], 'Notes': [['note']]})
+        self.metadata_dfs = {'Donor Metadata': pd.DataFrame({'donor_id': ['id', None], 'sex': ['sex', 'female']})}
+        self.metadata_dfs['Donor Metadata'].loc[2] = [None, 'male']
+        self.session = self.endpoint.session()
+
+    def update(self):
+        return update_existing_sheets('folder', self.session.credentials, None, self.metadata_dfs, session=self.session)
+
+    def test_only_differences_are_sent(self):
+        self.assertEqual(self.update(), {'current': 0, 'stale': 3})
+        [(spreadsheet_id, requests)] = self.endpoint.batch_updates
+        self.assertEqual(spreadsheet_id, 'stale')
+        self.assertEqual([next(iter(request)) for request in requests], ['insertDimension', 'updateCells', 'setDataValidation'])
+        self.assertEqual(requests[2]['setDataValidation']['range']['endRowIndex'], 1000)
+
+    def test_second_run_is_a_no_op(self):
+        self.update()
+        self.assertEqual(self.update(), {'current': 0, 'stale': 0})
+        self.assertEqual(self.endpoint.spreadsheets['stale']['tabs']['Donor Metadata'][0], ['donor_id', 'sex'])
+        self.assertFalse([path for method, path in self.endpoint.requests if 'values' in path])
+
+
+class TestUploadMetadataToDrive(unittest.TestCase):
+    def setUp(self):
+        self.endpoint = FakeGoogleBackend()
+        self.session = self.endpoint.session()
+        self.obs = pd.DataFrame({
+            'study': pd.Categorical(['A', 'B', 'A', 'A']),
+            'dataset_id': ['DA', 'DB', 'DA', 'DA'],
+            'donor_id': ['D1', 'D2', 'D1', 'D3'],
+            'sample_id': ['S1', 'S2', 'S1', 'S3'],
+        }, index=['c1', 'c2', 'c3', 'c4'])
+
+    def test_uploads_from_obs_of_h5ad_file(self):
+        import anndata
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'atlas.h5ad')
+            anndata.AnnData(X=np.ones((4, 3), dtype=np.float32), obs=self.obs).write_h5ad(path)
+            upload_metadata_to_drive(path, None, self.session.gc, None, 'target', session=self.session)
+        titles = sorted(spreadsheet['title'] for spreadsheet in self.endpoint.spreadsheets.values())
+        self.assertEqual(titles, ['DA_HCA_tier 1_metadata', 'DA_HCA_tier 2_metadata',
+                                  'DB_HCA_tier 1_metadata', 'DB_HCA_tier 2_metadata'])
+        [tier1] = [s for s in self.endpoint.spreadsheets.values() if s['title'] == 'DA_HCA_tier 1_metadata']
+        self.assertEqual(tier1['tabs']['donor metadata'][:3], [['donor_id'], ['D1'], ['D3']])
+        self.assertEqual(tier1['tabs']['sample metadata'][:3], [['sample_id'], ['S1'], ['S3']])
+
+
+class TestTemplateProvisioning(unittest.TestCase):
+    def setUp(self):
+        self.endpoint = FakeGoogleBackend()
+        self.session = self.endpoint.session()
+        self.metadata_dfs = {
+            'Tier 1 Dataset Metadata': pd.DataFrame({'dataset_id': ['id'], 'title': ['title']}),
+            'Tier 1 Donor Metadata': pd.DataFrame({'donor_id': ['id'], 'sex': ['sex']}),
+            'Tier 2 Dataset Metadata': pd.DataFrame({'dataset_id': ['id']}),
+        }
+        self.metadata_dfs['Tier 1 Donor Metadata'].loc[1] = [None, 'female']
+
+    def test_datasets_are_copies_of_the_templates(self):
+        templates = build_metadata_templates(self.metadata_dfs, self.session.gc, None, 'templates', session=self.session)
+        template = self.endpoint.spreadsheets[templates['Tier 1']]
+        requests_before = len(self.endpoint.requests)
+
+        file_ids = generate_empty_metadata_entry_sheets(
+            self.metadata_dfs, self.session.gc, None, 'target', 'Kimler2025', session=self.session, templates=templates,
+            prefill={'Tier 1 Dataset Metadata': {'title': 'Gut atlas', 'missing': 'x'}, 'Tier 2 Dataset Metadata': {}})
+
+        # One copy per tier and one values update for the prefilled tier
+        self.assertEqual([method for method, path in self.endpoint.requests[requests_before:]], ['POST', 'POST', 'POST'])
+        copy = self.endpoint.spreadsheets[file_ids['Tier 1']]
+        self.assertEqual(copy['title'], 'Kimler2025_HCA_tier 1_metadata')
+        self.assertEqual(copy['parents'], ['target'])
+        self.assertEqual(copy['validations'], template['validations'])
+        dataset_tab = copy['tabs']['Tier 1 Dataset Metadata']
+        self.assertEqual(dataset_tab[5][:2], ['', 'Gut atlas'])
+        self.assertEqual(dataset_tab[:5], template['tabs']['Tier 1 Dataset Metadata'][:5])
+        self.assertNotIn('Gut atlas', str(template['tabs']))
+
+    def test_batch_is_resumable_after_failures(self):
+        copy_spreadsheet = workflow.copy_spreadsheet
+        def flaky_copy(file_id, name, *args, **kwargs):
+            if name.startswith('D2_'):
+                raise RuntimeError('quota exceeded')
+            return copy_spreadsheet(file_id, name, *args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            datasets = os.path.join(directory, 'cohort.csv')
+            pd.DataFrame({'dataset_id': ['D1', 'D2', 'D3'], 'title': ['One', 'Two', '']}).to_csv(datasets, index=False)
+            manifest_path = os.path.join(directory, 'manifest.csv')
+            with patch('hca_metadata_manager.workflow.copy_spreadsheet', side_effect=flaky_copy):
+                manifest = generate_metadata_entry_sheets_batch(
+                    self.metadata_dfs, self.session.gc, None, 'target', datasets, session=self.session,
+                    templates_folder_id='templates', manifest_path=manifest_path, max_workers=2)
+            self.assertEqual(manifest['status'].tolist(), ['created', 'created', 'failed', 'failed', 'created', 'created'])
+            self.assertEqual(manifest['error'].iloc[2], 'quota exceeded')
+            templates_built = len(self.endpoint.spreadsheets)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'manifest_templates.json')))
+
+            manifest = generate_metadata_entry_sheets_batch(
+                self.metadata_dfs, self.session.gc, None, 'target', datasets, session=self.session,
+                manifest_path=manifest_path)
+
+        self.assertEqual(len(manifest), 6)
+        self.assertEqual(set(manifest['status']), {'created'})
+        # The saved templates are reused and only D2 is provisioned
+        self.assertEqual(len(self.endpoint.spreadsheets) - templates_built, 2)
+        self.assertEqual(len([s for s in self.endpoint.spreadsheets.values() if s['title'].endswith('_template')]), 2)
+        titles = {s['title']: s for s in self.endpoint.spreadsheets.values()}
+        self.assertEqual(titles['D1_HCA_tier 1_metadata']['tabs']['Tier 1 Dataset Metadata'][5][:2], ['D1', 'One'])
+        self.assertEqual(titles['D3_HCA_tier 2_metadata']['tabs']['Tier 2 Dataset Metadata'][5][:1], ['D3'])
+        self.assertEqual(set(manifest.set_index(['dataset_id', 'tier'])['file_id']) & set(self.endpoint.spreadsheets),
+                         set(manifest['file_id']))
+
+    def test_copies_that_failed_to_prefill_are_reused(self):
+        prefill_metadata_entry_sheet = workflow.prefill_metadata_entry_sheet
+        def flaky_prefill(file_id, prefill, *args, **kwargs):
+            if prefill.get('Tier 1 Dataset Metadata', {}).get('dataset_id') == 'D2':
+                raise RuntimeError('quota exceeded')
+            return prefill_metadata_entry_sheet(file_id, prefill, *args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            datasets = os.path.join(directory, 'cohort.csv')
+            pd.DataFrame({'dataset_id': ['D1', 'D2']}).to_csv(datasets, index=False)
+            manifest_path = os.path.join(directory, 'manifest.csv')
+            with patch('hca_metadata_manager.workflow.prefill_metadata_entry_sheet', side_effect=flaky_prefill):
+                manifest = generate_metadata_entry_sheets_batch(
+                    self.metadata_dfs, self.session.gc, None, 'target', datasets, session=self.session,
+                    manifest_path=manifest_path)
+            failed = manifest[manifest['status'] == 'failed']
+            self.assertEqual(list(zip(failed['dataset_id'], failed['tier'])), [('D2', 'Tier 1')])
+            self.assertTrue(set(failed['file_id']) <= set(self.endpoint.spreadsheets))
+            spreadsheets_before = len(self.endpoint.spreadsheets)
+
+            manifest = generate_metadata_entry_sheets_batch(
+                self.metadata_dfs, self.session.gc, None, 'target', datasets, session=self.session,
+                manifest_path=manifest_path)
+
+        self.assertEqual(set(manifest['status']), {'created'})
+        self.assertEqual(len(self.endpoint.spreadsheets), spreadsheets_before)
+        resumed = manifest[(manifest['dataset_id'] == 'D2') & (manifest['tier'] == 'Tier 1')]
+        self.assertEqual(resumed['file_id'].tolist(), failed['file_id'].tolist())
+        tier1 = self.endpoint.spreadsheets[failed['file_id'].iloc[0]]
+        self.assertEqual(tier1['tabs']['Tier 1 Dataset Metadata'][5][:1], ['D2'])
+
+    def test_step_by_step_build_does_not_look_for_sheet1_again(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            file_ids = generate_empty_metadata_entry_sheets(self.metadata_dfs, self.session.gc, None, 'target',
+                                                            'Kimler2025', session=self.session)
+        self.assertNotIn('Sheet1', output.getvalue())
+        self.assertFalse([path for method, path in self.endpoint.requests if 'Sheet1' in path])
+        self.assertEqual(self.endpoint.spreadsheets[file_ids['Tier 1']]['validations'],
+                         {'Tier 1 Donor Metadata': {1: ['female']}})
+
+    def test_fused_provisioning_matches_step_by_step(self):
+        spreadsheets = {}
+        for fused in (False, True):
+            endpoint = FakeGoogleBackend()
+            session = endpoint.session()
+            file_ids = generate_empty_metadata_entry_sheets(self.metadata_dfs, session.gc, None, 'target', 'Kimler2025',
+                                                            session=session, fused=fused)
+            spreadsheets[fused] = [{key: endpoint.spreadsheets[file_id][key] for key in
+                                    ('title', 'tabs', 'validations', 'parents', 'sheet_ids')} for file_id in file_ids.values()]
+            if fused:
+                # spreadsheets.create, one batchUpdate and the Drive move, per spreadsheet
+                self.assertEqual(endpoint.requests, [request for file_id in file_ids.values() for request in (
+                    ('POST', '/v4/spreadsheets'), ('POST', f'/v4/spreadsheets/{file_id}:batchUpdate'),
+                    ('PATCH', f'/drive/v3/files/{file_id}'))])
+        self.assertEqual(spreadsheets[True], spreadsheets[False])
+        self.assertEqual(spreadsheets[True][0]['parents'], ['target'])
+        self.assertEqual(spreadsheets[True][0]['validations'], {'Tier 1 Donor Metadata': {1: ['female']}})
+
+
 if __name__ == '__main__':
     unittest.main()